@@ -3,12 +3,24 @@
 Usage (PowerShell/CMD):
     python -m legacy.backend.app.ingest_pdf_cli "Path to file.pdf"
 
+Batch mode walks a directory tree (or reads a manifest, one path per line),
+analyzes files in a process pool and appends one JSON line per file to the
+output. Re-running with the same --out resumes: paths already in the file are
+skipped (failed ones too, unless --retry-errors).
+    python -m legacy.backend.app.ingest_pdf_cli --batch "contracts/" --out results.ndjson --workers 8
+
 This script avoids importing `main.py` (which pulls FastAPI at import time)
 and instead calls the same nlp_rules functions and builds an IngestResult.
 """
 import sys
+import os
 import json
+import time
+import argparse
+import fnmatch
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
+from typing import Dict, Iterator, Set
 
 from legacy.backend.app import ocr, nlp_rules
 from legacy.backend.app.schemas import IngestResult
@@ -42,9 +54,130 @@ def analyze_text_local(filename: str, text: str) -> IngestResult:
     )
 
 
+def analyze_file(path: str) -> Dict:
+    """Batch worker: one NDJSON record per file; failures are recorded, not raised."""
+    try:
+        text, pages = ocr.extract_text_from_pdf_bytes(Path(path).read_bytes())
+        res = analyze_text_local(os.path.basename(path), text)
+        out = res.model_dump() if hasattr(res, 'model_dump') else res.dict()
+        return {'path': path, 'pages': pages, 'chars': len(text), 'result': out}
+    except Exception as e:
+        return {'path': path, 'error': f"{type(e).__name__}: {e}"}
+
+
+def iter_inputs(src: str, pattern: str = '*.pdf') -> Iterator[str]:
+    """Files under a directory (walked lazily, sorted per directory) or listed in a manifest."""
+    if os.path.isdir(src):
+        for root, dirs, files in os.walk(src):
+            dirs.sort()
+            for f in sorted(files):
+                if fnmatch.fnmatch(f.lower(), pattern.lower()):
+                    yield os.path.join(root, f)
+    else:
+        base = os.path.dirname(os.path.abspath(src))
+        with open(src, encoding='utf-8') as fh:
+            for line in fh:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line if os.path.isabs(line) else os.path.join(base, line)
+
+
+def load_done(out_path: str, retry_errors: bool = False) -> Set[str]:
+    """Paths already in the output. A partial last line (killed mid-write) is cut off.
+    With retry_errors the failed records are dropped from the file, so a retried
+    path ends up with one record."""
+    done: Set[str] = set()
+    if not os.path.exists(out_path):
+        return done
+    good = 0
+    errors = False
+    with open(out_path, 'rb') as fh:
+        for raw in fh:
+            try:
+                rec = json.loads(raw)
+            except ValueError:
+                break
+            if not raw.endswith(b'\n'):
+                break
+            good += len(raw)
+            if 'error' in rec:
+                errors = True
+            if not (retry_errors and 'error' in rec):
+                done.add(rec['path'])
+    if good != os.path.getsize(out_path):
+        with open(out_path, 'r+b') as fh:
+            fh.truncate(good)
+    if retry_errors and errors:
+        _drop_errors(out_path)
+    return done
+
+
+def _drop_errors(out_path: str) -> None:
+    """Rewrite the output without its failed records (streamed, then swapped in)."""
+    tmp = out_path + '.tmp'
+    with open(out_path, 'rb') as src, open(tmp, 'wb') as dst:
+        for raw in src:
+            if 'error' not in json.loads(raw):
+                dst.write(raw)
+    os.replace(tmp, out_path)
+
+
+def run_batch(src: str, out_path: str, workers: int = 0, pattern: str = '*.pdf',
+              retry_errors: bool = False) -> Dict[str, int]:
+    workers = workers or os.cpu_count() or 1
+    done = load_done(out_path, retry_errors)
+    stats = {'skipped': 0, 'ok': 0, 'failed': 0}
+
+    def remaining() -> Iterator[str]:
+        # skipped counts inputs that are already done, not stale output records
+        for p in iter_inputs(src, pattern):
+            if p in done:
+                stats['skipped'] += 1
+            else:
+                yield p
+
+    todo = remaining()
+    t0 = time.time()
+    with open(out_path, 'a', encoding='utf-8') as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        while True:
+            # keep at most 4 files per worker in flight so an 80k-file tree never sits in memory
+            for p in todo:
+                pending.add(pool.submit(analyze_file, p))
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                rec = fut.result()
+                out.write(json.dumps(rec) + '\n')
+                stats['failed' if 'error' in rec else 'ok'] += 1
+            out.flush()
+            n = stats['ok'] + stats['failed']
+            if n and n % 100 < len(finished):
+                print(f"{n} files, {n / (time.time() - t0):.1f}/s, {stats['failed']} failed", file=sys.stderr)
+    return stats
+
+
 def main(argv):
+    if len(argv) >= 2 and argv[1].startswith('--'):
+        ap = argparse.ArgumentParser(prog='ingest_pdf_cli')
+        ap.add_argument('--batch', required=True, help='directory to walk, or manifest file with one path per line')
+        ap.add_argument('--out', required=True, help='NDJSON output; re-running resumes it')
+        ap.add_argument('--workers', type=int, default=0, help='process count (default: CPU count)')
+        ap.add_argument('--pattern', default='*.pdf', help='file glob when walking a directory')
+        ap.add_argument('--retry-errors', action='store_true', help='reprocess files that failed before')
+        args = ap.parse_args(argv[1:])
+        if not os.path.exists(args.batch):
+            print(f"Not found: {args.batch}")
+            return 3
+        stats = run_batch(args.batch, args.out, args.workers, args.pattern, args.retry_errors)
+        print(json.dumps(stats))
+        return 0 if not stats['failed'] else 1
     if len(argv) < 2:
         print("Usage: python ingest_pdf_cli.py <path-to-pdf>")
+        print("       python ingest_pdf_cli.py --batch <dir|manifest> --out results.ndjson [--workers N]")
         return 2
     p = Path(argv[1])
     if not p.exists():
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The legacy modules import themselves as legacy.backend.app.*; make that
+# resolvable from the AccrueSmart_Enterprise_v3_software folder.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
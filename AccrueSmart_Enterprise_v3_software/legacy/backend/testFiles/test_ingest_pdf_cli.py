@@ -0,0 +1,73 @@
+import json
+
+from legacy.backend.app import ingest_pdf_cli
+
+
+def _fake_analyze(path):
+    # forked workers inherit the monkeypatched module, so this runs in the pool
+    if "bad" in path:
+        return {"path": path, "error": "PDFSyntaxError: broken"}
+    return {"path": path, "pages": 1, "chars": 3, "result": {}}
+
+
+def _records(out):
+    return [json.loads(line) for line in out.read_text().splitlines()]
+
+
+def test_iter_inputs_walks_directories_and_reads_manifests(tmp_path):
+    (tmp_path / "b").mkdir()
+    for name in ("a.PDF", "notes.txt", "b/c.pdf"):
+        (tmp_path / name).write_bytes(b"")
+    found = list(ingest_pdf_cli.iter_inputs(str(tmp_path)))
+    assert [p[len(str(tmp_path)) + 1:] for p in found] == ["a.PDF", "b/c.pdf"]
+
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("# contracts\nb/c.pdf\n\n/abs/x.pdf\n")
+    assert list(ingest_pdf_cli.iter_inputs(str(manifest))) == [str(tmp_path / "b/c.pdf"), "/abs/x.pdf"]
+
+
+def test_load_done_truncates_half_written_last_line(tmp_path):
+    out = tmp_path / "out.ndjson"
+    assert ingest_pdf_cli.load_done(str(out)) == set()
+    good = '{"path": "a.pdf", "result": {}}\n{"path": "b.pdf", "error": "x"}\n'
+    out.write_text(good + '{"path": "c.pd')
+    assert ingest_pdf_cli.load_done(str(out)) == {"a.pdf", "b.pdf"}
+    assert out.read_text() == good
+    assert ingest_pdf_cli.load_done(str(out), retry_errors=True) == {"a.pdf"}
+    assert out.read_text() == '{"path": "a.pdf", "result": {}}\n'   # failed records make way for the retry
+
+    # a complete record missing its newline was cut mid-write too
+    out.write_text(good + '{"path": "c.pdf", "result": {}}')
+    assert ingest_pdf_cli.load_done(str(out)) == {"a.pdf", "b.pdf"}
+    assert out.read_text() == good
+
+
+def test_run_batch_resumes_and_retries_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_pdf_cli, "analyze_file", _fake_analyze)
+    src = tmp_path / "in"
+    src.mkdir()
+    for name in ("a.pdf", "b.pdf", "bad.pdf"):
+        (src / name).write_bytes(b"")
+    out = tmp_path / "out.ndjson"
+
+    assert ingest_pdf_cli.run_batch(str(src), str(out), workers=2) == {"skipped": 0, "ok": 2, "failed": 1}
+    with open(out, "a") as fh:
+        fh.write('{"path": "' + str(src / "a.pdf"))   # killed mid-write
+    assert ingest_pdf_cli.run_batch(str(src), str(out), workers=2) == {"skipped": 3, "ok": 0, "failed": 0}
+    assert len(_records(out)) == 3
+
+    stats = ingest_pdf_cli.run_batch(str(src), str(out), workers=2, retry_errors=True)
+    assert stats == {"skipped": 2, "ok": 0, "failed": 1}
+    assert sorted(r["path"][len(str(src)) + 1:] for r in _records(out)) == ["a.pdf", "b.pdf", "bad.pdf"]
+
+    (src / "b.pdf").unlink()   # records of files no longer in the input are not counted as skipped
+    assert ingest_pdf_cli.run_batch(str(src), str(out), workers=2) == {"skipped": 2, "ok": 0, "failed": 0}
+
+
+def test_main_batch_exit_codes(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(ingest_pdf_cli, "analyze_file", _fake_analyze)
+    out = str(tmp_path / "out.ndjson")
+    assert ingest_pdf_cli.main(["cli", "--batch", str(tmp_path / "missing"), "--out", out]) == 3
+    (tmp_path / "bad.pdf").write_bytes(b"")
+    assert ingest_pdf_cli.main(["cli", "--batch", str(tmp_path), "--out", out, "--retry-errors"]) == 1
+    assert json.loads(capsys.readouterr().out.splitlines()[-1]) == {"skipped": 0, "ok": 0, "failed": 1}
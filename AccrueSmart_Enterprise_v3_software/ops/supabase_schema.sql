@@ -109,6 +109,12 @@ create table if not exists schedulelock (
 );
 create index if not exists ix_schedulelock_contract
   on schedulelock (contract_id);
+-- latest lock per contract (row_number() / distinct on)
+create index if not exists ix_schedulelock_contract_locked_at
+  on schedulelock (contract_id, locked_at);
+-- period-level Merkle hashing: root + {period: leaf hash}
+alter table schedulelock add column if not exists merkle_root text;
+alter table schedulelock add column if not exists period_hashes jsonb;
 
 
 -- === SCHEDULES (persisted output from the engine) ============
@@ -139,6 +145,182 @@ create table if not exists schedules_edit (
   source text default 'user',         -- 'user' | 'ai' | 'rule'
   primary key (contract_id, line_no, period)
 );
+-- dependency lookups: which lines use a product / revrec code
+create index if not exists ix_schedules_edit_product_code on schedules_edit (product_code);
+create index if not exists ix_schedules_edit_revrec_code on schedules_edit (revrec_code);
+-- per-period revenue journal generation
+create index if not exists ix_schedules_edit_period_contract on schedules_edit (period, contract_id);
+
+-- lines whose rule changed since generation (revrec params edit, product remap)
+create table if not exists schedule_dirty (
+  contract_id text not null,
+  line_no int not null,
+  reason text default '',
+  marked_at timestamptz default now(),
+  primary key (contract_id, line_no)
+);
+create index if not exists ix_schedule_dirty_marked_at on schedule_dirty (marked_at);
+
+
+-- === SCHEDULE VERSIONS (copy-on-write grid history) =========
+
+create table if not exists schedule_versions (
+  contract_id text not null,
+  version int not null,
+  source text not null default '',    -- 'save' | 'close'
+  cells_changed int not null default 0,
+  created_at timestamptz default now(),
+  primary key (contract_id, version)
+);
+create index if not exists ix_schedule_versions_created_at on schedule_versions (created_at);
+
+-- only cells changed by a version; deleted = tombstone
+create table if not exists schedule_version_cells (
+  contract_id text not null,
+  line_no int not null,
+  period text not null,
+  version int not null,
+  amount numeric not null default 0,
+  product_code text not null default '',
+  revrec_code text not null default '',
+  deleted boolean not null default false,
+  primary key (contract_id, line_no, period, version)
+);
+
+-- version pointer per close
+create table if not exists schedule_version_tags (
+  tag text not null,
+  contract_id text not null,
+  version int not null,
+  created_at timestamptz default now(),
+  primary key (tag, contract_id)
+);
+
+
+-- === ENTITY TRIALS (input to streaming consolidation) ========
+
+create table if not exists entity_trials (
+  entity text not null,
+  period text not null,               -- "2025-01"
+  currency text not null,
+  revenue numeric not null default 0,
+  commission numeric not null default 0,
+  updated_at timestamptz default now(),
+  primary key (entity, period)
+);
+
+
+-- === INGEST CACHE ============================================
+
+create table if not exists ingest_doc_cache (
+  key text primary key,               -- sha256:kind:rules_version
+  kind text not null,                 -- "pdf" | "pdf_fast" | "text"
+  pages int,
+  text text not null default '',
+  result text not null,               -- IngestResult JSON
+  size int not null default 0,
+  hits int not null default 0,
+  created_at timestamptz default now(),
+  last_used_at timestamptz default now()
+);
+create index if not exists ix_ingest_doc_cache_last_used_at on ingest_doc_cache (last_used_at);
+
+create table if not exists ingest_page_cache (
+  key text primary key,               -- page digest:mode
+  text text not null default '',
+  created_at timestamptz default now(),
+  last_used_at timestamptz default now()
+);
+create index if not exists ix_ingest_page_cache_last_used_at on ingest_page_cache (last_used_at);
+
+-- === BULK INGEST JOBS =========================================
+
+create table if not exists ingest_jobs (
+  id text primary key,
+  status text not null default 'queued',   -- queued | running | done | failed
+  fast boolean not null default false,
+  total int not null default 0,
+  done int not null default 0,
+  failed int not null default 0,
+  created_at timestamptz default now(),
+  finished_at timestamptz
+);
+
+create table if not exists ingest_job_items (
+  id bigserial primary key,
+  job_id text not null references ingest_jobs(id) on delete cascade,
+  filename text not null,
+  path text not null,
+  status text not null default 'queued',   -- queued | done | failed
+  pages int,
+  cached boolean not null default false,
+  error text,
+  result text,                             -- IngestResult JSON
+  finished_at timestamptz
+);
+create index if not exists ix_ingest_job_items_job_id on ingest_job_items (job_id);
+
+
+-- === JOURNAL SUBLEDGER ========================================
+
+create table if not exists journal_entries (
+  id bigserial primary key,
+  period text not null,               -- "2025-01"
+  debit_account text not null,
+  credit_account text not null,
+  amount numeric not null,
+  memo text not null default '',
+  contract_id text not null default '',
+  source text not null default 'manual',   -- manual | catchup | revenue | ...
+  batch_id text not null default '',
+  posted boolean not null default true,
+  created_at timestamptz default now()
+);
+create index if not exists ix_journal_entries_period on journal_entries (period);
+create index if not exists ix_journal_entries_batch_id on journal_entries (batch_id);
+create index if not exists ix_journal_entries_debit_period on journal_entries (debit_account, period);
+create index if not exists ix_journal_entries_credit_period on journal_entries (credit_account, period);
+create index if not exists ix_journal_entries_contract_period on journal_entries (contract_id, period);
+
+
+-- === GL SUMMARY (period x account x entity x product_line) ===
+
+create table if not exists contract_attributes (
+  contract_id text primary key,
+  entity text not null default '',
+  product_line text not null default '',
+  geography text not null default '',
+  currency text not null default 'USD',
+  updated_at timestamptz default now()
+);
+
+-- maintained incrementally as journal batches are posted / replaced
+create table if not exists gl_summary (
+  period text not null,
+  account text not null,
+  entity text not null default '',
+  product_line text not null default '',
+  debit numeric not null default 0,
+  credit numeric not null default 0,
+  entries int not null default 0,
+  updated_at timestamptz default now(),
+  primary key (period, account, entity, product_line)
+);
+
+
+-- === DISCLOSURE PACK JOBS =====================================
+
+create table if not exists disclosure_jobs (
+  id text primary key,
+  status text not null default 'queued',   -- queued | running | done | failed
+  period_from text not null,
+  period_to text not null,
+  request text,                            -- DisclosurePackIn JSON
+  path text,
+  error text,
+  created_at timestamptz default now(),
+  finished_at timestamptz
+);
 
 
 -- === ADDITIONAL PERMISSIONS ==================================
@@ -1,26 +1,226 @@
-from typing import Dict, DefaultDict
-from collections import defaultdict
-from .schemas import ConsolidationIn
+from typing import Dict, List, Tuple, Iterable, Iterator, Optional
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+import json
+import multiprocessing
+import os
+import threading
+import numpy as np
+from .schemas import ConsolidationIn, ConsolidationHeader, EntityTrial, GroupConsolidationIn, GroupNode
+from .fx_cube import FXRateCube, get_cube
+
+def translate(cube: FXRateCube, rate_type: str, series: Iterable[Tuple[str, Dict[str, float]]]) -> Dict[str, float]:
+    """Translate (currency, {period: amount}) series to parent currency and sum by period (unrounded).
+    One gather from the cube plus a bincount; no per-amount Python arithmetic."""
+    keys: List[str] = []; vals: List[float] = []; ccys: List[int] = []; lens: List[int] = []
+    for ccy, sched in series:
+        if not sched: continue
+        keys.extend(sched.keys()); vals.extend(sched.values()); ccys.append(cube.currency_index(ccy)); lens.append(len(sched))
+    if not keys: return {}
+    periods, inverse = np.unique(np.asarray(keys), return_inverse=True)
+    rates = cube.resolved(rate_type)[cube.period_index(periods.tolist())[inverse], np.repeat(ccys, lens)]
+    totals = np.bincount(inverse, weights=np.asarray(vals, dtype=float) * rates, minlength=len(periods))
+    return dict(zip(periods.tolist(), totals.tolist()))
+
+def eliminations_by_period(eliminations: List[Dict], intercompany: List[Dict]) -> Dict[str, float]:
+    elim_total: Dict[str, float] = {}
+    for row in eliminations:
+        elim_total[row["period"]] = elim_total.get(row["period"], 0.0) + float(row.get("amount_parent_ccy", 0.0))
+    for m in intercompany:
+        p = m.get("period"); elim_total[p] = elim_total.get(p, 0.0) + float(m.get("amount_parent_ccy", 0.0))
+    return elim_total
+
+def build_result(parent: str, rate_type: str, rev: Dict[str, float], comm: Dict[str, float], elim: Dict[str, float]) -> Dict:
+    rev = dict(rev)
+    for p, amt in elim.items(): rev[p] = rev.get(p, 0.0) - amt
+    periods = sorted(set(rev) | set(comm))
+    rows = [{"period": p, "revenue_parent": round(rev.get(p, 0.0), 2), "commission_parent": round(comm.get(p, 0.0), 2)} for p in periods]
+    return {"parent_currency": parent, "rows": rows, "eliminations_applied": {p: round(a, 2) for p, a in elim.items()}, "rate_type_used": rate_type}
 
 def consolidate(inp: ConsolidationIn) -> Dict:
-    fx: DefaultDict[str, Dict[str, Dict[str, float]]] = defaultdict(lambda: defaultdict(dict))
-    for r in inp.fx_rates:
-        typ = r.rate_type or 'month_end'; fx[r.period][r.currency][typ] = r.rate_to_parent
-    parent = inp.parent_currency; rev_parent = {}; comm_parent = {}
-    def pick_rate(period: str, ccy: str) -> float:
-        by_ccy = fx.get(period, {}).get(ccy, {}); 
-        if inp.rate_type in by_ccy: return by_ccy[inp.rate_type]
-        return by_ccy.get('month_end', by_ccy.get('average', 1.0))
-    for ent in inp.entities:
-        for p, amt in ent.schedules.items():
-            rate = pick_rate(p, ent.currency); rev_parent[p] = round(rev_parent.get(p, 0.0) + amt*rate, 2)
-        for p, amt in ent.commissions.items():
-            rate = pick_rate(p, ent.currency); comm_parent[p] = round(comm_parent.get(p, 0.0) + amt*rate, 2)
-    elim_total = {}
-    for row in inp.eliminations:
-        elim_total[row["period"]] = round(elim_total.get(row["period"],0.0) + float(row.get("amount_parent_ccy",0.0)),2)
-    for m in inp.intercompany:
-        p=m.get("period"); amt=float(m.get("amount_parent_ccy",0.0)); elim_total[p]=round(elim_total.get(p,0.0)+amt,2)
-    for p, amt in elim_total.items(): rev_parent[p] = round(rev_parent.get(p, 0.0) - amt, 2)
-    periods = sorted(set(list(rev_parent.keys()) + list(comm_parent.keys()))); rows = [{"period": p, "revenue_parent": rev_parent.get(p,0.0), "commission_parent": comm_parent.get(p,0.0)} for p in periods]
-    return {"parent_currency": parent, "rows": rows, "eliminations_applied": elim_total, "rate_type_used": inp.rate_type}
\ No newline at end of file
+    cube = get_cube(inp.fx_rates)
+    rev = translate(cube, inp.rate_type, ((e.currency, e.schedules) for e in inp.entities))
+    comm = translate(cube, inp.rate_type, ((e.currency, e.commissions) for e in inp.entities))
+    return build_result(inp.parent_currency, inp.rate_type, rev, comm, eliminations_by_period(inp.eliminations, inp.intercompany))
+
+
+def _add_into(acc: Dict[str, float], part: Dict[str, float], sign: float = 1.0) -> None:
+    for p, a in part.items(): acc[p] = acc.get(p, 0.0) + sign * a
+
+class GroupConsolidator:
+    """Multi-level group consolidation with cached subtotals per node.
+
+    Every node caches gross = sum(children net) + own translated entities, and
+    net = gross - own eliminations/intercompany, so eliminations land at the
+    level they are booked. Entity translations are cached too; a late change to
+    one entity or one node's eliminations recomputes only the path to the root."""
+
+    def __init__(self, inp: GroupConsolidationIn):
+        self.group_id = inp.group_id; self.parent_currency = inp.parent_currency; self.rate_type = inp.rate_type
+        self.cube = get_cube(inp.fx_rates)
+        self.parent_of: Dict[str, Optional[str]] = {}; self.children: Dict[str, List[str]] = {}
+        self.node_entities: Dict[str, List[str]] = {}; self.entity_node: Dict[str, str] = {}
+        self.elims: Dict[str, Dict[str, float]] = {}
+        self.trials: Dict[str, Tuple[Dict[str, float], Dict[str, float]]] = {}
+        self.nodes: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.root_id = inp.root.node_id
+        self._lock = threading.Lock()
+        order: List[str] = []; stack: List[Tuple[GroupNode, Optional[str]]] = [(inp.root, None)]
+        while stack:
+            node, parent = stack.pop(); self._add_node(node, parent); order.append(node.node_id)
+            stack.extend((c, node.node_id) for c in node.children)
+        for nid in reversed(order): self._recompute(nid)  # children before parents
+
+    def _add_node(self, node: GroupNode, parent: Optional[str]) -> None:
+        nid = node.node_id
+        if nid in self.parent_of: raise ValueError(f"Duplicate node_id '{nid}'")
+        self.parent_of[nid] = parent; self.children[nid] = [c.node_id for c in node.children]; self.node_entities[nid] = []
+        self.elims[nid] = eliminations_by_period(node.eliminations, node.intercompany)
+        for ent in node.entities:
+            if ent.entity in self.entity_node: raise ValueError(f"Entity '{ent.entity}' appears under more than one node")
+            self.entity_node[ent.entity] = nid; self.node_entities[nid].append(ent.entity); self.trials[ent.entity] = self._translate(ent)
+
+    def _translate(self, ent: EntityTrial) -> Tuple[Dict[str, float], Dict[str, float]]:
+        return (translate(self.cube, self.rate_type, [(ent.currency, ent.schedules)]),
+                translate(self.cube, self.rate_type, [(ent.currency, ent.commissions)]))
+
+    def _recompute(self, nid: str) -> None:
+        gross: Dict[str, float] = {}; comm: Dict[str, float] = {}
+        for c in self.children[nid]: _add_into(gross, self.nodes[c]["net"]); _add_into(comm, self.nodes[c]["comm"])
+        for e in self.node_entities[nid]: _add_into(gross, self.trials[e][0]); _add_into(comm, self.trials[e][1])
+        net = dict(gross); _add_into(net, self.elims[nid], -1.0)
+        self.nodes[nid] = {"gross": gross, "comm": comm, "net": net}
+
+    def _refresh_path(self, nid: Optional[str]) -> List[str]:
+        path = []
+        while nid is not None: self._recompute(nid); path.append(nid); nid = self.parent_of[nid]
+        return path
+
+    def update_entity(self, ent: EntityTrial) -> List[str]:
+        """Replace one entity's trial; returns the node ids that were recomputed."""
+        with self._lock:
+            nid = self.entity_node.get(ent.entity)
+            if nid is None: raise KeyError(f"Entity '{ent.entity}' is not part of group '{self.group_id}'")
+            self.trials[ent.entity] = self._translate(ent)
+            return self._refresh_path(nid)
+
+    def update_eliminations(self, node_id: str, eliminations: List[Dict], intercompany: List[Dict]) -> List[str]:
+        with self._lock:
+            if node_id not in self.parent_of: raise KeyError(f"Node '{node_id}' is not part of group '{self.group_id}'")
+            self.elims[node_id] = eliminations_by_period(eliminations, intercompany)
+            return self._refresh_path(node_id)
+
+    def node_result(self, nid: str) -> Dict:
+        n = self.nodes[nid]
+        return build_result(self.parent_currency, self.rate_type, n["gross"], n["comm"], self.elims[nid])
+
+    def result(self, node_ids: Optional[Iterable[str]] = None) -> Dict:
+        ids = list(self.parent_of) if node_ids is None else list(node_ids)
+        return {"group_id": self.group_id, "root": self.node_result(self.root_id),
+                "nodes": {nid: self.node_result(nid) for nid in ids}}
+
+_groups: Dict[str, GroupConsolidator] = {}
+_groups_lock = threading.Lock()
+
+def register_group(inp: GroupConsolidationIn) -> GroupConsolidator:
+    g = GroupConsolidator(inp)
+    with _groups_lock: _groups[inp.group_id] = g
+    return g
+
+def get_group(group_id: str) -> GroupConsolidator:
+    with _groups_lock: g = _groups.get(group_id)
+    if g is None: raise KeyError(f"Group '{group_id}' not found")
+    return g
+
+
+# ── Streaming consolidation ─────────────────────────────────────
+# Entity trials arrive as an iterator (NDJSON upload or DB cursor) and are
+# translated in chunks by a process pool; workers return per-period partial
+# sums that are merged at the end. At most 2 chunks per worker are in flight.
+# The pool is shared by all requests and started once with the spawn method,
+# so workers never inherit the server's threads or an open DB cursor.
+
+STREAM_WORKERS = int(os.getenv("CONSOLIDATION_WORKERS", "0")) or (os.cpu_count() or 1)
+STREAM_CHUNK = int(os.getenv("CONSOLIDATION_CHUNK", "256"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=STREAM_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown(wait: bool = True) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
+
+# worker side: cubes by key, rebuilt from the arrays sent with the first chunk that needs them
+_worker_cubes: Dict[str, FXRateCube] = {}
+
+def _worker_cube(key: str, periods: List[str], currencies: List[str], rates: np.ndarray) -> FXRateCube:
+    cube = _worker_cubes.get(key)
+    if cube is None:
+        if len(_worker_cubes) >= 8: _worker_cubes.clear()
+        cube = _worker_cubes[key] = FXRateCube(periods, currencies, rates, key)
+    return cube
+
+def _translate_chunk(chunk: List[Tuple[str, Dict[str, float], Dict[str, float]]],
+                     cube: FXRateCube, rate_type: str) -> Tuple[Dict[str, float], Dict[str, float], int]:
+    rev = translate(cube, rate_type, ((c, s) for c, s, _ in chunk))
+    comm = translate(cube, rate_type, ((c, m) for c, _, m in chunk))
+    return rev, comm, len(chunk)
+
+def _translate_chunk_remote(chunk: List[Tuple[str, Dict[str, float], Dict[str, float]]],
+                            cube_args: Tuple[str, List[str], List[str], np.ndarray],
+                            rate_type: str) -> Tuple[Dict[str, float], Dict[str, float], int]:
+    return _translate_chunk(chunk, _worker_cube(*cube_args), rate_type)
+
+def _chunks(trials: Iterable[EntityTrial], size: int) -> Iterator[List[Tuple[str, Dict[str, float], Dict[str, float]]]]:
+    it = iter(trials)
+    while True:
+        chunk = [(t.currency, t.schedules, t.commissions) for t in islice(it, size)]
+        if not chunk: return
+        yield chunk
+
+def read_ndjson(lines: Iterable) -> Tuple[ConsolidationHeader, Iterator[EntityTrial]]:
+    """First line is the ConsolidationHeader, each following line one EntityTrial."""
+    it = enumerate(lines, start=1)
+    header = None
+    for _, line in it:
+        if line.strip(): header = ConsolidationHeader(**json.loads(line)); break
+    if header is None: raise ValueError("Empty NDJSON stream: expected a header line")
+    def trials() -> Iterator[EntityTrial]:
+        for n, line in it:
+            if not line.strip(): continue
+            try: yield EntityTrial(**json.loads(line))
+            except ValueError as e: raise ValueError(f"line {n}: {e}") from e
+    return header, trials()
+
+def consolidate_stream(header: ConsolidationHeader, trials: Iterable[EntityTrial],
+                       workers: Optional[int] = None, chunk_size: Optional[int] = None) -> Dict:
+    """Same result as consolidate() without materializing every EntityTrial at once."""
+    cube = get_cube(header.fx_rates); workers = workers or STREAM_WORKERS; chunk_size = chunk_size or STREAM_CHUNK
+    rev: Dict[str, float] = {}; comm: Dict[str, float] = {}; n = 0
+    def merge(part):
+        nonlocal n
+        _add_into(rev, part[0]); _add_into(comm, part[1]); n += part[2]
+    if workers <= 1:
+        for chunk in _chunks(trials, chunk_size): merge(_translate_chunk(chunk, cube, header.rate_type))
+    else:
+        pool = _get_pool(); cube_args = (cube.key, cube.periods, cube.currencies, cube.rates)
+        pending = set()
+        for chunk in _chunks(trials, chunk_size):
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done: merge(f.result())
+            pending.add(pool.submit(_translate_chunk_remote, chunk, cube_args, header.rate_type))
+        for f in pending: merge(f.result())
+    out = build_result(header.parent_currency, header.rate_type, rev, comm, eliminations_by_period(header.eliminations, header.intercompany))
+    out["entities_processed"] = n
+    return out
@@ -1,8 +1,13 @@
 # backend/app/db.py
-from contextlib import contextmanager
-from typing import Generator
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial, wraps
+from typing import AsyncGenerator, Awaitable, Callable, Generator, Optional, TypeVar
+import importlib.util
 import os
 from sqlmodel import Session, create_engine, SQLModel
+from .db_pool import PoolSettings, engine_kwargs, pool_status
+
+T = TypeVar("T")
 
 # ---------------------------------------------------------------------------
 # Supabase / PostgreSQL connection
@@ -18,13 +23,14 @@ DATABASE_URL = os.getenv("SUPABASE_DB_URL") or os.getenv(
 
 _is_sqlite = DATABASE_URL.startswith("sqlite")
 
+# Pool size / overflow / timeout / recycle / pre-ping and transaction-pooler
+# settings come from DB_POOL_* env vars, see db_pool.py
+POOL_SETTINGS = PoolSettings.from_env(DATABASE_URL)
+
 engine = create_engine(
     DATABASE_URL,
     echo=bool(os.getenv("DEBUG")),
-    # SQLite needs this; Postgres does not
-    connect_args={"check_same_thread": False} if _is_sqlite else {},
-    # Postgres pool sizing (ignored by SQLite)
-    **({} if _is_sqlite else {"pool_size": 5, "max_overflow": 10}),
+    **engine_kwargs(DATABASE_URL, POOL_SETTINGS),
 )
 
 def init_db():
@@ -46,4 +52,105 @@ def get_session() -> Generator[Session, None, None]:
         session.rollback()
         raise
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+
+# ---------------------------------------------------------------------------
+# Async engine (asyncpg for Postgres, aiosqlite for SQLite)
+# Same DATABASE_URL with the async driver swapped in. DB_ASYNC=0 disables it;
+# by default it is used whenever the driver is installed. Without it, async
+# callers fall back to running the sync session in the threadpool.
+# ---------------------------------------------------------------------------
+_ASYNC_DRIVERS = {"postgresql": ("postgresql+asyncpg", "asyncpg"),
+                  "postgres": ("postgresql+asyncpg", "asyncpg"),
+                  "sqlite": ("sqlite+aiosqlite", "aiosqlite")}
+
+
+def _async_url(url: str) -> Optional[str]:
+    scheme, sep, rest = url.partition("://")
+    driver = _ASYNC_DRIVERS.get(scheme.split("+")[0])
+    if not sep or driver is None or importlib.util.find_spec(driver[1]) is None:
+        return None
+    return f"{driver[0]}://{rest}"
+
+
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL) if os.getenv("DB_ASYNC", "1") != "0" else None
+_async_engine = None
+
+
+def get_async_engine():
+    """Lazily built AsyncEngine, or None when no async driver is available."""
+    global _async_engine
+    if _async_engine is None and ASYNC_DATABASE_URL:
+        from sqlalchemy.ext.asyncio import create_async_engine
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            echo=bool(os.getenv("DEBUG")),
+            **engine_kwargs(ASYNC_DATABASE_URL, POOL_SETTINGS, is_async=True),
+        )
+    return _async_engine
+
+
+def db_pool_status() -> dict:
+    """Pool occupancy and checkout wait metrics for the sync and async engines."""
+    return {
+        "transaction_pooler": POOL_SETTINGS.transaction_pooler,
+        "pool": POOL_SETTINGS.kind,
+        "sync": pool_status(engine),
+        "async": pool_status(_async_engine),   # None until first async use
+    }
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncGenerator["AsyncSession", None]:
+    """Async counterpart of get_session (commit on success, rollback on error)."""
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    eng = get_async_engine()
+    if eng is None:
+        raise RuntimeError("No async database driver installed (asyncpg / aiosqlite)")
+    session = AsyncSession(eng, expire_on_commit=False)
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Await fn(session, *args, **kwargs) without blocking the event loop.
+    fn is ordinary sync session code: on the async engine it runs through
+    AsyncSession.run_sync, otherwise in the threadpool with get_session()."""
+    if get_async_engine() is not None:
+        async with get_async_session() as s:
+            return await s.run_sync(partial(fn, **kwargs), *args)
+    from starlette.concurrency import run_in_threadpool
+    return await run_in_threadpool(partial(sync_db(fn), **kwargs), *args)
+
+
+def sync_db(fn: Callable[..., T]) -> Callable[..., T]:
+    """fn(session, ...) -> fn(...) running in its own get_session()."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with get_session() as s:
+            return fn(s, *args, **kwargs)
+    return wrapper
+
+
+def async_db(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """fn(session, ...) -> async fn(...) via run_db."""
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await run_db(fn, *args, **kwargs)
+    return wrapper
+
+def upsert_insert(s: Session, table):
+    """INSERT for `table` on the session's dialect, so callers can chain
+    .on_conflict_do_update() / .on_conflict_do_nothing() (Postgres, SQLite)."""
+    if s.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
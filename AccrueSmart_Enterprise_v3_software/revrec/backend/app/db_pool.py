@@ -0,0 +1,184 @@
+# backend/app/db_pool.py
+"""
+Connection-pool configuration and metrics for the engines in db.py.
+
+Settings come from the environment (defaults in brackets):
+  DB_POOL              queue | null [queue]   null = no client-side pooling
+  DB_POOL_SIZE         persistent connections per process [5]
+  DB_MAX_OVERFLOW      extra connections under burst [10]
+  DB_POOL_TIMEOUT      seconds to wait for a free connection [30]
+  DB_POOL_RECYCLE      close connections older than this, seconds [1800]
+  DB_POOL_PRE_PING     test connections on checkout, 0/1 [1]
+  DB_TRANSACTION_POOLER  force 0/1; default: on for Supabase's port 6543
+
+Behind a transaction pooler (PgBouncer / Supavisor on 6543) consecutive
+statements can land on different server connections, so driver-side prepared
+statement caches must be off.
+"""
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import os
+import threading
+import time
+import uuid
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+# ── Settings ─────────────────────────────────────────────────────
+
+def _env_bool(name: str, default: bool) -> bool:
+    v = os.getenv(name)
+    return default if v is None or v == "" else v.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    kind: str = "queue"
+    size: int = 5
+    max_overflow: int = 10
+    timeout: float = 30.0
+    recycle: int = 1800
+    pre_ping: bool = True
+    transaction_pooler: bool = False
+
+    @classmethod
+    def from_env(cls, url: str) -> "PoolSettings":
+        try:
+            port = urlsplit(url).port
+        except ValueError:
+            port = None
+        return cls(
+            kind=os.getenv("DB_POOL", "queue").strip().lower(),
+            size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            pre_ping=_env_bool("DB_POOL_PRE_PING", True),
+            transaction_pooler=_env_bool("DB_TRANSACTION_POOLER", port == 6543),
+        )
+
+
+# ── Instrumented pools ───────────────────────────────────────────
+
+class PoolMetrics:
+    """Checkout wait times (recent window for percentiles) and timeout count."""
+
+    def __init__(self, window: int = 2000):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._recent: deque = deque(maxlen=window)
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._recent.append(wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            n = self.checkouts + self.timeouts
+
+        def pct(p: float) -> float:
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 3) if recent else 0.0
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_total / n * 1000, 3) if n else 0.0,
+            "wait_ms_max": round(self.wait_max * 1000, 3),
+            "wait_ms_p50": pct(0.50),
+            "wait_ms_p95": pct(0.95),
+            "wait_ms_p99": pct(0.99),
+        }
+
+
+class _Instrumented:
+    """Mixin timing _do_get, i.e. how long a checkout waited for a connection."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - t0, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - t0)
+        return conn
+
+    def recreate(self):
+        new = super().recreate()
+        new.metrics = self.metrics
+        return new
+
+
+class InstrumentedQueuePool(_Instrumented, QueuePool):
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(_Instrumented, AsyncAdaptedQueuePool):
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.metrics = PoolMetrics()
+
+
+# ── Engine arguments ─────────────────────────────────────────────
+
+def engine_kwargs(url: str, settings: PoolSettings, is_async: bool = False) -> Dict[str, Any]:
+    """create_engine / create_async_engine keyword arguments for `url`."""
+    if url.startswith("sqlite"):
+        # SQLite needs this; Postgres does not. Pool sizing is left to SQLAlchemy.
+        return {} if is_async else {"connect_args": {"check_same_thread": False}}
+    connect_args: Dict[str, Any] = {}
+    if settings.transaction_pooler:
+        driver = urlsplit(url).scheme.partition("+")[2]
+        if driver == "asyncpg":
+            connect_args.update(statement_cache_size=0,
+                                prepared_statement_name_func=lambda: f"__asyncpg_{uuid.uuid4()}__")
+        elif driver == "psycopg":
+            connect_args["prepare_threshold"] = None
+        # psycopg2 never prepares server-side, nothing to turn off
+    kw: Dict[str, Any] = {"connect_args": connect_args, "pool_pre_ping": settings.pre_ping}
+    if settings.kind == "null":
+        kw["poolclass"] = NullPool
+    else:
+        kw.update(poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+                  pool_size=settings.size, max_overflow=settings.max_overflow,
+                  pool_timeout=settings.timeout, pool_recycle=settings.recycle)
+    return kw
+
+
+# ── Status ───────────────────────────────────────────────────────
+
+def pool_status(engine) -> Optional[Dict[str, Any]]:
+    """Point-in-time pool occupancy plus checkout wait metrics."""
+    if engine is None:
+        return None
+    pool = getattr(engine, "sync_engine", engine).pool
+    out: Dict[str, Any] = {"class": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        fn = getattr(pool, name, None)
+        if callable(fn):
+            out[name] = fn()
+    if "size" in out and "overflow" in out:
+        limit = out["size"] + max(getattr(pool, "_max_overflow", 0), 0)
+        out["capacity"] = limit
+        out["utilization"] = round(out.get("checkedout", 0) / limit, 3) if limit else None
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        out.update(metrics.snapshot())
+    return out
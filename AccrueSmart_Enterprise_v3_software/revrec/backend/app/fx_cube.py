@@ -0,0 +1,128 @@
+"""
+backend/app/fx_cube.py
+Dense FX rate cube (period x currency x rate_type) for consolidation.
+
+Cubes are keyed by a hash of the FX rate list, kept in a small in-process LRU
+and persisted under FX_CUBE_DIR as .npz so repeated consolidations against the
+same rate set skip the rebuild (also across restarts).
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from .schemas import FXRate
+
+RATE_TYPES = ("month_end", "average")
+CUBE_DIR = os.getenv("FX_CUBE_DIR", "./out/fx_cubes")
+CACHE_SIZE = int(os.getenv("FX_CUBE_CACHE_SIZE", "32"))
+
+
+class FXRateCube:
+    """rates[p, c, t] = rate_to_parent, NaN where the feed has no quote."""
+
+    def __init__(self, periods: Sequence[str], currencies: Sequence[str], rates: np.ndarray, key: str = ""):
+        self.periods: List[str] = list(periods)
+        self.currencies: List[str] = list(currencies)
+        self.rates = rates
+        self.key = key
+        self._period_ix = {p: i for i, p in enumerate(self.periods)}
+        self._ccy_ix = {c: i for i, c in enumerate(self.currencies)}
+        self._resolved: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, fx_rates: Sequence[FXRate], key: str = "") -> "FXRateCube":
+        periods = sorted({r.period for r in fx_rates})
+        currencies = sorted({r.currency for r in fx_rates})
+        p_ix = {p: i for i, p in enumerate(periods)}
+        c_ix = {c: i for i, c in enumerate(currencies)}
+        rates = np.full((len(periods), len(currencies), len(RATE_TYPES)), np.nan)
+        for r in fx_rates:  # later quotes win, same as the old nested dict
+            rates[p_ix[r.period], c_ix[r.currency], RATE_TYPES.index(r.rate_type or "month_end")] = r.rate_to_parent
+        return cls(periods, currencies, rates, key)
+
+    def resolved(self, rate_type: str) -> np.ndarray:
+        """(P+1, C+1) rate matrix with the fallback chain applied:
+        requested type -> month_end -> average -> 1.0.
+        The extra last row/column is all 1.0 so unknown periods/currencies
+        (index -1) gather a neutral rate."""
+        if rate_type not in self._resolved:
+            preferred = self.rates[:, :, RATE_TYPES.index(rate_type)]
+            month_end = self.rates[:, :, RATE_TYPES.index("month_end")]
+            average = self.rates[:, :, RATE_TYPES.index("average")]
+            picked = np.where(~np.isnan(preferred), preferred,
+                              np.where(~np.isnan(month_end), month_end,
+                                       np.where(~np.isnan(average), average, 1.0)))
+            padded = np.ones((len(self.periods) + 1, len(self.currencies) + 1))
+            padded[:-1, :-1] = picked
+            self._resolved[rate_type] = padded
+        return self._resolved[rate_type]
+
+    def period_index(self, periods: Iterable[str]) -> np.ndarray:
+        ix = self._period_ix
+        return np.fromiter((ix.get(p, -1) for p in periods), dtype=np.intp)
+
+    def currency_index(self, currency: str) -> int:
+        return self._ccy_ix.get(currency, -1)
+
+    def rates_for(self, periods: Sequence[str], currency: str, rate_type: str) -> np.ndarray:
+        """Gather the rate for each period of one currency."""
+        return self.resolved(rate_type)[self.period_index(periods), self.currency_index(currency)]
+
+    # ── persistence ──────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, rates=self.rates, periods=np.array(self.periods, dtype=str),
+                 currencies=np.array(self.currencies, dtype=str))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, key: str = "") -> "FXRateCube":
+        with np.load(path) as z:
+            return cls(z["periods"].tolist(), z["currencies"].tolist(), z["rates"], key)
+
+
+def cube_key(fx_rates: Sequence[FXRate]) -> str:
+    blob = json.dumps([[r.period, r.currency, r.rate_type or "month_end", r.rate_to_parent] for r in fx_rates],
+                      separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+_cache: "OrderedDict[str, FXRateCube]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_cube(fx_rates: Sequence[FXRate]) -> FXRateCube:
+    """Return the cube for this rate set: memory -> disk -> build (and persist)."""
+    key = cube_key(fx_rates)
+    with _lock:
+        cube = _cache.get(key)
+        if cube is not None:
+            _cache.move_to_end(key)
+            return cube
+    path = os.path.join(CUBE_DIR, f"{key}.npz")
+    cube = None
+    if os.path.exists(path):
+        try:
+            cube = FXRateCube.load(path, key)
+        except Exception:
+            cube = None  # corrupt/partial file: rebuild below
+    if cube is None:
+        cube = FXRateCube.build(fx_rates, key)
+        try:
+            cube.save(path)
+        except OSError:
+            pass  # read-only FS: still usable from memory
+    with _lock:
+        _cache[key] = cube
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return cube
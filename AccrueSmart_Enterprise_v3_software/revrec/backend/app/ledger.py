@@ -1,12 +1,113 @@
-import os, csv
+"""
+backend/app/ledger.py
+Append-only CSV journal. Entries are buffered in memory and written in
+batches: when `flush_every` entries are pending, `flush_interval` seconds
+after the first pending entry, on flush()/close() and at interpreter exit.
+Each batch is one append under an exclusive file lock (fcntl where
+available), so several workers or processes can share one file without
+interleaving rows.
+"""
+import atexit
+import csv
+import io
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process lock only
+    fcntl = None
+
+HEADER = ['period', 'debit', 'credit', 'amount', 'memo', 'contract_id']
+
+
 class CSVLedger:
-    def __init__(self, folder='./out', name='journal_entries.csv'):
-        self.folder=folder; os.makedirs(self.folder, exist_ok=True)
-        self.path=os.path.join(self.folder, name)
-        if not os.path.exists(self.path):
-            with open(self.path,'w',newline='') as f:
-                csv.writer(f).writerow(['period','debit','credit','amount','memo','contract_id'])
+    def __init__(self, folder='./out', name='journal_entries.csv', flush_every: int = 10000,
+                 flush_interval: float = 2.0):
+        self.folder = folder; os.makedirs(self.folder, exist_ok=True)
+        self.path = os.path.join(self.folder, name)
+        self.flush_every, self.flush_interval = flush_every, flush_interval
+        self._buf: List[List[Any]] = []
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._write_rows([])   # header for a new file
+        atexit.register(self.flush)
+
+    # ── Posting ──────────────────────────────────────────────────
+
     def post(self, period, debit, credit, amount, memo, contract_id):
-        with open(self.path,'a',newline='') as f:
-            csv.writer(f).writerow([period,debit,credit,f"{amount:.2f}",memo,contract_id])
-        return {'period':period,'debit':debit,'credit':credit,'amount':round(amount,2),'memo':memo,'contract_id':contract_id}
\ No newline at end of file
+        return self.post_many([{'period': period, 'debit': debit, 'credit': credit,
+                                'amount': amount, 'memo': memo, 'contract_id': contract_id}])[0]
+
+    def post_many(self, entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Buffer many entries (dicts with the post() fields); flushes as the buffer fills."""
+        posted = []
+        with self._lock:
+            for e in entries:
+                amount = float(e['amount'])
+                self._buf.append([e['period'], e['debit'], e['credit'], f"{amount:.2f}",
+                                  e.get('memo', ''), e.get('contract_id', '')])
+                posted.append({'period': e['period'], 'debit': e['debit'], 'credit': e['credit'],
+                               'amount': round(amount, 2), 'memo': e.get('memo', ''),
+                               'contract_id': e.get('contract_id', '')})
+                if len(self._buf) >= self.flush_every:
+                    self._flush_locked()
+            if self._buf and self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        return posted
+
+    @property
+    def pending(self) -> int:
+        return len(self._buf)
+
+    # ── Writing ──────────────────────────────────────────────────
+
+    def flush(self) -> int:
+        """Write everything buffered; returns the number of rows written."""
+        with self._lock:
+            return self._flush_locked()
+
+    def close(self) -> None:
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _flush_locked(self) -> int:
+        if self._timer is not None:
+            self._timer.cancel(); self._timer = None
+        rows, self._buf = self._buf, []
+        if rows:
+            self._write_rows(rows)
+        return len(rows)
+
+    def _write_rows(self, rows: List[List[Any]]) -> None:
+        with open(self.path, 'a', newline='') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                out = io.StringIO(); w = csv.writer(out)
+                if f.seek(0, os.SEEK_END) == 0:
+                    w.writerow(HEADER)
+                w.writerows(rows)
+                f.write(out.getvalue()); f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+# ── Shared ledgers ───────────────────────────────────────────────
+# One writer (and one buffer) per file per process.
+
+_ledgers: Dict[Tuple[str, str], CSVLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(folder='./out', name='journal_entries.csv') -> CSVLedger:
+    key = (os.path.abspath(folder), name)
+    with _ledgers_lock:
+        if key not in _ledgers:
+            _ledgers[key] = CSVLedger(folder, name)
+        return _ledgers[key]
@@ -1,12 +1,14 @@
 from fastapi import FastAPI, UploadFile, File, Body, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import Dict, List, Optional
+import io
 import os
 from datetime import date
-from .schemas import ContractIn, AllocationResponse, AllocResult, IngestResult, ConsolidationIn, PerformanceObligationIn
+from .schemas import ContractIn, AllocationResponse, AllocResult, IngestResult, ConsolidationIn, ConsolidationHeader, PerformanceObligationIn, GroupConsolidationIn, EntityTrial
 from . import engine as rev, ocr, ai, nlp_rules, sfc_effective, consolidation, reporting, variable
-from .ledger import CSVLedger
+from .ledger import get_ledger
 from .routers import tax  # add import
 #app.include_router(tax.router)
 from .routers import forecast   # add import
@@ -27,13 +29,16 @@ app.add_middleware(
 )
 
 # Then import and include routers (after app creation to avoid circular imports)
-from .routers import tax, forecast, auditor, costs, locks, leases, codes, schedules
+from .routers import tax, forecast, auditor, costs, locks, leases, codes, schedules, ingest, journals
 from .routers.disclosure_pack import router as disclosure_pack_router
 from .routers import audit
-from .db import init_db
+from .services import disclosure_jobs, entity_trials, gl_summary, ingest_cache, ingest_jobs, journals as journal_store
+from .db import init_db, db_pool_status
 
 # Initialize DB tables at startup
 init_db()
+ingest_jobs.resume_pending()
+disclosure_jobs.resume_pending()
 
 # Include all routers
 app.include_router(tax.router)
@@ -46,11 +51,16 @@ app.include_router(audit.router)
 app.include_router(leases.router)
 app.include_router(codes.router)
 app.include_router(schedules.router)
+app.include_router(ingest.router)
+app.include_router(journals.router)
 
 # Health check endpoint
 @app.get('/health')
 def health(): return {'ok':True}
 
+@app.get('/health/db')
+def health_db(): return db_pool_status()
+
 def build_allocation(contract: ContractIn) -> AllocationResponse:
     
     current_price = contract.transaction_price
@@ -197,7 +207,7 @@ def modify_catchup(base: ContractIn, modification: Dict):
     Endpoint to process a contract modification.
     """
     results = calculate_catchup_adjustment(base, modification)
-    ledger = CSVLedger(OUT_DIR)
+    ledger = get_ledger(OUT_DIR)
     je_data = results['journal_entry_data']
     
     je = ledger.post(
@@ -208,6 +218,12 @@ def modify_catchup(base: ContractIn, modification: Dict):
         memo=je_data['memo'],
         contract_id=base.contract_id
     )
+    ledger.flush()  # a single interactive entry: write it now
+    if base.entity or base.product_line or base.geography:
+        gl_summary.set_contract_attributes([{'contract_id': base.contract_id, 'entity': base.entity,
+                                             'product_line': base.product_line, 'geography': base.geography,
+                                             'currency': base.currency}])
+    journal_store.post_entries([je], source='catchup')
     
     results['journal_entry_posted'] = je
     
@@ -262,24 +278,82 @@ def sfc_export_csv(initial_carry: float = Body(...), payments: Dict[str, float]
 @app.post('/consolidation/multientity')
 def consolidate(inp: ConsolidationIn): return consolidation.consolidate(inp)
 
+@app.post('/consolidation/multientity/stream')
+def consolidate_stream(file: UploadFile = File(...)):
+    """NDJSON upload: header line (parent_currency, fx_rates, eliminations, ...) then one EntityTrial per line."""
+    try:
+        header, trials = consolidation.read_ndjson(io.TextIOWrapper(file.file, encoding='utf-8'))
+        return consolidation.consolidate_stream(header, trials)
+    except ValueError as e: raise HTTPException(status_code=400, detail=str(e))
+
+@app.post('/consolidation/multientity/db')
+def consolidate_from_db(header: ConsolidationHeader, entities: Optional[List[str]] = Body(default=None)):
+    """Consolidate entity trials stored in entity_trials (all entities unless a list is given)."""
+    return consolidation.consolidate_stream(header, entity_trials.iter_entity_trials(entities))
+
+@app.post('/consolidation/trials')
+def save_trials(trials: List[EntityTrial]): return entity_trials.save_entity_trials(trials)
+
+@app.post('/consolidation/groups')
+def consolidate_group(inp: GroupConsolidationIn):
+    try: return consolidation.register_group(inp).result()
+    except ValueError as e: raise HTTPException(status_code=400, detail=str(e))
+
+@app.get('/consolidation/groups/{group_id}')
+def get_group_consolidation(group_id: str):
+    try: return consolidation.get_group(group_id).result()
+    except KeyError as e: raise HTTPException(status_code=404, detail=str(e))
+
+@app.put('/consolidation/groups/{group_id}/entities')
+def update_group_entity(group_id: str, trial: EntityTrial):
+    """Late adjustment for one entity: re-consolidates only its path to the root."""
+    try: g = consolidation.get_group(group_id); path = g.update_entity(trial)
+    except KeyError as e: raise HTTPException(status_code=404, detail=str(e))
+    return {**g.result(path), 'recomputed': path}
+
+@app.put('/consolidation/groups/{group_id}/nodes/{node_id}/eliminations')
+def update_group_eliminations(group_id: str, node_id: str, eliminations: List[Dict] = Body(default=[]), intercompany: List[Dict] = Body(default=[])):
+    try: g = consolidation.get_group(group_id); path = g.update_eliminations(node_id, eliminations, intercompany)
+    except KeyError as e: raise HTTPException(status_code=404, detail=str(e))
+    return {**g.result(path), 'recomputed': path}
+
 @app.post('/ingest/pdf', response_model=IngestResult)
-async def ingest_pdf(file: UploadFile = File(...)):
-    b = await file.read(); result = ocr.extract_text_from_pdf_bytes(b)
-    # handle both (text, pages) and text-only returns
-    if isinstance(result, tuple): text, pages = result
-    else: text = result; pages = None
-    return analyze_text(file.filename, text)
+async def ingest_pdf(file: UploadFile = File(...), fast: bool = False):
+    """fast=true skips pdfminer layout analysis; findings carry the page they were found on.
+    Results are cached by file hash, page text by page digest (see services/ingest_cache.py)."""
+    b = await file.read()
+    # pdfminer, the rule scan and the cache queries are blocking: keep them off the event loop
+    return await run_in_threadpool(_ingest_pdf_bytes, file.filename, b, fast)
+
+def _ingest_pdf_bytes(filename:str, b:bytes, fast:bool)->IngestResult:
+    kind = 'pdf_fast' if fast else 'pdf'; key = ingest_cache.doc_key(b, kind)
+    hit = ingest_cache.get_result(key)
+    if hit is not None: return hit
+    pages = ingest_cache.extract_pages(b, fast=fast)
+    text, starts = ocr.join_pages(pages)
+    res = analyze_text(filename, text, page_starts=starts); res.pages = len(pages)
+    ingest_cache.put_result(key, kind, res, text=text, size=len(b))
+    return res
 
 @app.post('/ingest/text', response_model=IngestResult)
-def ingest_text(filename:str=Body(...), text:str=Body(...)): return analyze_text(filename, text)
+def ingest_text(filename:str=Body(...), text:str=Body(...)):
+    key = ingest_cache.doc_key(text.encode('utf-8'), 'text')
+    hit = ingest_cache.get_result(key)
+    if hit is not None: return hit
+    res = analyze_text(filename, text); ingest_cache.put_result(key, 'text', res, size=len(text))
+    return res
+
+@app.get('/ingest/cache')
+def ingest_cache_stats(): return ingest_cache.stats()
 
-def analyze_text(filename:str, text:str)->IngestResult:
+def analyze_text(filename:str, text:str, page_starts:Optional[List[int]]=None)->IngestResult:
     # prefer richer nlp_rules if available
     try:
-        standard, reason = nlp_rules.detect_standard(text)
-        currency = nlp_rules.find_currency(text); price = nlp_rules.find_total_price(text)
-        pos = nlp_rules.extract_pos(text); risks = nlp_rules.detect_risks(text)
-        comm = nlp_rules.extract_commission(text); recs = nlp_rules.recommendations(text)
+        r = nlp_rules.scan(text, page_starts)
+        standard, reason = r.standard, r.standard_reason
+        currency = r.currency; price = r.transaction_price
+        pos = r.pos; risks = r.risks
+        comm = r.commission; recs = r.recommendations
         if standard == 'ASC606': summary = nlp_rules.summarize_revenue(text); nonrev=None
         else: summary=None; nonrev = nlp_rules.summarize_nonrevenue(text)
     except Exception:
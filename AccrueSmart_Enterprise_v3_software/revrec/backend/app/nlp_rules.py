@@ -1,63 +1,186 @@
 import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from .util import to_float
 
-def find_currency(text:str):
-    m=re.search(r'\b(USD|EUR|GBP|INR|JPY|CAD|AUD)\b', text, re.I); return m.group(1).upper() if m else None
+# ── Rule tables ─────────────────────────────────────────────────
+# Every rule below is merged into one precompiled scanner (_MASTER) so a
+# document is read once: keywords share a single trie-shaped alternation
+# (looked up in _KEYWORD_HITS after the match), and rules that extract a span
+# (price, commission, risks) run as one zero-width lookahead so they never
+# hide keywords that overlap them. No two span rules can start on the same
+# character, which is what lets them share that lookahead.
 
-def find_total_price(text:str):
-    key = re.search(r'(transaction price|contract value|total consideration|total price)[^\$]{0,40}\$\s?([0-9,]+\.?[0-9]{0,2})', text, re.I)
-    if key: return to_float(key.group(2))
-    amounts=[a.replace(',','') for a in re.findall(r'\$\s?([0-9][0-9,]*\.?[0-9]{0,2})', text)]
-    nums=[float(a) for a in amounts] if amounts else []; return max(nums) if nums else None
+# Bump whenever a rule table or scan() output changes: cached ingest results
+# (services/ingest_cache.py) are keyed on it.
+RULES_VERSION = '1'
+
+# (standard, reason, substring keywords) in precedence order
+_STANDARD_RULES: List[Tuple[str, str, List[str]]] = [
+    ('ASC842', 'Contains lease terminology', ['lease term', 'right-of-use asset', 'rou asset', 'lease liability']),
+    ('ASC808', 'Collaborative arrangement indicators present', ['collaboration', 'co-development', 'co marketing']),
+    ('ASC610-20', 'Sale of nonfinancial assets indicated', ['nonfinancial asset', 'sale of property', 'intangible sale']),
+    ('ASC945/944', 'Insurance-like contract', ['insurance policy', 'premium', 'claims handler']),
+    ('ASC606', 'Customer contract indicators present', ['customer', 'deliver', 'performance obligation', 'support', 'subscription', 'license', 'maintenance', 'milestone', 'implementation']),
+]
+
+# (description, method, whole-word keywords) in per-line output order
+_PO_RULES: List[Tuple[str, str, List[str]]] = [
+    ('Hardware', 'point_in_time', ['hardware', 'device', 'equipment', 'handset']),
+    ('Software/Subscription', 'straight_line', ['software', 'license', 'subscription', 'saas']),
+    ('Maintenance/Support', 'straight_line', ['maintenance', 'support', 'warranty service']),
+    ('Implementation Services', 'milestone', ['implementation', 'setup', 'professional services', 'deployment']),
+    ('Construction Unit', 'percent_complete', ['construction', 'build', 'building', 'facility']),
+]
+
+_RISK_RULES: List[Tuple[str, str, str, str]] = [
+    ('right_of_return', r'right to return|returns? allowed|refund within \d+ days', 'high', 'Refund liability & variable consideration'),
+    ('acceptance', r'customer acceptance|acceptance testing|acceptance criteria', 'high', 'Defer until acceptance'),
+    ('bill_and_hold', r'bill and hold', 'high', 'Strict criteria before recognition'),
+    ('consignment', r'consignment|consignor|consignee', 'high', 'End-customer control triggers recognition'),
+    ('significant_financing', r'\b(?:apr|\d+% interest|financing arrangement)\b', 'medium', 'Consider SFC'),
+    ('nonrefundable_fee', r'nonrefundable (?:upfront )?fee', 'medium', 'Defer unless distinct'),
+]
+
+_CURRENCIES = ['USD', 'EUR', 'GBP', 'INR', 'JPY', 'CAD', 'AUD']
+_REC_KEYWORDS = ['right to return', 'restocking fee', 'acceptance', 'criteria']
+
+# keyword (lowercase) -> [(kind, payload, whole_word)]
+_KEYWORDS: Dict[str, List[Tuple[str, object, bool]]] = {}
+for _i, (_, _, _kws) in enumerate(_STANDARD_RULES):
+    for _k in _kws: _KEYWORDS.setdefault(_k, []).append(('std', _i, False))
+for _i, (_, _, _kws) in enumerate(_PO_RULES):
+    for _k in _kws: _KEYWORDS.setdefault(_k, []).append(('po', _i, True))
+for _c in _CURRENCIES: _KEYWORDS.setdefault(_c.lower(), []).append(('ccy', _c, True))
+for _k in _REC_KEYWORDS: _KEYWORDS.setdefault(_k, []).append(('rec', _k, False))
+
+# The trie alternation matches the longest keyword at a position, so a keyword
+# that is a prefix of another ('build' / 'building') is reported through the
+# longer one: matched keyword -> [(length, kind, payload, whole_word)] for it
+# and every keyword it starts with, shortest first.
+_KEYWORD_HITS: Dict[str, List[Tuple[int, str, object, bool]]] = {
+    _k: [(len(_p), *_hit) for _p in sorted(_KEYWORDS, key=len) if _k.startswith(_p) for _hit in _KEYWORDS[_p]]
+    for _k in _KEYWORDS}
+
+def _trie(words) -> str:
+    """Regex alternation factored as a prefix trie: sre rejects a position on
+    its first character instead of trying every keyword in turn."""
+    root: Dict = {}
+    for w in words:
+        d = root
+        for ch in w: d = d.setdefault(ch, {})
+        d[''] = {}
+    def emit(d: Dict) -> str:
+        alts = [re.escape(ch) + emit(sub) for ch, sub in sorted(d.items()) if ch]
+        if not alts: return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return f'(?:{body})?' if '' in d else body
+    return emit(root)
+
+# Patterns are written lowercase and run over text.lower(); _LOOKAHEAD_FIRST
+# is the set of first characters of the span rules (keep in sync) and lets
+# most positions skip the lookahead block with one class test.
+_LOOKAHEAD_FIRST = '[tcsrabnf0-9]'
+_PATTERN = '|'.join([
+    f'(?={_LOOKAHEAD_FIRST})(?=(?:' + '|'.join(
+        [r'(?P<price_key>(?:transaction price|contract value|total consideration|total price)[^\$]{0,40}\$\s?(?P<price_key_amt>[0-9,]+\.?[0-9]{0,2}))',
+         r'(?P<commission>(?:sales commission|commission)\s*(?:of|:)\s*\$\s?(?P<commission_amt>[0-9,]+\.?[0-9]{0,2}))']
+        + [f'(?P<risk{i}>{pat.lower()})' for i, (_, pat, _, _) in enumerate(_RISK_RULES)]) + '))',
+    r'\$\s?(?P<amount>[0-9][0-9,]*\.?[0-9]{0,2})',
+    '(?P<kw>' + _trie(_KEYWORDS) + ')',
+    r'(?P<nl>[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029])'])
+_MASTER = re.compile(_PATTERN)
+_MASTER_I = re.compile(_PATTERN, re.I)  # for the rare text whose lower() changes length
+
+_RECS = {
+    'right_of_return': {'issue':'Right of return','suggested_language':'Add restocking fee and defined return window; specify estimation method.','rationale':'Reduce reversal risk'},
+    'acceptance': {'issue':'Acceptance without criteria','suggested_language':'Define objective criteria and testing responsibility; link recognition to formal acceptance.','rationale':'Prevent premature recognition'},
+}
+
+def _is_word(ch: str) -> bool: return ch.isalnum() or ch == '_'
+
+@dataclass
+class ScanResult:
+    standard: str = 'Unknown'
+    standard_reason: str = 'No clear match; manual review needed'
+    currency: Optional[str] = None
+    transaction_price: Optional[float] = None
+    pos: List[Dict] = field(default_factory=list)
+    risks: List[Dict] = field(default_factory=list)
+    commission: Optional[float] = None
+    recommendations: List[Dict] = field(default_factory=list)
+
+def scan(text: str, page_starts: Optional[List[int]] = None) -> ScanResult:
+    """Extract standard, POs, risks, currency, price and commission in one pass over `text`.
+    With page_starts (offset of each page, see ocr.join_pages) POs and risks carry a 1-based 'page'."""
+    std_hits = set(); po_first: Dict[int, Tuple[int, int]] = {}; rec_hits = set(); risk_first: Dict[int, Tuple[int, int]] = {}
+    currency = None; price_key = None; commission = None; max_amount = None; line = 0; n = len(text)
+    low = text.lower()
+    matches = _MASTER.finditer(low) if len(low) == len(text) else _MASTER_I.finditer(text)
+    for m in matches:
+        g = m.lastgroup
+        if g == 'nl': line += 1
+        elif g == 'kw':
+            s = m.start(); left_ok = s == 0 or not _is_word(text[s-1])
+            for length, kind, payload, whole in _KEYWORD_HITS[m.group('kw').lower()]:
+                if whole:
+                    e = s + length
+                    if not (left_ok and (e == n or not _is_word(text[e]))): continue
+                if kind == 'std': std_hits.add(payload)
+                elif kind == 'po': po_first.setdefault(payload, (line, s))
+                elif kind == 'ccy':
+                    if currency is None: currency = payload
+                else: rec_hits.add(payload)
+        elif g == 'amount':
+            a = float(m.group('amount').replace(',', ''))
+            if max_amount is None or a > max_amount: max_amount = a
+        elif g == 'price_key':
+            if price_key is None: price_key = to_float(m.group('price_key_amt'))
+        elif g == 'commission':
+            if commission is None: commission = to_float(m.group('commission_amt'))
+        elif g.startswith('risk'):
+            i = int(g[4:])
+            if i not in risk_first: risk_first[i] = m.span(g)
+    out = ScanResult(currency=currency, commission=commission,
+                     transaction_price=price_key if price_key is not None else max_amount)
+    for i, (std, reason, _) in enumerate(_STANDARD_RULES):
+        if i in std_hits: out.standard, out.standard_reason = std, reason; break
+    for i in sorted(po_first, key=lambda i: (po_first[i][0], i)):
+        out.pos.append({'description': _PO_RULES[i][0], 'method': _PO_RULES[i][1]})
+        if page_starts: out.pos[-1]['page'] = bisect_right(page_starts, po_first[i][1])
+    for i, (key, _, sev, note) in enumerate(_RISK_RULES):
+        if i in risk_first:
+            s, e = risk_first[i]
+            out.risks.append({'type': key, 'snippet': text[max(0, s-30):e+30][:200], 'severity': sev, 'comment': note})
+            if page_starts: out.risks[-1]['page'] = bisect_right(page_starts, s)
+    if 'right to return' in rec_hits and 'restocking fee' not in rec_hits: out.recommendations.append(dict(_RECS['right_of_return']))
+    if 'acceptance' in rec_hits and 'criteria' not in rec_hits: out.recommendations.append(dict(_RECS['acceptance']))
+    return out
+
+# ── Single-rule entry points ────────────────────────────────────
+# Kept for older callers; new code should call scan() once. Consecutive calls
+# on the same text share one scan (the last result is memoized), and list
+# results are copies so callers can't alter the memoized scan.
+
+@lru_cache(maxsize=1)
+def _last_scan(text: str) -> ScanResult: return scan(text)
+
+def find_currency(text:str): return _last_scan(text).currency
+
+def find_total_price(text:str): return _last_scan(text).transaction_price
 
 def detect_standard(text:str):
-    t=text.lower()
-    if any(k in t for k in ['lease term','right-of-use asset','rou asset','lease liability']): return 'ASC842','Contains lease terminology'
-    if any(k in t for k in ['collaboration','co-development','co marketing']): return 'ASC808','Collaborative arrangement indicators present'
-    if any(k in t for k in ['nonfinancial asset','sale of property','intangible sale']): return 'ASC610-20','Sale of nonfinancial assets indicated'
-    if any(k in t for k in ['insurance policy','premium','claims handler']): return 'ASC945/944','Insurance-like contract'
-    if any(k in t for k in ['customer','deliver','performance obligation','support','subscription','license','maintenance','milestone','implementation']): return 'ASC606','Customer contract indicators present'
-    return 'Unknown','No clear match; manual review needed'
-
-def extract_pos(text:str):
-    out=[]; import re as _r
-    for line in text.splitlines():
-        l=line.strip()
-        if not l: continue
-        if _r.search(r'\b(hardware|device|equipment|handset)\b', l, _r.I): out.append({'description':'Hardware','method':'point_in_time'})
-        if _r.search(r'\b(software|license|subscription|saas)\b', l, _r.I): out.append({'description':'Software/Subscription','method':'straight_line'})
-        if _r.search(r'\b(maintenance|support|warranty service)\b', l, _r.I): out.append({'description':'Maintenance/Support','method':'straight_line'})
-        if _r.search(r'\b(implementation|setup|professional services|deployment)\b', l, _r.I): out.append({'description':'Implementation Services','method':'milestone'})
-        if _r.search(r'\b(construction|build|building|facility)\b', l, _r.I): out.append({'description':'Construction Unit','method':'percent_complete'})
-    seen=set(); dedup=[]
-    for po in out:
-        if po['description'] in seen: continue
-        seen.add(po['description']); dedup.append(po)
-    return dedup
-
-def detect_risks(text:str):
-    findings=[]; import re as _r
-    def add(t, s, sev='medium', c=None): findings.append({'type':t,'snippet':s[:200],'severity':sev,'comment':c})
-    pats=[('right_of_return', r'right to return|returns? allowed|refund within \d+ days', 'high', 'Refund liability & variable consideration'),
-          ('acceptance', r'customer acceptance|acceptance testing|acceptance criteria', 'high', 'Defer until acceptance'),
-          ('bill_and_hold', r'bill and hold', 'high', 'Strict criteria before recognition'),
-          ('consignment', r'consignment|consignor|consignee', 'high', 'End-customer control triggers recognition'),
-          ('significant_financing', r'\b(APR|\d+% interest|financing arrangement)\b', 'medium', 'Consider SFC'),
-          ('nonrefundable_fee', r'nonrefundable (upfront )?fee', 'medium', 'Defer unless distinct')]
-    for key, pat, sev, note in pats:
-        m=_r.search(pat, text, _r.I)
-        if m: add(key, text[m.start()-30:m.end()+30], sev, note)
-    return findings
-
-def extract_commission(text:str):
-    import re as _r; m=_r.search(r'(sales commission|commission)\s*(?:of|:)\s*\$\s?([0-9,]+\.?[0-9]{0,2})', text, _r.I); 
-    return to_float(m.group(2)) if m else None
-
-def recommendations(text:str):
-    recs=[]; low=text.lower()
-    if 'right to return' in low and 'restocking fee' not in low: recs.append({'issue':'Right of return','suggested_language':'Add restocking fee and defined return window; specify estimation method.','rationale':'Reduce reversal risk'})
-    if 'acceptance' in low and 'criteria' not in low: recs.append({'issue':'Acceptance without criteria','suggested_language':'Define objective criteria and testing responsibility; link recognition to formal acceptance.','rationale':'Prevent premature recognition'})
-    return recs
+    r=_last_scan(text); return r.standard, r.standard_reason
+
+def extract_pos(text:str): return [dict(p) for p in _last_scan(text).pos]
+
+def detect_risks(text:str): return [dict(x) for x in _last_scan(text).risks]
+
+def extract_commission(text:str): return _last_scan(text).commission
+
+def recommendations(text:str): return [dict(x) for x in _last_scan(text).recommendations]
 
 def summarize_revenue(text:str):
     lines=[l.strip() for l in text.splitlines() if l.strip()]; preview=' '.join(lines[:8])[:600]
@@ -65,4 +188,4 @@ def summarize_revenue(text:str):
 
 def summarize_nonrevenue(text:str):
     lines=[l.strip() for l in text.splitlines() if l.strip()]; preview=' '.join(lines[:8])[:600]
-    return f"This document likely falls outside ASC 606. Route to appropriate guidance. Excerpt: {preview}..."
\ No newline at end of file
+    return f"This document likely falls outside ASC 606. Route to appropriate guidance. Excerpt: {preview}..."
@@ -1,6 +1,85 @@
-from io import BytesIO
-from typing import Tuple
-from pdfminer.high_level import extract_text
+from io import BytesIO, StringIO
+import hashlib
+from itertools import repeat
+from typing import List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from pdfminer.psparser import PSLiteral
 
-def extract_text_from_pdf_bytes(b: bytes) -> Tuple[str, int]:
-    text = extract_text(BytesIO(b)) or ""; pages = text.count('\f') + 1 if text else 0; return text, pages
+# (page_number, text), page numbers are 1-based
+PageText = Tuple[int, str]
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "0")) or (os.cpu_count() or 1)
+# below this many pages the process pool costs more than it saves
+PARALLEL_MIN_PAGES = int(os.getenv("OCR_PARALLEL_MIN_PAGES", "8"))
+
+def page_count(b: bytes) -> int:
+    return sum(1 for _ in PDFPage.get_pages(BytesIO(b)))
+
+def _feed(h, obj, seen: set) -> None:
+    """Hash a PDF object graph: dict keys sorted, streams by raw (undecoded)
+    bytes, shared indirect objects hashed once per walk."""
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen: h.update(b'R%d' % obj.objid); return
+        seen.add(obj.objid); obj = obj.resolve()
+    if isinstance(obj, PDFStream):
+        _feed(h, obj.attrs, seen); h.update(b'S'); h.update(obj.rawdata or b'')
+    elif isinstance(obj, dict):
+        h.update(b'{')
+        for k in sorted(obj): h.update(str(k).encode()); _feed(h, obj[k], seen)
+        h.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        h.update(b'[')
+        for v in obj: _feed(h, v, seen)
+        h.update(b']')
+    elif isinstance(obj, PSLiteral): h.update(b'/' + str(obj.name).encode())
+    else: h.update(repr(obj).encode())
+
+def page_digests(b: bytes) -> List[str]:
+    """One sha256 per page over everything its text depends on (content streams,
+    resources incl. fonts, media box, rotation). Unchanged pages of a redline
+    keep their digest, so their extracted text can be reused."""
+    out: List[str] = []
+    for page in PDFPage.get_pages(BytesIO(b)):
+        h = hashlib.sha256(); seen: set = set()
+        for c in page.contents: _feed(h, c, seen)
+        _feed(h, page.resources, seen); _feed(h, [page.mediabox, page.rotate], seen)
+        out.append(h.hexdigest())
+    return out
+
+def _extract_range(b: bytes, pagenos: Sequence[int], fast: bool) -> List[PageText]:
+    """Extract the given 0-based pages. fast=True skips layout analysis (no
+    LAParams): text comes out in content-stream order, several times quicker."""
+    rsrc = PDFResourceManager(caching=True); laparams = None if fast else LAParams(); out: List[PageText] = []
+    for pageno, page in zip(sorted(pagenos), PDFPage.get_pages(BytesIO(b), set(pagenos))):
+        buf = StringIO(); device = TextConverter(rsrc, buf, laparams=laparams)
+        PDFPageInterpreter(rsrc, device).process_page(page); device.close()
+        out.append((pageno + 1, buf.getvalue().rstrip('\f')))
+    return out
+
+def extract_pages_from_pdf_bytes(b: bytes, fast: bool = False, workers: Optional[int] = None,
+                                 pagenos: Optional[Sequence[int]] = None) -> List[PageText]:
+    """Per-page text. Large documents are split into contiguous page ranges and
+    extracted in a process pool; pass workers=1 to stay in-process."""
+    pagenos = list(range(page_count(b))) if pagenos is None else sorted(pagenos)
+    workers = min(workers or OCR_WORKERS, len(pagenos))
+    if workers <= 1 or len(pagenos) < PARALLEL_MIN_PAGES: return _extract_range(b, pagenos, fast)
+    size = -(-len(pagenos) // workers)
+    ranges = [pagenos[i:i + size] for i in range(0, len(pagenos), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [p for chunk in pool.map(_extract_range, repeat(b), ranges, repeat(fast)) for p in chunk]
+
+def join_pages(pages: List[PageText]) -> Tuple[str, List[int]]:
+    """Concatenate page texts with form feeds; also return each page's start offset."""
+    starts: List[int] = []; parts: List[str] = []; pos = 0
+    for _, t in pages:
+        starts.append(pos); parts.append(t + '\f'); pos += len(t) + 1
+    return ''.join(parts), starts
+
+def extract_text_from_pdf_bytes(b: bytes, fast: bool = False) -> Tuple[str, int]:
+    pages = extract_pages_from_pdf_bytes(b, fast=fast); return join_pages(pages)[0], len(pages)
@@ -3,10 +3,11 @@ from typing import Optional, List
 from . import nlp_rules, ai
 from .schemas import IngestResult, ExtractedPO, RiskFinding, Recommendation
 
-def run_contract_parsing(text: str) -> IngestResult:
+def run_contract_parsing(text: str, page_starts: Optional[List[int]] = None) -> IngestResult:
     """
     Executes the contract parsing pipeline, attempting to use nlp_rules first
     and falling back to the AI module if nlp_rules encounter an exception.
+    page_starts (from ocr.join_pages) tags findings with their page number.
     """
     standard: Optional[str] = None
     standard_reason: Optional[str] = None
@@ -19,13 +20,14 @@ def run_contract_parsing(text: str) -> IngestResult:
     revenue_summary: Optional[str] = None
     nonrevenue_summary: Optional[str] = None
     try:
-        standard, standard_reason = nlp_rules.detect_standard(text)
-        currency = nlp_rules.find_currency(text)
-        transaction_price = nlp_rules.find_total_price(text)
-        performance_obligations = nlp_rules.extract_pos(text)
-        risks = nlp_rules.detect_risks(text)
-        commissions = nlp_rules.extract_commission(text)
-        recommendations = nlp_rules.recommendations(text)
+        scanned = nlp_rules.scan(text, page_starts)
+        standard, standard_reason = scanned.standard, scanned.standard_reason
+        currency = scanned.currency
+        transaction_price = scanned.transaction_price
+        performance_obligations = scanned.pos
+        risks = scanned.risks
+        commissions = scanned.commission
+        recommendations = scanned.recommendations
         if standard == 'ASC606':
             revenue_summary = nlp_rules.summarize_revenue(text)
             nonrevenue_summary = None
@@ -53,26 +53,13 @@ def ai_audit_insights():
     # If database is available, fetch actual data
     if get_session is not None:
         try:
-            with get_session() as session:
-                # Example query - adjust based on your actual schema
-                # from sqlmodel import select
-                # from ..models import JournalEntry
-                # 
-                # total = session.exec(select(func.count(JournalEntry.id))).one()
-                # posted = session.exec(select(func.count(JournalEntry.id)).where(JournalEntry.posted == True)).one()
-                # 
-                # stats.total_journals = total or 0
-                # stats.posted_journals = posted or 0
-                # stats.unposted_journals = (total or 0) - (posted or 0)
-                
-                # For now, mock data
-                stats.total_journals = 42
-                stats.posted_journals = 38
-                stats.unposted_journals = 4
-                
+            from ..services.journals import journal_stats
+            counts = journal_stats()
+            stats.total_journals = counts["total_journals"]
+            stats.posted_journals = counts["posted_journals"]
+            stats.unposted_journals = counts["unposted_journals"]
         except Exception as e:
             print(f"Database error: {e}")
-            # Continue with mock data
             pass
     
     # Basic validation and anomaly detection
@@ -3,15 +3,21 @@ backend/app/routers/codes.py
 CRUD for product codes, revrec codes, and mapping.
 """
 from fastapi import APIRouter, Body, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from ..auth import require
 from ..services.codes_crud import (
     list_products as db_list_products,
-    create_product as db_create_product,
+    acreate_product as db_create_product,
     list_revrec_codes as db_list_revrec_codes,
-    create_revrec_code as db_create_revrec_code,
-    map_product_to_revrec as db_map_product_to_revrec,
+    acreate_revrec_code as db_create_revrec_code,
+    aupdate_revrec_code as db_update_revrec_code,
+    amap_product_to_revrec as db_map_product_to_revrec,
+    resolve as db_resolve,
 )
 
+# list/resolve read the cached catalog; a cache miss loads it with the sync
+# session, so they run in the threadpool. Writes use the async session.
+
 router = APIRouter(prefix="/codes", tags=["codes"])
 
 
@@ -19,7 +25,7 @@ router = APIRouter(prefix="/codes", tags=["codes"])
 @router.get("/products")
 @require(perms=["product.manage"])
 async def get_products():
-    return db_list_products()
+    return await run_in_threadpool(db_list_products)
 
 
 @router.post("/products")
@@ -31,7 +37,7 @@ async def create_product(payload: dict):
     if not code or not name:
         raise HTTPException(400, "code and name required")
     try:
-        return db_create_product(code, name, desc)
+        return await db_create_product(code, name, desc)
     except ValueError as e:
         raise HTTPException(409, str(e))
     except Exception as e:
@@ -42,7 +48,7 @@ async def create_product(payload: dict):
 @router.get("/revrec")
 @require(perms=["revrec.manage"])
 async def get_revrec_codes():
-    return db_list_revrec_codes()
+    return await run_in_threadpool(db_list_revrec_codes)
 
 
 @router.post("/revrec")
@@ -52,13 +58,25 @@ async def create_revrec(code: str, rule_type: str, payload: dict = Body(default=
     if not code or not rule_type:
         raise HTTPException(400, "code and rule_type required")
     try:
-        return db_create_revrec_code(code, rule_type, payload)
+        return await db_create_revrec_code(code, rule_type, payload)
     except ValueError as e:
         raise HTTPException(409, str(e))
     except Exception as e:
         raise HTTPException(400, str(e))
 
 
+@router.put("/revrec/{code}")
+@require(perms=["revrec.manage"])
+async def update_revrec(code: str, payload: dict = Body(default={})):
+    """Body: { rule_type?, params? }. Schedules using the code are marked dirty."""
+    try:
+        return await db_update_revrec_code(code, payload.get("rule_type"), payload.get("params"))
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+    except Exception as e:
+        raise HTTPException(400, str(e))
+
+
 # ----- Mapping -----
 @router.post("/map")
 @require(perms=["revrec.manage"])
@@ -67,8 +85,18 @@ async def map_product_revrec(product_code: str, revrec_code: str):
     if not product_code or not revrec_code:
         raise HTTPException(400, "product_code and revrec_code required")
     try:
-        return db_map_product_to_revrec(product_code, revrec_code)
+        return await db_map_product_to_revrec(product_code, revrec_code)
     except ValueError as e:
         raise HTTPException(404, str(e))
     except Exception as e:
         raise HTTPException(400, str(e))
+
+
+@router.get("/resolve/{product_code}")
+@require(perms=["revrec.manage"])
+async def resolve_product(product_code: str):
+    """Recognition rule a product maps to (served from the cached code catalog)."""
+    rule = await run_in_threadpool(db_resolve, product_code)
+    if rule is None:
+        raise HTTPException(404, f"No revrec code mapped to product '{product_code}'")
+    return rule
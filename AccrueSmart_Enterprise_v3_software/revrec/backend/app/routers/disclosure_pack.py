@@ -1,5 +1,6 @@
 # backend/app/routers/disclosure_pack.py
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, landscape
@@ -8,15 +9,33 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.units import inch
 from datetime import datetime
 import os
-from typing import List, Dict, Any
-import json
-from ..schemas import ContractIn, AllocResult
+import re
+from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+from ..auth import require
+from ..schemas import ContractIn
 # from ..reporting import summarize_schedules
 from ..engine import build_allocation
+from ..services import disclosure_jobs, disclosures
 
 # Router for disclosure pack endpoint
 router = APIRouter(prefix="/reports", tags=["disclosure-pack"])
 
+_PERIOD_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# One style shared by every disclosure table (TableStyle is read-only once built)
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
 # Class to generate disclosure pack reports
 class DisclosurePackGenerator:
     # Initialize with output directory
@@ -25,21 +44,10 @@ class DisclosurePackGenerator:
         os.makedirs(output_dir, exist_ok=True)
         self.styles = getSampleStyleSheet()
         
-        # Custom styles
-        self.styles.add(ParagraphStyle(
-            name='Heading1',
-            parent=self.styles['Heading1'],
-            fontSize=14,
-            spaceAfter=12,
-            textColor=colors.darkblue
-        ))
-        self.styles.add(ParagraphStyle(
-            name='Heading2',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            spaceAfter=6,
-            textColor=colors.darkblue
-        ))
+        # Custom styles (Heading1/Heading2 already exist in the sample sheet)
+        for name, size, after in (('Heading1', 14, 12), ('Heading2', 12, 6)):
+            style = self.styles[name]
+            style.fontSize, style.spaceAfter, style.textColor = size, after, colors.darkblue
         self.styles.add(ParagraphStyle(
             name='Body',
             parent=self.styles['BodyText'],
@@ -48,51 +56,52 @@ class DisclosurePackGenerator:
         ))
     
     # Generate ASC 606 Revenue from Contracts with Customers disclosure
-    def generate_asc_606_disclosure(self, story, contracts: List[Dict]):
-        """Generate ASC 606 Revenue from Contracts with Customers disclosure"""
+    def generate_asc_606_disclosure(self, story, data: Dict, contracts: List[Dict] = None):
+        """Generate ASC 606 Revenue from Contracts with Customers disclosure.
+        `data` is services.disclosures.asc606(); explicit `contracts` replace the
+        stored-schedule disaggregation with their allocated transaction price."""
         story.append(Paragraph("ASC 606 - Revenue from Contracts with Customers", self.styles['Heading1']))
         story.append(Spacer(1, 0.2*inch))
         
         # Revenue Disaggregation
         story.append(Paragraph("Revenue Disaggregation", self.styles['Heading2']))
-        revenue_data = self._aggregate_revenue_by_category(contracts)
+        revenue_data = self._aggregate_revenue_by_category(contracts) if contracts else data.get('revenue')
         if revenue_data:
             story.append(self._create_revenue_table(revenue_data))
         
         # Contract Balances Rollforward
         story.append(Paragraph("Contract Balances", self.styles['Heading2']))
-        balance_data = self._calculate_contract_balances(contracts)
+        balance_data = data.get('balances')
         if balance_data:
             story.append(self._create_balances_table(balance_data))
         
         # Remaining Performance Obligations
         story.append(Paragraph("Remaining Performance Obligations", self.styles['Heading2']))
-        rpo_data = self._calculate_rpo(contracts)
+        rpo_data = data.get('rpo')
         if rpo_data:
             story.append(self._create_rpo_table(rpo_data))
         
         story.append(PageBreak())
     
     # Generate ASC 842 Leases disclosure
-    def generate_asc_842_disclosure(self, story, leases: List[Dict]):
-        """Generate ASC 842 Leases disclosure"""
+    def generate_asc_842_disclosure(self, story, leases: Dict):
+        """Generate ASC 842 Leases disclosure from services.disclosures.lease_aggregates()"""
         story.append(Paragraph("ASC 842 - Leases", self.styles['Heading1']))
         story.append(Spacer(1, 0.2*inch))
         
-        if not leases:
+        if not leases or not leases.get('balances'):
             story.append(Paragraph("No lease contracts identified.", self.styles['Body']))
             story.append(PageBreak())
             return
         
         # Lease Assets and Liabilities
         story.append(Paragraph("Lease Assets and Liabilities", self.styles['Heading2']))
-        lease_data = self._aggregate_lease_data(leases)
-        story.append(self._create_lease_table(lease_data))
+        story.append(self._create_lease_table(leases['balances']))
         
         # Lease Expense
         story.append(Paragraph("Lease Expense", self.styles['Heading2']))
-        expense_data = self._calculate_lease_expense(leases)
-        story.append(self._create_lease_expense_table(expense_data))
+        if leases.get('expense'):
+            story.append(self._create_lease_expense_table(leases['expense']))
         
         story.append(PageBreak())
 
@@ -147,17 +156,7 @@ class DisclosurePackGenerator:
             ])
         
         table = Table(table_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(TABLE_STYLE)
         return table
 
     # Create contract balances table
@@ -176,17 +175,7 @@ class DisclosurePackGenerator:
             ])
         
         table = Table(table_data, colWidths=[1.5*inch] + [1*inch]*4)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(TABLE_STYLE)
         return table
 
     # Create remaining performance obligations table
@@ -199,17 +188,7 @@ class DisclosurePackGenerator:
             table_data.append([period, f"${amount:,.2f}"])
         
         table = Table(table_data, colWidths=[2*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(TABLE_STYLE)
         return table
 
     # Create lease disclosure table
@@ -227,17 +206,7 @@ class DisclosurePackGenerator:
             ])
         
         table = Table(table_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(TABLE_STYLE)
         return table
 
     # Create lease expense table
@@ -254,17 +223,7 @@ class DisclosurePackGenerator:
             ])
         
         table = Table(table_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(TABLE_STYLE)
         return table
 
     # Create stock option activity table
@@ -281,122 +240,99 @@ class DisclosurePackGenerator:
             ])
         
         table = Table(table_data, colWidths=[2*inch, 1.5*inch, 1.5*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        table.setStyle(TABLE_STYLE)
+        return table
+
+    # Create lease expense table
+    def _create_lease_expense_table(self, data: List[Dict]) -> Table:
+        """Create lease expense table"""
+        headers = ['Lease Cost', 'Amount']
+        table_data = [headers]
+        
+        for item in data:
+            table_data.append([item['expense_type'], f"${item['amount']:,.2f}"])
+        
+        table = Table(table_data, colWidths=[2.5*inch, 1.5*inch])
+        table.setStyle(TABLE_STYLE)
+        return table
+
+    # Create tax provision reconciliation table
+    def _create_tax_reconciliation_table(self, data) -> Table:
+        """Create tax provision reconciliation table ({item: amount} or [{item, amount}])"""
+        headers = ['Reconciling Item', 'Amount']
+        table_data = [headers]
+        
+        items = data.items() if isinstance(data, dict) else ((d['item'], d['amount']) for d in data)
+        for item, amount in items:
+            table_data.append([str(item).replace('_', ' ').title(), f"${amount:,.2f}"])
+        
+        table = Table(table_data, colWidths=[2.5*inch, 1.5*inch])
+        table.setStyle(TABLE_STYLE)
         return table
 
     # Create compensation expense table
+    def _create_compensation_expense_table(self, data) -> Table:
+        """Create stock-based compensation expense table ({line: amount} or [{category, amount}])"""
+        headers = ['Expense Line', 'Amount']
+        table_data = [headers]
+        
+        items = data.items() if isinstance(data, dict) else ((d['category'], d['amount']) for d in data)
+        for line, amount in items:
+            table_data.append([str(line).replace('_', ' ').title(), f"${amount:,.2f}"])
+        
+        table = Table(table_data, colWidths=[2.5*inch, 1.5*inch])
+        table.setStyle(TABLE_STYLE)
+        return table
+
+    # Aggregate allocated transaction price of explicit contracts by category
     def _aggregate_revenue_by_category(self, contracts: List[Dict]) -> List[Dict]:
-        """Aggregate revenue by category for disclosure"""
-        # This would integrate with your existing revenue aggregation logic
-        # Placeholder implementation
-        categories = {
-            'Product Sales': {'current': 0, 'prior': 0},
-            'Service Revenue': {'current': 0, 'prior': 0},
-            'License Fees': {'current': 0, 'prior': 0},
-            'Maintenance & Support': {'current': 0, 'prior': 0}
-        }
-        
-        # Aggregate revenue from contracts
+        """Aggregate allocated transaction price by category for the given contracts"""
+        categories: Dict[str, float] = {}
         for contract in contracts:
-            allocation = build_allocation(contract)
-            for po in allocation.allocations:
-                category = self._categorize_po(po.description)
-                categories[category]['current'] += po.allocated_price
-        
-        result = []
-        for category, amounts in categories.items():
-            if amounts['current'] > 0:
-                variance = ((amounts['current'] - amounts['prior']) / amounts['prior'] * 100) if amounts['prior'] else 0
-                result.append({
-                    'category': category,
-                    'current': amounts['current'],
-                    'prior': amounts['prior'],
-                    'variance': variance
-                })
-        
-        return result
+            contract = contract if isinstance(contract, ContractIn) else ContractIn(**contract)
+            descriptions = {po.po_id: po.description for po in contract.pos}
+            for po in build_allocation(contract).allocated:
+                category = self._categorize_po(descriptions.get(po.po_id, ''))
+                categories[category] = categories.get(category, 0.0) + float(po.allocated_price)
+        
+        return [{'category': category, 'current': amount, 'prior': 0.0, 'variance': 0.0}
+                for category, amount in sorted(categories.items()) if amount]
 
     # Categorize performance obligation
     def _categorize_po(self, description: str) -> str:
         """Categorize performance obligation based on description"""
-        desc_lower = description.lower()
-        if any(word in desc_lower for word in ['device', 'product', 'hardware', 'equipment']):
-            return 'Product Sales'
-        elif any(word in desc_lower for word in ['service', 'support', 'maintenance']):
-            return 'Maintenance & Support'
-        elif any(word in desc_lower for word in ['license', 'software', 'subscription']):
-            return 'License Fees'
-        else:
-            return 'Service Revenue'
+        return disclosures.categorize(description)
 
-    # Calculate contract balances
-    def _calculate_contract_balances(self, contracts: List[Dict]) -> Dict:
-        """Calculate contract balances for disclosure"""
-        # Placeholder implementation - integrate with your balance calculation logic
-        return {
-            'deferred_revenue': {
-                'beginning': 100000,
-                'additions': 50000,
-                'recognized': 30000,
-                'ending': 120000
-            },
-            'contract_assets': {
-                'beginning': 15000,
-                'additions': 8000,
-                'recognized': 5000,
-                'ending': 18000
-            }
-        }
-
-    # Calculate remaining performance obligations
-    def _calculate_rpo(self, contracts: List[Dict]) -> Dict:
-        """Calculate remaining performance obligations"""
-        # Placeholder implementation
-        return {
-            'Next 12 months': 75000,
-            '13-24 months': 45000,
-            '25-36 months': 25000,
-            'Beyond 36 months': 15000
-        }
-
-    # Aggregate lease data
-    def _aggregate_lease_data(self, leases: List[Dict]) -> List[Dict]:
-        """Aggregate lease data for disclosure"""
-        # Placeholder implementation
-        return [
-            {'type': 'Operating Leases', 'assets': 250000, 'liabilities': 245000, 'term': 60},
-            {'type': 'Finance Leases', 'assets': 150000, 'liabilities': 148000, 'term': 48}
-        ]
+    # Resolve one section's input data to what its tables print
+    def prepare_section(self, name: str, data: Dict) -> Dict:
+        """Data render_section builds the section from, with the costly parts
+        done: explicit asc606 contracts are allocated and aggregated here"""
+        if name == 'asc606' and data.get('contracts'):
+            figures = dict(data.get('figures') or {})
+            figures['revenue'] = self._aggregate_revenue_by_category(data['contracts'])
+            return {'figures': figures, 'contracts': []}
+        return data
 
-    # Calculate lease expense
-    def _calculate_lease_expense(self, leases: List[Dict]) -> List[Dict]:
-        """Calculate lease expense for disclosure"""
-        # Placeholder implementation
-        return [
-            {'expense_type': 'Operating Lease Cost', 'amount': 45000},
-            {'expense_type': 'Finance Lease Interest', 'amount': 12000},
-            {'expense_type': 'Finance Lease Amortization', 'amount': 18000},
-            {'expense_type': 'Variable Lease Payments', 'amount': 8000}
-        ]
+    # Render one section from its input data
+    def render_section(self, name: str, data: Dict) -> List:
+        """Render one section (asc606 | asc842 | asc740 | asc718) to its flowables.
+        asc606 data is {'figures': services.disclosures.asc606(), 'contracts': [...]}"""
+        story = []
+        if name == 'asc606':
+            self.generate_asc_606_disclosure(story, data.get('figures') or {}, data.get('contracts'))
+        elif name == 'asc842':
+            self.generate_asc_842_disclosure(story, data or {})
+        elif name == 'asc740':
+            self.generate_asc_740_disclosure(story, data or {})
+        elif name == 'asc718':
+            self.generate_asc_718_disclosure(story, data or {})
+        else:
+            raise ValueError(f"Unknown disclosure section '{name}'")
+        return story
 
-    # Calculate lease expense table
-    def generate_disclosure_pack(self, 
-                               contracts: List[Dict] = None,
-                               leases: List[Dict] = None,
-                               tax_data: Dict = None,
-                               compensation_data: Dict = None,
-                               filename: str = None) -> str:
-        """Generate comprehensive disclosure pack PDF"""
+    # Assemble the disclosure pack PDF from rendered sections
+    def assemble(self, sections: List[List], as_of: str = None, filename: str = None) -> str:
+        """Title page plus the given section flowables, in order"""
         
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -416,71 +352,86 @@ class DisclosurePackGenerator:
             alignment=1  # Center
         )
         story.append(Paragraph("Financial Statement Disclosures", title_style))
-        story.append(Paragraph(f"As of {datetime.now().strftime('%B %d, %Y')}", self.styles['Heading2']))
+        as_of = datetime.strptime(as_of, '%Y-%m') if as_of else datetime.now()
+        story.append(Paragraph(f"As of {as_of.strftime('%B %Y')}", self.styles['Heading2']))
         story.append(Spacer(1, 0.5*inch))
         story.append(Paragraph("Generated by AccrueSmart AI Accounting System", self.styles['Body']))
         story.append(PageBreak())
         
-        # Generate disclosures for each standard
-        self.generate_asc_606_disclosure(story, contracts or [])
-        self.generate_asc_842_disclosure(story, leases or [])
-        self.generate_asc_740_disclosure(story, tax_data or {})
-        self.generate_asc_718_disclosure(story, compensation_data or {})
+        for section in sections:
+            story.extend(section)
         
         # Build PDF
         doc.build(story)
         return filepath
 
-# FastAPI endpoint
-@router.post("/disclosure-pack")
-async def generate_disclosure_pack(
-    contract_ids: List[str] = None,
-    include_leases: bool = True,
-    include_taxes: bool = True,
+    # Generate the disclosure pack PDF in one go (no job)
+    def generate_disclosure_pack(self, 
+                               asc606: Dict = None,
+                               leases: Dict = None,
+                               tax_data: Dict = None,
+                               compensation_data: Dict = None,
+                               filename: str = None,
+                               contracts: List[Dict] = None) -> str:
+        """Generate comprehensive disclosure pack PDF"""
+        sections = [
+            self.render_section('asc606', {'figures': asc606 or {}, 'contracts': contracts}),
+            self.render_section('asc842', leases or {}),
+            self.render_section('asc740', tax_data or {}),
+            self.render_section('asc718', compensation_data or {}),
+        ]
+        return self.assemble(sections, as_of=(asc606 or {}).get('period_to'), filename=filename)
+
+# Request body for the disclosure pack
+class DisclosurePackIn(BaseModel):
+    period_from: Optional[str] = Field(None, examples=["2025-01"])   # default: January of period_to's year
+    period_to: Optional[str] = Field(None, examples=["2025-12"])     # default: current month
+    contracts: List[ContractIn] = []          # optional: disaggregate these contracts' allocations instead
+    leases: List[Dict[str, Any]] = []         # /leases/schedule payloads + "classification"
+    tax_data: Dict[str, Any] = {}
+    compensation_data: Dict[str, Any] = {}
+    include_leases: bool = True
+    include_taxes: bool = True
     include_compensation: bool = True
-):
-    """Generate comprehensive disclosure pack PDF"""
-    
+
+
+# FastAPI endpoints
+@router.post("/disclosure-pack")
+@require(perms=["revrec.export"])
+async def generate_disclosure_pack(body: DisclosurePackIn):
+    """Queue a disclosure pack; returns a job id immediately. Poll
+    /reports/disclosure-pack/jobs/{job_id}, then download the PDF."""
+    period_to = body.period_to or datetime.now().strftime('%Y-%m')
+    period_from = body.period_from or f"{period_to[:4]}-01"
+    for name, value in (("period_to", period_to), ("period_from", period_from)):
+        if not _PERIOD_RE.match(value):
+            raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM, got '{value}'")
+    if period_from > period_to:
+        raise HTTPException(status_code=400, detail="period_from must not be after period_to")
+    req = body.model_dump() if hasattr(body, "model_dump") else body.dict()
+    return await run_in_threadpool(disclosure_jobs.create_job, req, period_from, period_to)
+
+
+@router.get("/disclosure-pack/jobs/{job_id}")
+@require(perms=["revrec.export"])
+async def disclosure_job_status(job_id: str):
     try:
-        generator = DisclosurePackGenerator()
-        
-        # Get contracts from repository
-        from ..repository import get_many
-        contracts = get_many(contract_ids) if contract_ids else []
-        
-        # Get additional data (placeholders - integrate with your services)
-        leases = []
-        tax_data = {}
-        compensation_data = {}
-        
-        if include_leases:
-            # Integrate with your leases service
-            from ..services.leases import get_lease_data
-            leases = get_lease_data()  # Implement this in your leases service
-        
-        if include_taxes:
-            # Integrate with your tax service
-            from ..services.asc740 import get_tax_disclosure_data
-            tax_data = get_tax_disclosure_data()  # Implement this in your tax service
-        
-        if include_compensation:
-            # Integrate with your compensation service
-            from ..services.asc718 import get_compensation_data
-            compensation_data = get_compensation_data()  # Implement this if you have ASC 718 service
-        
-        # Generate PDF
-        filepath = generator.generate_disclosure_pack(
-            contracts=contracts,
-            leases=leases,
-            tax_data=tax_data,
-            compensation_data=compensation_data
-        )
-        
-        return FileResponse(
-            filepath,
-            media_type='application/pdf',
-            filename=os.path.basename(filepath)
-        )
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating disclosure pack: {str(e)}")
\ No newline at end of file
+        return await run_in_threadpool(disclosure_jobs.get_job, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/disclosure-pack/jobs/{job_id}/download")
+@require(perms=["revrec.export"])
+async def download_disclosure_pack(job_id: str):
+    try:
+        filepath = await run_in_threadpool(disclosure_jobs.job_file, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FileResponse(
+        filepath,
+        media_type='application/pdf',
+        filename=f"disclosure_pack_{job_id}.pdf"
+    )
@@ -0,0 +1,40 @@
+"""
+backend/app/routers/ingest.py
+Bulk ingest jobs: submit a batch of contracts, poll status, page through results.
+"""
+from __future__ import annotations
+from typing import List
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from ..auth import require
+from ..services import ingest_jobs
+
+router = APIRouter(prefix="/ingest", tags=["ingest"])
+
+
+@router.post("/jobs")
+@require(perms=["deal.view"])
+async def submit_job(files: List[UploadFile] = File(...), fast: bool = False):
+    """Returns immediately with a job id; files are parsed in the ingest worker pool."""
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    return await run_in_threadpool(ingest_jobs.create_job, [(f.filename, f.file) for f in files], fast)
+
+
+@router.get("/jobs/{job_id}")
+@require(perms=["deal.view"])
+async def job_status(job_id: str):
+    try:
+        return await run_in_threadpool(ingest_jobs.get_job, job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/jobs/{job_id}/results")
+@require(perms=["deal.view"])
+async def job_results(job_id: str, offset: int = 0, limit: int = 100):
+    try:
+        return await run_in_threadpool(ingest_jobs.get_job_results, job_id, offset, min(limit, 1000))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
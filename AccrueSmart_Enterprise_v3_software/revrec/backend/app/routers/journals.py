@@ -0,0 +1,112 @@
+"""
+backend/app/routers/journals.py
+Journal subledger: bulk posting, trial balance, account activity, contract history.
+"""
+from __future__ import annotations
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from ..auth import require
+from ..services import gl_summary, journals
+
+router = APIRouter(prefix="/journals", tags=["journals"])
+
+
+class JournalIn(BaseModel):
+    period: str = Field(..., example="2025-01")
+    debit: str = Field(..., example="2100-Deferred Revenue")
+    credit: str = Field(..., example="4000-Revenue")
+    amount: float
+    memo: str = ""
+    contract_id: str = ""
+
+
+class ContractAttributesIn(BaseModel):
+    contract_id: str
+    entity: Optional[str] = None
+    product_line: Optional[str] = None
+    geography: Optional[str] = None
+    currency: Optional[str] = "USD"
+
+
+class JournalBatchIn(BaseModel):
+    entries: List[JournalIn]
+    source: str = "manual"
+    posted: bool = True
+
+
+@router.post("")
+@require(perms=["revrec.manage"])
+async def post_journals(payload: JournalBatchIn):
+    if not payload.entries:
+        raise HTTPException(status_code=400, detail="No entries")
+    rows = [e.model_dump() if hasattr(e, "model_dump") else e.dict() for e in payload.entries]
+    return await journals.apost_entries(rows, source=payload.source, posted=payload.posted)
+
+
+@router.post("/revenue/{period}")
+@require(perms=["revrec.manage"])
+async def generate_revenue(period: str, level: str = "contract"):
+    """Dr Deferred Revenue / Cr Revenue for the period's schedules, per contract or
+    per revrec code (level=revrec_code). Safe to re-run: replaces the period's batch."""
+    try:
+        return await journals.agenerate_revenue_journals(period, level=level)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/trial-balance")
+@require(perms=["revrec.export"])
+async def trial_balance(period: Optional[str] = None, through: Optional[str] = None,
+                        period_from: Optional[str] = None):
+    """period=YYYY-MM for one month's activity; through=YYYY-MM for the cumulative month-end TB."""
+    return await journals.atrial_balance(period=period, through=through, period_from=period_from)
+
+
+@router.get("/accounts/{account}")
+@require(perms=["revrec.export"])
+async def account_activity(account: str, period_from: Optional[str] = None, period_to: Optional[str] = None,
+                           after_id: int = 0, limit: int = 500):
+    return await journals.aaccount_activity(account, period_from=period_from, period_to=period_to,
+                                            after_id=after_id, limit=min(limit, 5000))
+
+
+@router.get("/contracts/{contract_id}")
+@require(perms=["revrec.export"])
+async def contract_history(contract_id: str, period_from: Optional[str] = None, period_to: Optional[str] = None):
+    return await journals.acontract_history(contract_id, period_from=period_from, period_to=period_to)
+
+
+@router.get("/stats")
+@require(perms=["revrec.export"])
+async def journal_stats():
+    return await journals.ajournal_stats()
+
+
+# ── GL summary ──────────────────────────────────────────────────
+
+@router.put("/contract-attributes")
+@require(perms=["revrec.manage"])
+async def set_contract_attributes(payload: List[ContractAttributesIn]):
+    """Entity / product_line / geography per contract (the ContractIn fields) used by the GL summary."""
+    rows = [a.model_dump() if hasattr(a, "model_dump") else a.dict() for a in payload]
+    return await gl_summary.aset_contract_attributes(rows)
+
+
+@router.get("/gl-summary/{period}")
+@require(perms=["revrec.export"])
+async def get_gl_summary(period: str, entity: Optional[str] = None, product_line: Optional[str] = None):
+    return await gl_summary.aget_summary(period, entity=entity, product_line=product_line)
+
+
+@router.get("/gl-summary/{period}/reconcile")
+@require(perms=["revrec.export"])
+async def reconcile_gl_summary(period: str):
+    return await gl_summary.areconcile(period)
+
+
+@router.post("/gl-summary/rebuild")
+@require(perms=["revrec.manage"])
+async def rebuild_gl_summary(period: Optional[str] = None):
+    return await gl_summary.arebuild(period)
@@ -1,10 +1,11 @@
 # backend/app/routers/locks.py
 from __future__ import annotations
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel, Field
 from ..auth import require, build_principal
-from ..services.locks import save_lock, get_lock_status
+from ..services.locks import (asave_lock, aget_lock_status, averify_locks, asave_locks,
+                              alock_period, aget_lock_statuses)
 
 router = APIRouter(prefix="/locks", tags=["locks"])
 
@@ -18,7 +19,7 @@ class LockIn(BaseModel):
 async def lock_schedule(request: Request, payload: LockIn):
     try:
         principal = await build_principal(request)
-        res = save_lock(
+        res = await asave_lock(
             contract_id=payload.contract_id,
             schedule=payload.schedule,
             approver_sub=principal.get("sub", ""),
@@ -32,4 +33,41 @@ async def lock_schedule(request: Request, payload: LockIn):
 @router.get("/schedule/status")
 @require(perms=["deal.view","revrec.export"])  # any of these ok to view
 async def status(contract_id: str):
-    return get_lock_status(contract_id)
\ No newline at end of file
+    return await aget_lock_status(contract_id)
+
+class BulkLockIn(BaseModel):
+    items: List[LockIn]
+    note: Optional[str] = Field(None, example="Month-end close 2025-01")
+
+@router.post("/schedules")
+@require(perms=["schedules.approve"])
+async def lock_schedules(request: Request, payload: BulkLockIn):
+    """Lock many schedules in one transaction."""
+    principal = await build_principal(request)
+    return await asave_locks(
+        [{"contract_id": i.contract_id, "schedule": i.schedule, "note": i.note} for i in payload.items],
+        approver_sub=principal.get("sub", ""), approver_email=principal.get("email"), note=payload.note)
+
+@router.post("/period/{period}")
+@require(perms=["schedules.approve"])
+async def lock_period(request: Request, period: str, note: Optional[str] = None):
+    """Lock the stored grid of every contract with amounts in `period` (YYYY-MM)."""
+    principal = await build_principal(request)
+    return await alock_period(period, approver_sub=principal.get("sub", ""),
+                              approver_email=principal.get("email"), note=note)
+
+@router.post("/schedule/status")
+@require(perms=["deal.view","revrec.export"])
+async def statuses(contract_ids: List[str]):
+    """Latest lock for many contracts in one query."""
+    return await aget_lock_statuses(contract_ids)
+
+class VerifyIn(BaseModel):
+    contract_id: str
+    schedule: Dict[str, Any] = Field(..., description="Current schedule JSON, same shape as when locked")
+
+@router.post("/verify")
+@require(perms=["deal.view","revrec.export"])
+async def verify(payload: List[VerifyIn]):
+    """Check many schedules against their latest locks; drifted ones list the periods that changed."""
+    return await averify_locks([{"contract_id": p.contract_id, "schedule": p.schedule} for p in payload])
@@ -5,13 +5,17 @@ Schedule grid endpoints: load, save, CSV import/export, AI generate.
 from __future__ import annotations
 import csv
 import io
-from datetime import date
-from typing import Dict, List, Any
+from datetime import date, datetime
+from typing import Dict, List, Any, Iterator, Optional
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, Body, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from ..auth import require
-from ..services.schedules_crud import get_grid, save_grid
+from ..services.schedules_crud import (InvalidGridRow, aget_grid, aget_grid_page, alist_dirty, asave_grid,
+                                       import_grid_rows, iter_grid_rows)
+from ..services.rule_plans import recompute_dirty, regenerate_grids
+from ..services.schedule_versions import adiff_versions, aget_as_of, alist_versions, atag_close
 from ..schedule_logic import straight_line
 
 router = APIRouter(prefix="/schedules", tags=["schedules"])
@@ -22,53 +26,153 @@ router = APIRouter(prefix="/schedules", tags=["schedules"])
 @router.get("/grid/{contract_id}")
 @require(perms=["revrec.manage"])
 async def load_grid(contract_id: str):
-    return get_grid(contract_id)
+    return await aget_grid(contract_id)
+
+
+@router.get("/grid/{contract_id}/page")
+@require(perms=["revrec.manage"])
+async def load_grid_page(contract_id: str, after_line: Optional[int] = None,
+                         after_period: Optional[str] = None, limit: int = 500):
+    return await aget_grid_page(contract_id, after_line, after_period, max(1, min(limit, 5000)))
 
 
 @router.post("/grid/{contract_id}")
 @require(perms=["revrec.manage"])
 async def save_grid_endpoint(contract_id: str, payload: dict):
+    """Replace the grid; a malformed row (e.g. non-numeric amount) rolls the save back."""
     rows = payload.get("rows", [])
-    return save_grid(contract_id, rows)
+    try:
+        return await asave_grid(contract_id, rows)
+    except InvalidGridRow as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ── Versions ────────────────────────────────────────────────────
+
+@router.get("/grid/{contract_id}/versions")
+@require(perms=["revrec.manage"])
+async def grid_versions(contract_id: str):
+    return await alist_versions(contract_id)
+
+
+@router.get("/grid/{contract_id}/as-of")
+@require(perms=["revrec.manage"])
+async def grid_as_of(contract_id: str, version: Optional[int] = None, tag: Optional[str] = None,
+                     at: Optional[datetime] = None):
+    """The grid as it was at a version, a close tag, or a timestamp (latest by default)."""
+    try:
+        return await aget_as_of(contract_id, version=version, tag=tag, at=at)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/grid/{contract_id}/diff")
+@require(perms=["revrec.manage"])
+async def grid_diff(contract_id: str, from_version: int, to_version: Optional[int] = None):
+    return await adiff_versions(contract_id, from_version, to_version)
+
+
+@router.post("/versions/tag/{tag}")
+@require(perms=["schedules.approve"])
+async def tag_versions(tag: str, contract_ids: Optional[List[str]] = Body(default=None)):
+    """Close pointer: tag every contract's current grid version (e.g. tag=2025-03)."""
+    return await atag_close(tag, contract_ids)
 
 
 # ── CSV Export ──────────────────────────────────────────────────
 
-@router.get("/grid/{contract_id}/export/csv")
-@require(perms=["revrec.export"])
-async def export_csv(contract_id: str):
-    rows = get_grid(contract_id)
+EXPORT_FIELDS = ["line_no", "period", "amount", "product_code", "revrec_code"]
+
+
+def _csv_chunks(rows: Iterator[Dict[str, Any]], fields: List[str], rows_per_chunk: int = 1000) -> Iterator[str]:
+    """Render rows as CSV text, yielding every `rows_per_chunk` rows."""
     buf = io.StringIO()
-    writer = csv.DictWriter(buf, fieldnames=["line_no", "period", "amount", "product_code", "revrec_code"])
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
     writer.writeheader()
-    for r in rows:
+    for n, r in enumerate(rows, 1):
         writer.writerow(r)
-    buf.seek(0)
+        if n % rows_per_chunk == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+@router.get("/grid/{contract_id}/export/csv")
+@require(perms=["revrec.export"])
+async def export_csv(contract_id: str):
     return StreamingResponse(
-        iter([buf.getvalue()]),
+        _csv_chunks(iter_grid_rows(contract_id), EXPORT_FIELDS),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={contract_id}_schedule.csv"},
     )
 
 
+@router.get("/export/csv")
+@require(perms=["revrec.export"])
+async def export_all_csv():
+    """Every contract's grid in one streamed CSV (contract_id, line_no, period order)."""
+    return StreamingResponse(
+        _csv_chunks(iter_grid_rows(), ["contract_id"] + EXPORT_FIELDS),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=all_schedules.csv"},
+    )
+
+
 # ── CSV Import ──────────────────────────────────────────────────
 
+def _import_upload(file: UploadFile, contract_id: Optional[str]) -> Dict[str, Any]:
+    """Parse the spooled upload incrementally; never holds the whole file."""
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return import_grid_rows(csv.DictReader(text), contract_id)
+    except UnicodeDecodeError as e:
+        raise HTTPException(400, f"CSV is not valid UTF-8: {e}")
+    finally:
+        text.detach()
+
+
 @router.post("/grid/{contract_id}/import/csv")
 @require(perms=["revrec.manage"])
 async def import_csv(contract_id: str, file: UploadFile = File(...)):
-    content = (await file.read()).decode("utf-8")
-    reader = csv.DictReader(io.StringIO(content))
-    rows = []
-    for i, row in enumerate(reader):
-        rows.append({
-            "line_no": int(row.get("line_no", i + 1)),
-            "period": row.get("period", ""),
-            "amount": float(row.get("amount", 0)),
-            "product_code": row.get("product_code", ""),
-            "revrec_code": row.get("revrec_code", ""),
-            "source": "csv",
-        })
-    return save_grid(contract_id, rows)
+    """Replace the contract's grid with the file's rows; a header-only file clears it."""
+    res = await run_in_threadpool(_import_upload, file, contract_id)
+    if not res["ok"]:
+        raise HTTPException(422, res)
+    return {**res, "contract_id": contract_id}
+
+
+@router.post("/import/csv")
+@require(perms=["revrec.manage"])
+async def import_all_csv(file: UploadFile = File(...)):
+    """Multi-contract extract: a contract_id column; each contract present is replaced."""
+    res = await run_in_threadpool(_import_upload, file, None)
+    if not res["ok"]:
+        raise HTTPException(422, res)
+    return res
+
+
+# ── Rule regeneration ───────────────────────────────────────────
+
+@router.post("/regenerate")
+@require(perms=["revrec.manage"])
+async def regenerate(payload: dict = Body(default={})):
+    """Rebuild grids from the code catalog. Body: { contract_ids?: [...] } (default: every grid)."""
+    return await run_in_threadpool(regenerate_grids, payload.get("contract_ids"))
+
+
+@router.get("/dirty")
+@require(perms=["revrec.manage"])
+async def dirty_lines(limit: int = 500):
+    """Grid lines whose revrec rule or product mapping changed since generation."""
+    return await alist_dirty(max(1, min(limit, 5000)))
+
+
+@router.post("/recompute-dirty")
+@require(perms=["revrec.manage"])
+async def recompute_dirty_lines(payload: dict = Body(default={})):
+    """Regenerate only the dirty lines. Body: { max_contracts?: int }."""
+    return await run_in_threadpool(recompute_dirty, payload.get("max_contracts"))
 
 
 # ── AI Generate ─────────────────────────────────────────────────
@@ -99,12 +99,14 @@ class ExtractedPO(BaseModel):
     method: Optional[str] = None
     start_date: Optional[str] = None
     end_date: Optional[str] = None
+    page: Optional[int] = None
 
 class RiskFinding(BaseModel):
     type: str
     snippet: str
     severity: Literal['low', 'medium', 'high'] = 'medium'
     comment: Optional[str] = None
+    page: Optional[int] = None
 
 class Recommendation(BaseModel):
     issue: str
@@ -122,6 +124,7 @@ class IngestResult(BaseModel):
     recommendations: List[Recommendation] = []
     revenue_summary: Optional[str] = None
     nonrevenue_summary: Optional[str] = None
+    pages: Optional[int] = None
 
 class FXRate(BaseModel):
     period: str
@@ -135,10 +138,30 @@ class EntityTrial(BaseModel):
     schedules: Dict[str, float]
     commissions: Dict[str, float] = {}
 
-class ConsolidationIn(BaseModel):
+class ConsolidationHeader(BaseModel):
+    """Everything but the entity trials; first NDJSON line of a streamed consolidation."""
     parent_currency: str = "USD"
-    entities: List[EntityTrial]
     fx_rates: List[FXRate]
     eliminations: List[Dict] = []
     rate_type: Literal['average', 'month_end'] = 'month_end'
     intercompany: List[Dict] = []
+
+class ConsolidationIn(ConsolidationHeader):
+    entities: List[EntityTrial]
+
+class GroupNode(BaseModel):
+    node_id: str
+    entities: List[EntityTrial] = []
+    children: List['GroupNode'] = []
+    eliminations: List[Dict] = []
+    intercompany: List[Dict] = []
+
+if hasattr(GroupNode, 'model_rebuild'): GroupNode.model_rebuild()
+else: GroupNode.update_forward_refs()
+
+class GroupConsolidationIn(BaseModel):
+    group_id: str
+    parent_currency: str = "USD"
+    root: GroupNode
+    fx_rates: List[FXRate]
+    rate_type: Literal['average', 'month_end'] = 'month_end'
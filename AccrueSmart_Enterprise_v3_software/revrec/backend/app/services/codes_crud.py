@@ -6,13 +6,19 @@ SQLModel definitions here are kept in sync for ORM access.
 """
 from __future__ import annotations
 from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
 from datetime import datetime
+import copy
+import os
+import threading
+import time
 import uuid
 
 from sqlmodel import Field, SQLModel, Session, select, Column
-from sqlalchemy import JSON
+from sqlalchemy import JSON, and_, or_
 from sqlalchemy.exc import IntegrityError
-from ..db import get_session
+from ..db import get_session, sync_db, async_db
+from .schedules_crud import ScheduleEditRow, mark_dirty
 
 
 # ── SQLModel tables ──────────────────────────────────────────────
@@ -41,100 +47,189 @@ class ProductRevrecMap(SQLModel, table=True):
     revrec_id: str = Field(index=True)
 
 
-# ── Product CRUD ─────────────────────────────────────────────────
+# ── Code catalog cache ───────────────────────────────────────────
+# Products, revrec codes and their mapping change rarely and are read on every
+# schedule generation, so one snapshot is held per process. Writes below
+# invalidate it; CODE_CATALOG_TTL bounds staleness from other processes.
 
-def list_products() -> List[Dict[str, Any]]:
+CATALOG_TTL = float(os.getenv("CODE_CATALOG_TTL", "300"))
+
+
+@dataclass(frozen=True)
+class CodeCatalog:
+    products: Dict[str, Dict[str, Any]]     # product code -> product row + mapped rule
+    revrec: Dict[str, Dict[str, Any]]       # revrec code -> {id, code, rule_type, params}
+    loaded_at: float
+
+
+_catalog: Optional[CodeCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def _load_catalog() -> CodeCatalog:
     with get_session() as s:
-        rows = s.exec(select(ProductCode).order_by(ProductCode.code)).all()
-        results = []
-        for p in rows:
-            # look up mapped revrec code
-            mp = s.exec(
-                select(ProductRevrecMap).where(ProductRevrecMap.product_id == p.id)
-            ).first()
-            revrec_code = None
-            rule_type = None
-            if mp:
-                rc = s.get(RevrecCode, mp.revrec_id)
-                if rc:
-                    revrec_code = rc.code
-                    rule_type = rc.rule_type
-            results.append({
+        joined = s.exec(
+            select(ProductCode, RevrecCode)
+            .outerjoin(ProductRevrecMap, ProductRevrecMap.product_id == ProductCode.id)
+            .outerjoin(RevrecCode, RevrecCode.id == ProductRevrecMap.revrec_id)
+            .order_by(ProductCode.code)
+        ).all()
+        products = {
+            p.code: {
                 "id": p.id,
                 "code": p.code,
                 "name": p.name,
                 "description": p.description,
-                "revrec_code": revrec_code,
-                "rule_type": rule_type,
-            })
-        return results
+                "revrec_code": rc.code if rc else None,
+                "rule_type": rc.rule_type if rc else None,
+            }
+            for p, rc in joined
+        }
+        revrec = {
+            r.code: {"id": r.id, "code": r.code, "rule_type": r.rule_type, "params": r.params}
+            for r in s.exec(select(RevrecCode).order_by(RevrecCode.code)).all()
+        }
+    return CodeCatalog(products=products, revrec=revrec, loaded_at=time.monotonic())
+
+
+def get_catalog() -> CodeCatalog:
+    global _catalog
+    cat = _catalog
+    if cat is not None and time.monotonic() - cat.loaded_at < CATALOG_TTL:
+        return cat
+    with _catalog_lock:
+        if _catalog is None or time.monotonic() - _catalog.loaded_at >= CATALOG_TTL:
+            _catalog = _load_catalog()
+        return _catalog
+
+
+def invalidate_catalog() -> None:
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+
+def resolve(product_code: str) -> Optional[Dict[str, Any]]:
+    """Recognition rule for a product: {product_code, revrec_code, rule_type, params},
+    or None when the product is unknown or unmapped."""
+    cat = get_catalog()
+    p = cat.products.get(product_code)
+    rc = cat.revrec.get(p["revrec_code"]) if p and p["revrec_code"] else None
+    if rc is None:
+        return None
+    return {"product_code": product_code, "revrec_code": rc["code"],
+            "rule_type": rc["rule_type"], "params": copy.deepcopy(rc["params"])}
+
+
+def get_revrec_rule(revrec_code: str) -> Optional[Dict[str, Any]]:
+    rc = get_catalog().revrec.get(revrec_code)
+    return copy.deepcopy(rc) if rc else None
 
 
-def create_product(code: str, name: str, description: str = "") -> Dict[str, Any]:
-    with get_session() as s:
-        product = ProductCode(code=code, name=name, description=description)
-        s.add(product)
-        try:
-            s.commit()
-        except IntegrityError:
-            s.rollback()
-            raise ValueError(f"Product code '{code}' already exists")
-        s.refresh(product)
-        return {"id": product.id, "code": product.code, "name": product.name,
-                "description": product.description}
+# ── Product CRUD ─────────────────────────────────────────────────
+
+def list_products() -> List[Dict[str, Any]]:
+    return [dict(p) for p in get_catalog().products.values()]
+
+
+def _create_product(s: Session, code: str, name: str, description: str = "") -> Dict[str, Any]:
+    product = ProductCode(code=code, name=name, description=description)
+    s.add(product)
+    try:
+        s.commit()
+    except IntegrityError:
+        s.rollback()
+        raise ValueError(f"Product code '{code}' already exists")
+    s.refresh(product)
+    invalidate_catalog()
+    return {"id": product.id, "code": product.code, "name": product.name,
+            "description": product.description}
 
 
 # ── RevRec Code CRUD ─────────────────────────────────────────────
 
 def list_revrec_codes() -> List[Dict[str, Any]]:
-    with get_session() as s:
-        rows = s.exec(select(RevrecCode).order_by(RevrecCode.code)).all()
-        return [
-            {"id": r.id, "code": r.code, "rule_type": r.rule_type,
-             "params": r.params}
-            for r in rows
-        ]
+    return [copy.deepcopy(r) for r in get_catalog().revrec.values()]
 
 
-def create_revrec_code(code: str, rule_type: str, params: Dict = None) -> Dict[str, Any]:
-    with get_session() as s:
-        rc = RevrecCode(code=code, rule_type=rule_type,
-                        params=params or {})
+def _create_revrec_code(s: Session, code: str, rule_type: str, params: Dict = None) -> Dict[str, Any]:
+    rc = RevrecCode(code=code, rule_type=rule_type,
+                    params=params or {})
+    s.add(rc)
+    try:
+        s.commit()
+    except IntegrityError:
+        s.rollback()
+        raise ValueError(f"RevRec code '{code}' already exists")
+    s.refresh(rc)
+    invalidate_catalog()
+    return {"id": rc.id, "code": rc.code, "rule_type": rc.rule_type,
+            "params": rc.params}
+
+
+def _update_revrec_code(s: Session, code: str, rule_type: Optional[str] = None, params: Optional[Dict] = None) -> Dict[str, Any]:
+    """Change a code's rule; every grid line that resolves to it is marked dirty."""
+    rc = s.exec(select(RevrecCode).where(RevrecCode.code == code)).first()
+    if not rc:
+        raise ValueError(f"RevRec code '{code}' not found")
+    new_type = rule_type or rc.rule_type
+    new_params = rc.params if params is None else params
+    marked = 0
+    if new_type != rc.rule_type or new_params != rc.params:
+        rc.rule_type, rc.params = new_type, new_params
         s.add(rc)
-        try:
-            s.commit()
-        except IntegrityError:
-            s.rollback()
-            raise ValueError(f"RevRec code '{code}' already exists")
-        s.refresh(rc)
-        return {"id": rc.id, "code": rc.code, "rule_type": rc.rule_type,
-                "params": rc.params}
+        s.flush()
+        mapped_products = (select(ProductCode.code)
+                           .join(ProductRevrecMap, ProductRevrecMap.product_id == ProductCode.id)
+                           .where(ProductRevrecMap.revrec_id == rc.id))
+        marked = mark_dirty(s, or_(ScheduleEditRow.revrec_code == code,
+                                   and_(ScheduleEditRow.revrec_code == "",
+                                        ScheduleEditRow.product_code.in_(mapped_products))),
+                            f"revrec {code} changed")
+    s.commit()
+    s.refresh(rc)
+    invalidate_catalog()
+    return {"id": rc.id, "code": rc.code, "rule_type": rc.rule_type,
+            "params": rc.params, "lines_marked_dirty": marked}
 
 
 # ── Mapping ──────────────────────────────────────────────────────
 
-def map_product_to_revrec(product_code: str, revrec_code: str) -> Dict[str, Any]:
-    with get_session() as s:
-        product = s.exec(
-            select(ProductCode).where(ProductCode.code == product_code)
-        ).first()
-        if not product:
-            raise ValueError(f"Product code '{product_code}' not found")
-
-        rc = s.exec(
-            select(RevrecCode).where(RevrecCode.code == revrec_code)
-        ).first()
-        if not rc:
-            raise ValueError(f"RevRec code '{revrec_code}' not found")
-
-        # upsert: delete old mapping, insert new one
-        old = s.exec(
-            select(ProductRevrecMap).where(ProductRevrecMap.product_id == product.id)
-        ).first()
-        if old:
-            s.delete(old)
-
-        mapping = ProductRevrecMap(product_id=product.id, revrec_id=rc.id)
-        s.add(mapping)
-        s.commit()
-        return {"ok": True, "product_code": product_code, "revrec_code": revrec_code}
+def _map_product_to_revrec(s: Session, product_code: str, revrec_code: str) -> Dict[str, Any]:
+    product = s.exec(
+        select(ProductCode).where(ProductCode.code == product_code)
+    ).first()
+    if not product:
+        raise ValueError(f"Product code '{product_code}' not found")
+
+    rc = s.exec(
+        select(RevrecCode).where(RevrecCode.code == revrec_code)
+    ).first()
+    if not rc:
+        raise ValueError(f"RevRec code '{revrec_code}' not found")
+
+    # upsert: delete old mapping, insert new one
+    old = s.exec(
+        select(ProductRevrecMap).where(ProductRevrecMap.product_id == product.id)
+    ).first()
+    if old and old.revrec_id == rc.id:
+        return {"ok": True, "product_code": product_code, "revrec_code": revrec_code, "lines_marked_dirty": 0}
+    if old:
+        s.delete(old)
+
+    mapping = ProductRevrecMap(product_id=product.id, revrec_id=rc.id)
+    s.add(mapping)
+    s.flush()
+    # lines with their own revrec_code don't inherit the product mapping
+    marked = mark_dirty(s, and_(ScheduleEditRow.product_code == product_code, ScheduleEditRow.revrec_code == ""),
+                        f"product {product_code} mapped to {revrec_code}")
+    s.commit()
+    invalidate_catalog()
+    return {"ok": True, "product_code": product_code, "revrec_code": revrec_code, "lines_marked_dirty": marked}
+
+
+# sync callers / async routers (see db.run_db)
+create_product, acreate_product = sync_db(_create_product), async_db(_create_product)
+create_revrec_code, acreate_revrec_code = sync_db(_create_revrec_code), async_db(_create_revrec_code)
+update_revrec_code, aupdate_revrec_code = sync_db(_update_revrec_code), async_db(_update_revrec_code)
+map_product_to_revrec, amap_product_to_revrec = sync_db(_map_product_to_revrec), async_db(_map_product_to_revrec)
@@ -0,0 +1,165 @@
+"""
+backend/app/services/disclosure_jobs.py
+Background disclosure-pack rendering. A job (disclosure_jobs) computes the
+input data of each section: ASC 606 from stored schedules/journals, 842 from
+the lease payloads, and 740 / 718 as sent. The sections are prepared in a
+thread pool (explicit ASC 606 contracts are allocated there), and the PDF is
+built from them in one pass. Finished packs are written to
+./out/disclosure_jobs/<job_id>.pdf. Jobs left queued or running by a restart
+are re-queued on startup.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import os
+import threading
+import uuid
+
+from sqlalchemy import Text
+from sqlmodel import Field, SQLModel, Column, select
+from ..db import get_session
+from . import disclosures
+
+JOBS_DIR = os.getenv("DISCLOSURE_JOBS_DIR", "./out/disclosure_jobs")
+WORKERS = int(os.getenv("DISCLOSURE_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+SECTIONS = ("asc606", "asc842", "asc740", "asc718")
+
+
+# ── SQLModel table ──────────────────────────────────────────────
+
+class DisclosureJob(SQLModel, table=True):
+    __tablename__ = "disclosure_jobs"
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    status: str = "queued"      # queued | running | done | failed
+    period_from: str
+    period_to: str
+    request: str = Field(sa_column=Column(Text))          # DisclosurePackIn JSON, for resume
+    path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+
+# ── Rendering ───────────────────────────────────────────────────
+
+_pool: Optional[ThreadPoolExecutor] = None        # jobs
+_sections: Optional[ThreadPoolExecutor] = None    # section inputs / preparation within a job
+_pool_lock = threading.Lock()
+
+
+def _get_pools():
+    global _pool, _sections
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="disclosure-job")
+            _sections = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="disclosure-section")
+        return _pool, _sections
+
+
+def shutdown(wait: bool = True) -> None:
+    global _pool, _sections
+    with _pool_lock:
+        for p in (_pool, _sections):
+            if p is not None:
+                p.shutdown(wait=wait)
+        _pool = _sections = None
+
+
+def section_inputs(req: Dict[str, Any], period_from: str, period_to: str) -> Dict[str, Any]:
+    """Input data of every section; ASC 606 (database) and 842 (lease
+    schedules) are computed concurrently."""
+    _, pool = _get_pools()
+    asc606 = pool.submit(disclosures.asc606, period_from, period_to)
+    leases = (pool.submit(disclosures.lease_aggregates, req.get("leases") or [], period_from, period_to)
+              if req.get("include_leases", True) else None)
+    return {
+        "asc606": {"figures": asc606.result(), "contracts": req.get("contracts") or []},
+        "asc842": leases.result() if leases is not None else {},
+        "asc740": (req.get("tax_data") or {}) if req.get("include_taxes", True) else {},
+        "asc718": (req.get("compensation_data") or {}) if req.get("include_compensation", True) else {},
+    }
+
+
+def _prepare(name: str, data: Any) -> Dict[str, Any]:
+    from ..routers.disclosure_pack import DisclosurePackGenerator
+    return DisclosurePackGenerator(output_dir=JOBS_DIR).prepare_section(name, data)
+
+
+def render_pack(inputs: Dict[str, Any], path: str, as_of: Optional[str] = None) -> str:
+    """Prepare the sections in parallel, then build the PDF at `path`."""
+    from ..routers.disclosure_pack import DisclosurePackGenerator
+    _, pool = _get_pools()
+    futures = {name: pool.submit(_prepare, name, inputs[name]) for name in SECTIONS}
+    gen = DisclosurePackGenerator(output_dir=os.path.dirname(path) or ".")
+    return gen.assemble([gen.render_section(name, futures[name].result()) for name in SECTIONS],
+                        as_of=as_of, filename=os.path.basename(path))
+
+
+def _run(job_id: str) -> None:
+    with get_session() as s:
+        job = s.get(DisclosureJob, job_id)
+        if job is None or job.status not in ("queued", "running"):
+            return
+        job.status = "running"
+        s.add(job); s.commit()
+        req, period_from, period_to = json.loads(job.request), job.period_from, job.period_to
+    path = os.path.join(JOBS_DIR, f"{job_id}.pdf")
+    error = None
+    try:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        render_pack(section_inputs(req, period_from, period_to), path, as_of=period_to)
+    except Exception as e:  # noqa: BLE001 - recorded on the job
+        error = f"{type(e).__name__}: {e}"
+    with get_session() as s:
+        job = s.get(DisclosureJob, job_id)
+        job.status, job.error, job.finished_at = ("failed" if error else "done"), error, datetime.utcnow()
+        job.path = None if error else path
+        s.add(job); s.commit()
+
+
+# ── Public API ──────────────────────────────────────────────────
+
+def create_job(req: Dict[str, Any], period_from: str, period_to: str) -> Dict[str, Any]:
+    """Record the job and queue it; returns immediately."""
+    job = DisclosureJob(period_from=period_from, period_to=period_to, request=json.dumps(req, default=str))
+    with get_session() as s:
+        s.add(job)
+        s.commit()
+        job_id = job.id
+    _get_pools()[0].submit(_run, job_id)
+    return get_job(job_id)
+
+
+def resume_pending() -> int:
+    """Re-queue jobs left unfinished by a restart."""
+    with get_session() as s:
+        pending = s.exec(select(DisclosureJob.id).where(DisclosureJob.status.in_(("queued", "running")))).all()
+    for job_id in pending:
+        _get_pools()[0].submit(_run, job_id)
+    return len(pending)
+
+
+def get_job(job_id: str) -> Dict[str, Any]:
+    with get_session() as s:
+        job = s.get(DisclosureJob, job_id)
+        if job is None:
+            raise KeyError(f"Unknown disclosure job '{job_id}'")
+        return {
+            "job_id": job.id, "status": job.status, "period_from": job.period_from, "period_to": job.period_to,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() + "Z",
+            "finished_at": job.finished_at.isoformat() + "Z" if job.finished_at else None,
+        }
+
+
+def job_file(job_id: str) -> str:
+    """Path of a finished job's PDF; KeyError if unknown, RuntimeError if not ready."""
+    with get_session() as s:
+        job = s.get(DisclosureJob, job_id)
+        if job is None:
+            raise KeyError(f"Unknown disclosure job '{job_id}'")
+        if job.status != "done" or not job.path or not os.path.exists(job.path):
+            raise RuntimeError(f"Disclosure job '{job_id}' is {job.status}")
+        return job.path
@@ -0,0 +1,230 @@
+"""
+backend/app/services/disclosures.py
+Portfolio-wide disclosure figures: revenue disaggregation, deferred revenue /
+contract asset rollforwards, RPO time bands (ASC 606) and lease aggregates
+(ASC 842). The database does the per-row work as grouped SQL over
+schedules_edit and journal_entries (one row per contract or per period comes
+back), and everything after that is a numpy / pandas reduction over those
+arrays; there is no per-contract Python loop, so a pack over 500k contracts
+costs a handful of scans.
+
+Billings are journal activity on the deferred revenue account other than
+revenue recognition (Dr Receivable / Cr Deferred Revenue, and reversals).
+Per contract, billed-to-date minus recognized-to-date is a contract liability
+when positive and a contract asset when negative.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, case, func, or_
+from sqlmodel import Session, select
+from ..db import sync_db, async_db
+from .schedules_crud import ScheduleEditRow
+from .journals import DEFERRED_REVENUE, REVENUE, JournalEntry
+from .leases import compute_schedule
+
+RPO_BANDS = (("Next 12 months", 1, 12), ("13-24 months", 13, 24),
+             ("25-36 months", 25, 36), ("Beyond 36 months", 37, None))
+
+
+# ── Periods ─────────────────────────────────────────────────────
+
+def month_index(periods) -> np.ndarray:
+    """"YYYY-MM" strings -> months since year 0 (vectorized)."""
+    p = pd.Series(periods, dtype="string")
+    return (p.str.slice(0, 4).astype(int) * 12 + p.str.slice(5, 7).astype(int) - 1).to_numpy()
+
+
+def shift_period(period: str, months: int) -> str:
+    m = int(period[:4]) * 12 + int(period[5:7]) - 1 + months
+    return f"{m // 12:04d}-{m % 12 + 1:02d}"
+
+
+def categorize(description: str) -> str:
+    """Revenue category of a performance obligation / product description."""
+    desc_lower = (description or "").lower()
+    if any(word in desc_lower for word in ['device', 'product', 'hardware', 'equipment']):
+        return 'Product Sales'
+    elif any(word in desc_lower for word in ['service', 'support', 'maintenance']):
+        return 'Maintenance & Support'
+    elif any(word in desc_lower for word in ['license', 'software', 'subscription']):
+        return 'License Fees'
+    else:
+        return 'Service Revenue'
+
+
+def _variance(current: float, prior: float) -> float:
+    return (current - prior) / prior * 100 if prior else 0.0
+
+
+# ── ASC 606 ─────────────────────────────────────────────────────
+
+def _revenue_by_category(s: Session, period_from: str, period_to: str) -> List[Dict[str, Any]]:
+    """Recognized revenue of [period_from, period_to] vs. the same window a
+    year earlier, by product line (contract_attributes) or, where a contract
+    has none, by the category of its product code's name / description."""
+    from .codes_crud import ProductCode
+    from .gl_summary import ContractAttributes
+    t, a = ScheduleEditRow.__table__, ContractAttributes.__table__
+    prior_from, prior_to = shift_period(period_from, -12), shift_period(period_to, -12)
+    current = and_(t.c.period >= period_from, t.c.period <= period_to)
+    prior = and_(t.c.period >= prior_from, t.c.period <= prior_to)
+    pl = func.coalesce(a.c.product_line, "")
+    rows = s.execute(select(t.c.product_code, pl,
+                            func.sum(case((current, t.c.amount), else_=0.0)),
+                            func.sum(case((prior, t.c.amount), else_=0.0)))
+                     .select_from(t.outerjoin(a, a.c.contract_id == t.c.contract_id))
+                     .where(or_(current, prior)).group_by(t.c.product_code, pl)).all()
+    df = pd.DataFrame(rows, columns=["product_code", "product_line", "current", "prior"])
+    if df.empty:
+        return []
+    catalog = {c: f"{n} {d}" for c, n, d in s.execute(
+        select(ProductCode.code, ProductCode.name, ProductCode.description)
+        .where(ProductCode.code.in_(df["product_code"].dropna().unique().tolist()))).all()}
+    described = df["product_code"].map(lambda c: catalog.get(c, c or "")).map(categorize)
+    df["category"] = df["product_line"].where(df["product_line"] != "", described)
+    by_cat = df.groupby("category")[["current", "prior"]].sum().sort_index()
+    return [{"category": cat, "current": round(float(r.current), 2), "prior": round(float(r.prior), 2),
+             "variance": round(float(_variance(r.current, r.prior)), 1)}
+            for cat, r in by_cat.iterrows() if r.current or r.prior]
+
+
+def _contract_positions(s: Session, period_from: str, period_to: str) -> pd.DataFrame:
+    """Per contract: recognized / billed before period_from and within the
+    window. Two grouped queries, outer-joined in pandas."""
+    t = ScheduleEditRow.__table__
+    before = t.c.period < period_from
+    rec = s.execute(select(t.c.contract_id,
+                           func.sum(case((before, t.c.amount), else_=0.0)),
+                           func.sum(case((before, 0.0), else_=t.c.amount)))
+                    .where(t.c.period <= period_to).group_by(t.c.contract_id)).all()
+
+    j = JournalEntry.__table__
+    signed = case((j.c.credit_account == DEFERRED_REVENUE, j.c.amount), else_=-j.c.amount)
+    jbefore = j.c.period < period_from
+    bill = s.execute(select(j.c.contract_id,
+                            func.sum(case((jbefore, signed), else_=0.0)),
+                            func.sum(case((jbefore, 0.0), else_=signed)))
+                     .where(j.c.posted.is_(True), j.c.period <= period_to, j.c.contract_id != "",
+                            or_(and_(j.c.credit_account == DEFERRED_REVENUE, j.c.debit_account != REVENUE),
+                                and_(j.c.debit_account == DEFERRED_REVENUE, j.c.credit_account != REVENUE)))
+                     .group_by(j.c.contract_id)).all()
+    df = pd.merge(pd.DataFrame(rec, columns=["contract_id", "rec_before", "rec_in"]),
+                  pd.DataFrame(bill, columns=["contract_id", "bill_before", "bill_in"]),
+                  on="contract_id", how="outer")
+    return df.fillna(0.0)
+
+
+def contract_balances(df: pd.DataFrame) -> Dict[str, Dict[str, float]]:
+    """Deferred revenue and contract asset rollforwards from _contract_positions.
+    For deferred revenue, "recognized" is the opening liability released into
+    revenue; for contract assets it is the opening asset transferred to
+    receivables by billing. Additions close each rollforward."""
+    rec_before, rec_in = df["rec_before"].to_numpy(float), df["rec_in"].to_numpy(float)
+    bill_before, bill_in = df["bill_before"].to_numpy(float), df["bill_in"].to_numpy(float)
+    net_begin = bill_before - rec_before
+    net_end = net_begin + bill_in - rec_in
+    liab_b, liab_e = np.clip(net_begin, 0, None), np.clip(net_end, 0, None)
+    asset_b, asset_e = np.clip(-net_begin, 0, None), np.clip(-net_end, 0, None)
+    released = np.minimum(liab_b, np.clip(rec_in, 0, None)).sum()
+    transferred = np.minimum(asset_b, np.clip(bill_in, 0, None)).sum()
+
+    def roll(begin: np.ndarray, end: np.ndarray, out: float) -> Dict[str, float]:
+        b, e = float(begin.sum()), float(end.sum())
+        return {"beginning": round(b, 2), "additions": round(float(e - b + out), 2),
+                "recognized": round(float(out), 2), "ending": round(e, 2)}
+    return {"deferred_revenue": roll(liab_b, liab_e, released),
+            "contract_assets": roll(asset_b, asset_e, transferred)}
+
+
+def _rpo(s: Session, as_of: str) -> Dict[str, float]:
+    """Scheduled revenue after `as_of`, in time bands from as_of's month end."""
+    t = ScheduleEditRow.__table__
+    rows = s.execute(select(t.c.period, func.sum(t.c.amount))
+                     .where(t.c.period > as_of).group_by(t.c.period)).all()
+    out = {label: 0.0 for label, _, _ in RPO_BANDS}
+    if not rows:
+        return out
+    periods, amounts = zip(*rows)
+    ahead = month_index(periods) - month_index([as_of])[0]
+    amounts = np.asarray(amounts, dtype=float)
+    for label, lo, hi in RPO_BANDS:
+        mask = (ahead >= lo) if hi is None else (ahead >= lo) & (ahead <= hi)
+        out[label] = round(float(amounts[mask].sum()), 2)
+    return out
+
+
+# ── ASC 842 ─────────────────────────────────────────────────────
+
+LEASE_TYPES = {"operating": "Operating Leases", "finance": "Finance Leases"}
+
+
+def lease_aggregates(leases: Iterable[Dict[str, Any]], period_from: str, period_to: str) -> Dict[str, Any]:
+    """Balances at period_to and expense for [period_from, period_to] per lease
+    classification. Each lease is a /leases/schedule payload plus an optional
+    "classification" (operating | finance, default operating); its schedule
+    rows are stacked into one frame and reduced with group-bys."""
+    frames = []
+    for i, lease in enumerate(leases):
+        kw = dict(lease)
+        kind = str(kw.pop("classification", "operating")).lower()
+        if kind not in LEASE_TYPES:
+            raise ValueError(f"classification must be one of {tuple(LEASE_TYPES)}")
+        rows = compute_schedule(**kw)["rows"]
+        if rows:
+            f = pd.DataFrame(rows, columns=["date", "interest", "rou_amortization",
+                                            "ending_liability", "rou_carrying_amount"])
+            f["lease"], f["type"] = i, kind
+            frames.append(f)
+    if not frames:
+        return {"balances": [], "expense": []}
+    df = pd.concat(frames, ignore_index=True)
+    df["month"] = month_index(df["date"].str.slice(0, 7))
+    start, end = month_index([period_from, period_to])
+
+    # balances: each commenced lease's last row on or before period_to
+    last_month = df.groupby("lease")["month"].max()
+    booked = df[df["month"] <= end]
+    at = booked.loc[booked.groupby("lease")["month"].idxmax()].set_index("lease")
+    at = at.assign(remaining=(last_month.reindex(at.index) - end).clip(lower=0))
+    at = at.assign(weighted=at["remaining"] * at["ending_liability"])
+    bal = at.groupby("type")[["rou_carrying_amount", "ending_liability", "weighted", "remaining"]].sum()
+    counts = at.groupby("type").size()
+    balances = []
+    for kind, label in LEASE_TYPES.items():
+        if kind not in bal.index:
+            continue
+        r = bal.loc[kind]
+        term = r.weighted / r.ending_liability if r.ending_liability else r.remaining / counts[kind]
+        balances.append({"type": label, "assets": round(float(r.rou_carrying_amount), 2),
+                         "liabilities": round(float(r.ending_liability), 2), "term": int(round(term))})
+
+    window = df[(df["month"] >= start) & (df["month"] <= end)]
+    cost = window.groupby("type")[["interest", "rou_amortization"]].sum()
+    op = cost.loc["operating"] if "operating" in cost.index else None
+    fin = cost.loc["finance"] if "finance" in cost.index else None
+    expense = []
+    if op is not None:
+        expense.append({"expense_type": "Operating Lease Cost",
+                        "amount": round(float(op.interest + op.rou_amortization), 2)})
+    if fin is not None:
+        expense.append({"expense_type": "Finance Lease Interest", "amount": round(float(fin.interest), 2)})
+        expense.append({"expense_type": "Finance Lease Amortization",
+                        "amount": round(float(fin.rou_amortization), 2)})
+    return {"balances": balances, "expense": expense}
+
+
+# ── Pack data ───────────────────────────────────────────────────
+
+def _asc606(s: Session, period_from: str, period_to: str) -> Dict[str, Any]:
+    positions = _contract_positions(s, period_from, period_to)
+    return {"period_from": period_from, "period_to": period_to, "contracts": len(positions),
+            "revenue": _revenue_by_category(s, period_from, period_to),
+            "balances": contract_balances(positions),
+            "rpo": _rpo(s, period_to)}
+
+
+# sync callers / async routers (see db.run_db)
+asc606, aasc606 = sync_db(_asc606), async_db(_asc606)
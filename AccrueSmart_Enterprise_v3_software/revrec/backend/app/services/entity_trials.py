@@ -0,0 +1,68 @@
+"""
+backend/app/services/entity_trials.py
+Entity trial balances stored one row per (entity, period), so streaming
+consolidation can read them from the DB instead of one huge request body.
+"""
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Optional, Dict, Any
+from datetime import datetime
+
+from sqlalchemy import delete, insert
+from sqlmodel import Field, SQLModel, select
+from ..db import get_session
+from ..schemas import EntityTrial
+
+
+# ── SQLModel table ──────────────────────────────────────────────
+
+class EntityTrialRow(SQLModel, table=True):
+    __tablename__ = "entity_trials"
+    entity: str = Field(primary_key=True)
+    period: str = Field(primary_key=True)     # YYYY-MM
+    currency: str
+    revenue: float = 0.0
+    commission: float = 0.0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ── Writes ──────────────────────────────────────────────────────
+
+def save_entity_trials(trials: Iterable[EntityTrial]) -> Dict[str, Any]:
+    """Replace the stored rows of every entity in `trials`."""
+    trials = list(trials)
+    now = datetime.utcnow()
+    rows: List[Dict[str, Any]] = []
+    for t in trials:
+        for p in sorted(set(t.schedules) | set(t.commissions)):
+            rows.append({"entity": t.entity, "period": p, "currency": t.currency,
+                         "revenue": float(t.schedules.get(p, 0.0)),
+                         "commission": float(t.commissions.get(p, 0.0)), "updated_at": now})
+    with get_session() as s:
+        s.execute(delete(EntityTrialRow).where(EntityTrialRow.entity.in_([t.entity for t in trials])))
+        if rows:
+            s.execute(insert(EntityTrialRow), rows)
+        s.commit()
+    return {"ok": True, "entities": len(trials), "rows_saved": len(rows)}
+
+
+# ── Streaming reads ─────────────────────────────────────────────
+
+def iter_entity_trials(entities: Optional[List[str]] = None, batch_size: int = 5000) -> Iterator[EntityTrial]:
+    """Yield one EntityTrial per entity, reading rows through a server-side
+    cursor ordered by entity so only the current entity is held in memory."""
+    stmt = select(EntityTrialRow).order_by(EntityTrialRow.entity, EntityTrialRow.period)
+    if entities:
+        stmt = stmt.where(EntityTrialRow.entity.in_(entities))
+    with get_session() as s:
+        cur: Optional[EntityTrial] = None
+        for r in s.exec(stmt.execution_options(yield_per=batch_size)):
+            if cur is None or r.entity != cur.entity:
+                if cur is not None:
+                    yield cur
+                cur = EntityTrial(entity=r.entity, currency=r.currency, schedules={}, commissions={})
+            if r.revenue:
+                cur.schedules[r.period] = r.revenue
+            if r.commission:
+                cur.commissions[r.period] = r.commission
+        if cur is not None:
+            yield cur
@@ -0,0 +1,177 @@
+"""
+backend/app/services/gl_summary.py
+GL summarization. gl_summary holds debit/credit totals per period × account ×
+entity × product_line and is maintained like a materialized view: every
+journal batch adds its own aggregate when it is posted (and subtracts it when
+replaced), so GL export and reconciliation read the summary rather than the
+contract-level detail. Entity / product_line / geography come from
+contract_attributes (the ContractIn fields of the same names).
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, delete, func, literal, true, union_all, update
+from sqlmodel import Field, Session, SQLModel, select
+from ..db import sync_db, async_db, upsert_insert
+from .journals import JournalEntry
+
+
+# ── SQLModel tables ─────────────────────────────────────────────
+
+class ContractAttributes(SQLModel, table=True):
+    __tablename__ = "contract_attributes"
+    contract_id: str = Field(primary_key=True)
+    entity: str = ""
+    product_line: str = ""
+    geography: str = ""
+    currency: str = "USD"
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class GLSummary(SQLModel, table=True):
+    __tablename__ = "gl_summary"
+    period: str = Field(primary_key=True)
+    account: str = Field(primary_key=True)
+    entity: str = Field(default="", primary_key=True)
+    product_line: str = Field(default="", primary_key=True)
+    debit: float = 0.0
+    credit: float = 0.0
+    entries: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ── Incremental maintenance ─────────────────────────────────────
+
+def _detail_aggregate(s: Session, where) -> List[Any]:
+    """(period, account, entity, product_line, debit, credit, entries) for the
+    posted journal entries matching `where`, both sides of each entry."""
+    t, a = JournalEntry.__table__, ContractAttributes.__table__
+    src = t.outerjoin(a, a.c.contract_id == t.c.contract_id)
+    ent, pl = func.coalesce(a.c.entity, ""), func.coalesce(a.c.product_line, "")
+    conds = [t.c.posted.is_(True), where]
+    sides = union_all(
+        select(t.c.period, t.c.debit_account.label("account"), ent.label("entity"), pl.label("product_line"),
+               func.sum(t.c.amount).label("debit"), literal(0.0).label("credit"), func.count().label("n"))
+        .select_from(src).where(*conds).group_by(t.c.period, t.c.debit_account, ent, pl),
+        select(t.c.period, t.c.credit_account.label("account"), ent.label("entity"), pl.label("product_line"),
+               literal(0.0).label("debit"), func.sum(t.c.amount).label("credit"), func.count().label("n"))
+        .select_from(src).where(*conds).group_by(t.c.period, t.c.credit_account, ent, pl),
+    ).subquery()
+    c = sides.c
+    return s.execute(select(c.period, c.account, c.entity, c.product_line,
+                            func.sum(c.debit), func.sum(c.credit), func.sum(c.n))
+                     .group_by(c.period, c.account, c.entity, c.product_line)).all()
+
+
+def apply_entries(s: Session, where, sign: int = 1) -> int:
+    """Add (sign=1) or remove (sign=-1) the journal entries matching `where`
+    in gl_summary, inside the caller's transaction. Call with sign=1 after
+    inserting entries and sign=-1 before deleting them (or before changing
+    the attributes of their contracts). Returns the summary rows touched."""
+    g = GLSummary
+    now = datetime.utcnow()
+    deltas = _detail_aggregate(s, where)
+    if sign > 0 and deltas:
+        # one upsert per key: concurrent postings to the same bucket add up
+        # instead of both inserting it
+        ins = upsert_insert(s, g.__table__)
+        ex = ins.excluded
+        s.execute(ins.on_conflict_do_update(
+            index_elements=["period", "account", "entity", "product_line"],
+            set_={"debit": g.debit + ex.debit, "credit": g.credit + ex.credit,
+                  "entries": g.entries + ex.entries, "updated_at": ex.updated_at}),
+            [{"period": period, "account": account, "entity": entity, "product_line": product_line,
+              "debit": dr or 0.0, "credit": cr or 0.0, "entries": n, "updated_at": now}
+             for period, account, entity, product_line, dr, cr, n in deltas])
+    elif deltas:
+        for period, account, entity, product_line, dr, cr, n in deltas:
+            key = and_(g.period == period, g.account == account, g.entity == entity,
+                       g.product_line == product_line)
+            s.execute(update(g).where(key).values(debit=g.debit - (dr or 0.0), credit=g.credit - (cr or 0.0),
+                                                  entries=g.entries - n, updated_at=now))
+        s.execute(delete(g).where(g.entries <= 0))
+    return len(deltas)
+
+
+def _rebuild(s: Session, period: Optional[str] = None) -> Dict[str, Any]:
+    """Recompute the summary (one period or all) from journal detail."""
+    s.execute(delete(GLSummary).where(GLSummary.period == period) if period else delete(GLSummary))
+    rows = apply_entries(s, JournalEntry.period == period if period else true())
+    s.commit()
+    return {"period": period, "rows": rows}
+
+
+def _set_contract_attributes(s: Session, attrs: Iterable[Dict[str, Any]], chunk_size: int = 500) -> Dict[str, Any]:
+    """Upsert entity / product_line / geography per contract. Already-posted
+    journals of changed contracts move to their new summary buckets."""
+    attrs = {a["contract_id"]: a for a in attrs}
+    ids = list(attrs)
+    now = datetime.utcnow()
+    changed = 0
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        existing = {r.contract_id: r for r in s.exec(select(ContractAttributes)
+                                                     .where(ContractAttributes.contract_id.in_(chunk))).all()}
+        # contracts without attributes are summarized under entity "" / product_line ""
+        moved = [cid for cid in chunk
+                 if (attrs[cid].get("entity") or "", attrs[cid].get("product_line") or "")
+                 != ((existing[cid].entity, existing[cid].product_line) if cid in existing else ("", ""))]
+        if moved:
+            apply_entries(s, JournalEntry.contract_id.in_(moved), sign=-1)
+        for cid in chunk:
+            a = attrs[cid]
+            row = existing.get(cid) or ContractAttributes(contract_id=cid)
+            row.entity, row.product_line = a.get("entity") or "", a.get("product_line") or ""
+            row.geography, row.currency = a.get("geography") or "", a.get("currency") or "USD"
+            row.updated_at = now
+            s.add(row)
+        s.flush()
+        if moved:
+            apply_entries(s, JournalEntry.contract_id.in_(moved))
+        changed += len(moved)
+    s.commit()
+    return {"contracts": len(ids), "moved": changed}
+
+
+# ── Reads ───────────────────────────────────────────────────────
+
+def _get_summary(s: Session, period: str, entity: Optional[str] = None,
+                 product_line: Optional[str] = None) -> Dict[str, Any]:
+    stmt = select(GLSummary).where(GLSummary.period == period)
+    if entity is not None:
+        stmt = stmt.where(GLSummary.entity == entity)
+    if product_line is not None:
+        stmt = stmt.where(GLSummary.product_line == product_line)
+    rows = s.exec(stmt.order_by(GLSummary.entity, GLSummary.product_line, GLSummary.account)).all()
+    lines = [{"period": r.period, "account": r.account, "entity": r.entity, "product_line": r.product_line,
+              "debit": round(r.debit, 2), "credit": round(r.credit, 2),
+              "net": round(r.debit - r.credit, 2), "entries": r.entries} for r in rows]
+    return {"period": period, "lines": lines,
+            "total_debit": round(sum(l["debit"] for l in lines), 2),
+            "total_credit": round(sum(l["credit"] for l in lines), 2)}
+
+
+def _reconcile(s: Session, period: str) -> Dict[str, Any]:
+    """Summary vs. journal detail per account for one period."""
+    detail: Dict[str, List[float]] = {}
+    for _, account, _, _, dr, cr, _ in _detail_aggregate(s, JournalEntry.period == period):
+        d = detail.setdefault(account, [0.0, 0.0]); d[0] += dr or 0.0; d[1] += cr or 0.0
+    summary = {a: (dr, cr) for a, dr, cr in s.execute(
+        select(GLSummary.account, func.sum(GLSummary.debit), func.sum(GLSummary.credit))
+        .where(GLSummary.period == period).group_by(GLSummary.account)).all()}
+    diffs = []
+    for account in sorted(set(detail) | set(summary)):
+        ddr, dcr = detail.get(account, (0.0, 0.0))
+        sdr, scr = summary.get(account, (0.0, 0.0))
+        if abs(ddr - sdr) >= 0.005 or abs(dcr - scr) >= 0.005:
+            diffs.append({"account": account, "detail_debit": round(ddr, 2), "summary_debit": round(sdr, 2),
+                          "detail_credit": round(dcr, 2), "summary_credit": round(scr, 2)})
+    return {"period": period, "accounts": len(set(detail) | set(summary)), "ok": not diffs, "differences": diffs}
+
+
+# sync callers / async routers (see db.run_db)
+rebuild, arebuild = sync_db(_rebuild), async_db(_rebuild)
+set_contract_attributes, aset_contract_attributes = sync_db(_set_contract_attributes), async_db(_set_contract_attributes)
+get_summary, aget_summary = sync_db(_get_summary), async_db(_get_summary)
+reconcile, areconcile = sync_db(_reconcile), async_db(_reconcile)
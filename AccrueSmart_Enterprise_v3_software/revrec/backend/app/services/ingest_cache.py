@@ -0,0 +1,135 @@
+"""
+backend/app/services/ingest_cache.py
+Content-addressed cache for contract ingestion. Whole documents are keyed by
+the sha256 of their bytes (plus extraction mode and nlp_rules.RULES_VERSION)
+and map to the stored IngestResult; PDF pages are keyed by ocr.page_digests so
+a re-uploaded redline only re-extracts the pages that changed. Both tables are
+bounded and evict least-recently-used rows.
+"""
+from __future__ import annotations
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+import hashlib
+import json
+import os
+
+from sqlalchemy import Text, delete, func, update
+from sqlmodel import Field, SQLModel, Column, select
+from ..db import get_session, upsert_insert
+from .. import ocr
+from ..nlp_rules import RULES_VERSION
+from ..schemas import IngestResult
+
+MAX_DOCS = int(os.getenv("INGEST_CACHE_MAX_DOCS", "5000"))
+MAX_PAGES = int(os.getenv("INGEST_CACHE_MAX_PAGES", "100000"))
+
+
+# ── SQLModel tables ─────────────────────────────────────────────
+
+class IngestDocCache(SQLModel, table=True):
+    __tablename__ = "ingest_doc_cache"
+    key: str = Field(primary_key=True)          # sha256:kind:rules_version
+    kind: str                                   # "pdf" | "pdf_fast" | "text"
+    pages: Optional[int] = None
+    text: str = Field(default="", sa_column=Column(Text))
+    result: str = Field(sa_column=Column(Text))  # IngestResult JSON
+    size: int = 0
+    hits: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class IngestPageCache(SQLModel, table=True):
+    __tablename__ = "ingest_page_cache"
+    key: str = Field(primary_key=True)          # page digest:mode
+    text: str = Field(default="", sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+# ── Helpers ─────────────────────────────────────────────────────
+
+def doc_key(data: bytes, kind: str) -> str:
+    return f"{hashlib.sha256(data).hexdigest()}:{kind}:{RULES_VERSION}"
+
+
+def _mode(fast: bool) -> str:
+    return "fast" if fast else "layout"
+
+
+def _evict(s, model, limit: int) -> int:
+    """Drop the least-recently-used rows above `limit`."""
+    excess = s.exec(select(func.count()).select_from(model)).one() - limit
+    if excess <= 0:
+        return 0
+    oldest = select(model.key).order_by(model.last_used_at).limit(excess).scalar_subquery()
+    s.execute(delete(model).where(model.key.in_(oldest)))
+    return excess
+
+
+# ── Document results ────────────────────────────────────────────
+
+def get_result(key: str) -> Optional[IngestResult]:
+    with get_session() as s:
+        row = s.get(IngestDocCache, key)
+        if row is None:
+            return None
+        result = row.result
+        s.execute(update(IngestDocCache).where(IngestDocCache.key == key)
+                  .values(hits=IngestDocCache.hits + 1, last_used_at=datetime.utcnow()))
+        s.commit()
+    return IngestResult(**json.loads(result))
+
+
+def put_result(key: str, kind: str, result: IngestResult, text: str = "", size: int = 0) -> None:
+    data = result.model_dump() if hasattr(result, "model_dump") else result.dict()
+    now = datetime.utcnow()
+    values = {"pages": result.pages, "text": text, "result": json.dumps(data), "size": size, "last_used_at": now}
+    with get_session() as s:
+        # upsert: two uploads of the same document may finish together
+        ins = upsert_insert(s, IngestDocCache.__table__)
+        s.execute(ins.values(key=key, kind=kind, hits=0, created_at=now, **values)
+                  .on_conflict_do_update(index_elements=["key"], set_=values))
+        _evict(s, IngestDocCache, MAX_DOCS)
+        s.commit()
+
+
+# ── Per-page text ───────────────────────────────────────────────
+
+def extract_pages(b: bytes, fast: bool = False, workers: Optional[int] = None) -> List[ocr.PageText]:
+    """ocr.extract_pages_from_pdf_bytes, reusing cached text for unchanged pages."""
+    keys = [f"{d}:{_mode(fast)}" for d in ocr.page_digests(b)]
+    with get_session() as s:
+        cached: Dict[str, str] = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cached.update(s.execute(select(IngestPageCache.key, IngestPageCache.text)
+                                    .where(IngestPageCache.key.in_(chunk))).all())
+        missing = [i for i, k in enumerate(keys) if k not in cached]
+        fresh = dict(ocr.extract_pages_from_pdf_bytes(b, fast=fast, workers=workers, pagenos=missing)) if missing else {}
+        now = datetime.utcnow()
+        if cached:
+            hit = list(cached)
+            for i in range(0, len(hit), 500):
+                s.execute(update(IngestPageCache).where(IngestPageCache.key.in_(hit[i:i + 500]))
+                          .values(last_used_at=now))
+        new_rows: Dict[str, Dict[str, Any]] = {}
+        for i in missing:
+            if keys[i] not in cached and keys[i] not in new_rows:  # identical pages share a row
+                new_rows[keys[i]] = {"key": keys[i], "text": fresh[i + 1], "created_at": now, "last_used_at": now}
+        if new_rows:
+            # another request may have stored the same page meanwhile; its text is the same
+            s.execute(upsert_insert(s, IngestPageCache.__table__).on_conflict_do_nothing(index_elements=["key"]),
+                      list(new_rows.values()))
+            _evict(s, IngestPageCache, MAX_PAGES)
+        s.commit()
+    return [(n + 1, cached[k] if k in cached else fresh[n + 1]) for n, k in enumerate(keys)]
+
+
+def stats() -> Dict[str, Any]:
+    with get_session() as s:
+        docs, hits = s.exec(select(func.count(), func.coalesce(func.sum(IngestDocCache.hits), 0))
+                            .select_from(IngestDocCache)).one()
+        pages = s.exec(select(func.count()).select_from(IngestPageCache)).one()
+    return {"documents": docs, "document_hits": hits, "pages": pages,
+            "max_documents": MAX_DOCS, "max_pages": MAX_PAGES, "rules_version": RULES_VERSION}
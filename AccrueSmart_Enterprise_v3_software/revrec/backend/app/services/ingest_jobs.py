@@ -0,0 +1,212 @@
+"""
+backend/app/services/ingest_jobs.py
+Bulk contract ingestion. A job is a batch of uploaded files saved under
+./out/ingest_jobs/<job_id>/ and tracked in SQLite/Postgres (ingest_jobs,
+ingest_job_items); each file is extracted and parsed in a bounded process
+pool so the API event loop never runs pdfminer. Unfinished items are
+re-queued on startup.
+"""
+from __future__ import annotations
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+import json
+import os
+import shutil
+import threading
+import uuid
+
+from sqlalchemy import Text, func, update
+from sqlmodel import Field, SQLModel, Column, select
+from ..db import get_session
+from .. import ocr
+from ..parsing_pipeline import run_contract_parsing
+from ..schemas import IngestResult
+from . import ingest_cache
+
+JOBS_DIR = os.getenv("INGEST_JOBS_DIR", "./out/ingest_jobs")
+WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or (os.cpu_count() or 1)
+
+
+# ── SQLModel tables ─────────────────────────────────────────────
+
+class IngestJob(SQLModel, table=True):
+    __tablename__ = "ingest_jobs"
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
+    status: str = "queued"      # queued | running | done | failed
+    fast: bool = False
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+
+class IngestJobItem(SQLModel, table=True):
+    __tablename__ = "ingest_job_items"
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: str = Field(index=True)
+    filename: str
+    path: str
+    status: str = "queued"      # queued | done | failed
+    pages: Optional[int] = None
+    cached: bool = False
+    error: Optional[str] = None
+    result: Optional[str] = Field(default=None, sa_column=Column(Text))  # IngestResult JSON
+    finished_at: Optional[datetime] = None
+
+
+# ── Worker side (runs in the pool) ──────────────────────────────
+
+def _ingest_file(path: str, fast: bool) -> Dict[str, Any]:
+    """Extract + parse one file. One process per file, so pages stay in-process."""
+    with open(path, "rb") as fh:
+        b = fh.read()
+    if path.lower().endswith(".pdf"):
+        pages = ocr.extract_pages_from_pdf_bytes(b, fast=fast, workers=1)
+        text, starts = ocr.join_pages(pages)
+        res = run_contract_parsing(text, page_starts=starts); res.pages = len(pages)
+    else:
+        res = run_contract_parsing(b.decode("utf-8", errors="replace"))
+    return res.model_dump() if hasattr(res, "model_dump") else res.dict()
+
+
+# ── Dispatcher ──────────────────────────────────────────────────
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS)
+        return _pool
+
+
+def shutdown(wait: bool = True) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait)
+            _pool = None
+
+
+def _kind(path: str, fast: bool) -> str:
+    return ("pdf_fast" if fast else "pdf") if path.lower().endswith(".pdf") else "text"
+
+
+def _finish_item(item_id: int, job_id: str, result: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None, cached: bool = False) -> None:
+    now = datetime.utcnow()
+    with get_session() as s:
+        item = s.get(IngestJobItem, item_id)
+        if item is None or item.status != "queued":
+            return
+        item.status = "failed" if error else "done"
+        item.error, item.cached, item.finished_at = error, cached, now
+        if result is not None:
+            item.result, item.pages = json.dumps(result), result.get("pages")
+        s.add(item)
+        s.flush()
+        ok = error is None
+        s.execute(update(IngestJob).where(IngestJob.id == job_id).values(
+            done=IngestJob.done + (1 if ok else 0), failed=IngestJob.failed + (0 if ok else 1), status="running"))
+        job = s.get(IngestJob, job_id)
+        s.refresh(job)
+        if job.done + job.failed >= job.total:
+            job.status = "failed" if job.done == 0 and job.failed else "done"
+            job.finished_at = now
+            s.add(job)
+        s.commit()
+
+
+def _submit(item_id: int, job_id: str, path: str, fast: bool) -> None:
+    with open(path, "rb") as fh:
+        key = ingest_cache.doc_key(fh.read(), _kind(path, fast))
+    hit = ingest_cache.get_result(key)
+    if hit is not None:
+        _finish_item(item_id, job_id, hit.model_dump() if hasattr(hit, "model_dump") else hit.dict(), cached=True)
+        return
+
+    def done(fut: Future) -> None:
+        try:
+            result = fut.result()
+        except Exception as e:  # noqa: BLE001 - recorded on the item
+            _finish_item(item_id, job_id, error=f"{type(e).__name__}: {e}")
+            return
+        try:
+            ingest_cache.put_result(key, _kind(path, fast), IngestResult(**result), size=os.path.getsize(path))
+        finally:
+            _finish_item(item_id, job_id, result)
+
+    _get_pool().submit(_ingest_file, path, fast).add_done_callback(done)
+
+
+# ── Public API ──────────────────────────────────────────────────
+
+def create_job(files: List[Tuple[str, BinaryIO]], fast: bool = False) -> Dict[str, Any]:
+    """Save the uploads to disk, record the job and queue every file."""
+    job = IngestJob(fast=fast, total=len(files))
+    job_dir = os.path.join(JOBS_DIR, job.id)
+    os.makedirs(job_dir, exist_ok=True)
+    items: List[IngestJobItem] = []
+    for n, (name, fh) in enumerate(files):
+        safe = os.path.basename(name or f"file_{n}") or f"file_{n}"
+        path = os.path.join(job_dir, f"{n:05d}_{safe}")
+        with open(path, "wb") as out:
+            shutil.copyfileobj(fh, out, 1024 * 1024)
+        items.append(IngestJobItem(job_id=job.id, filename=safe, path=path))
+    with get_session() as s:
+        s.add(job)
+        s.add_all(items)
+        s.commit()
+        queued = [(i.id, i.path) for i in items]
+        job_id = job.id
+    for item_id, path in queued:
+        _submit(item_id, job_id, path, fast)
+    return get_job(job_id)
+
+
+def resume_pending() -> int:
+    """Re-queue items left unfinished by a restart."""
+    with get_session() as s:
+        pending = s.exec(select(IngestJobItem, IngestJob.fast)
+                         .join(IngestJob, IngestJob.id == IngestJobItem.job_id)
+                         .where(IngestJobItem.status == "queued")).all()
+        pending = [(i.id, i.job_id, i.path, fast) for i, fast in pending]
+    for item_id, job_id, path, fast in pending:
+        if os.path.exists(path):
+            _submit(item_id, job_id, path, fast)
+        else:
+            _finish_item(item_id, job_id, error="upload missing after restart")
+    return len(pending)
+
+
+def get_job(job_id: str) -> Dict[str, Any]:
+    with get_session() as s:
+        job = s.get(IngestJob, job_id)
+        if job is None:
+            raise KeyError(f"Unknown ingest job '{job_id}'")
+        counts = dict(s.exec(select(IngestJobItem.status, func.count())
+                             .where(IngestJobItem.job_id == job_id)
+                             .group_by(IngestJobItem.status)).all())
+        return {
+            "job_id": job.id, "status": job.status, "fast": job.fast, "total": job.total,
+            "done": job.done, "failed": job.failed, "queued": counts.get("queued", 0),
+            "created_at": job.created_at.isoformat() + "Z",
+            "finished_at": job.finished_at.isoformat() + "Z" if job.finished_at else None,
+        }
+
+
+def get_job_results(job_id: str, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+    status = get_job(job_id)
+    with get_session() as s:
+        items = s.exec(select(IngestJobItem).where(IngestJobItem.job_id == job_id)
+                       .order_by(IngestJobItem.id).offset(offset).limit(limit)).all()
+        status["items"] = [{
+            "filename": i.filename, "status": i.status, "pages": i.pages, "cached": i.cached,
+            "error": i.error, "result": json.loads(i.result) if i.result else None,
+        } for i in items]
+    return status
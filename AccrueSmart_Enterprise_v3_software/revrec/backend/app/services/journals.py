@@ -0,0 +1,214 @@
+"""
+backend/app/services/journals.py
+Journal subledger. Every entry is one Dr/Cr pair (the CSVLedger row shape)
+stored in journal_entries, indexed for the three ways it is read: by period
+(trial balance), by account (account activity) and by contract (history).
+All reports are aggregate SQL over the table, never a scan in Python.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+import uuid
+
+from sqlalchemy import Index, and_, case, delete, func, insert, literal, or_, union_all
+from sqlmodel import Field, Session, SQLModel, select
+from ..db import sync_db, async_db
+from .schedules_crud import ScheduleEditRow
+
+DEFERRED_REVENUE = "2100-Deferred Revenue"
+REVENUE = "4000-Revenue"
+
+
+# ── SQLModel table ──────────────────────────────────────────────
+
+class JournalEntry(SQLModel, table=True):
+    __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index("ix_journal_entries_debit_period", "debit_account", "period"),
+        Index("ix_journal_entries_credit_period", "credit_account", "period"),
+        Index("ix_journal_entries_contract_period", "contract_id", "period"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    period: str = Field(index=True)           # "2025-01"
+    debit_account: str
+    credit_account: str
+    amount: float
+    memo: str = ""
+    contract_id: str = ""
+    source: str = "manual"                    # manual | catchup | revenue | ...
+    batch_id: str = Field(default="", index=True)
+    posted: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+def _entry_dict(e: JournalEntry) -> Dict[str, Any]:
+    return {"id": e.id, "period": e.period, "debit": e.debit_account, "credit": e.credit_account,
+            "amount": round(e.amount, 2), "memo": e.memo, "contract_id": e.contract_id,
+            "source": e.source, "batch_id": e.batch_id, "posted": e.posted}
+
+
+def _period_filter(col, period: Optional[str], period_from: Optional[str], period_to: Optional[str]):
+    if period:
+        return [col == period]
+    conds = []
+    if period_from:
+        conds.append(col >= period_from)
+    if period_to:
+        conds.append(col <= period_to)
+    return conds
+
+
+# ── Posting ─────────────────────────────────────────────────────
+
+def _post_entries(s: Session, entries: Iterable[Dict[str, Any]], source: str = "manual",
+                  batch_id: Optional[str] = None, posted: bool = True,
+                  chunk_size: int = 5000) -> Dict[str, Any]:
+    """Bulk insert entries (dicts with the CSVLedger.post fields: period, debit,
+    credit, amount, memo, contract_id) as one batch, executemany per chunk,
+    and add them to gl_summary in the same transaction."""
+    from . import gl_summary
+    batch_id = batch_id or str(uuid.uuid4())
+    now = datetime.utcnow()
+    floor = s.exec(select(func.max(JournalEntry.id))).one() or 0
+    count, total, chunk = 0, 0.0, []
+    for e in entries:
+        amount = round(float(e["amount"]), 2)
+        chunk.append({"period": e["period"], "debit_account": e["debit"], "credit_account": e["credit"],
+                      "amount": amount, "memo": e.get("memo") or "", "contract_id": e.get("contract_id") or "",
+                      "source": source, "batch_id": batch_id, "posted": posted, "created_at": now})
+        count += 1; total += amount
+        if len(chunk) >= chunk_size:
+            s.execute(insert(JournalEntry), chunk); chunk = []
+    if chunk:
+        s.execute(insert(JournalEntry), chunk)
+    gl_summary.apply_entries(s, and_(JournalEntry.batch_id == batch_id, JournalEntry.id > floor))
+    s.commit()
+    return {"batch_id": batch_id, "entries": count, "amount": round(total, 2)}
+
+
+# ── Revenue journals from schedules ─────────────────────────────
+
+REVENUE_LEVELS = ("contract", "revrec_code")
+
+
+def _generate_revenue_journals(s: Session, period: str, level: str = "contract",
+                               debit_account: str = DEFERRED_REVENUE,
+                               credit_account: str = REVENUE) -> Dict[str, Any]:
+    """Post `period`'s recognized revenue from schedules_edit: one Dr Deferred
+    Revenue / Cr Revenue entry per contract, or per revrec code (GL summary).
+    A line's revrec code is its own, else its product's mapped code, as in
+    schedule generation. Aggregation and posting are a single INSERT ... SELECT.
+    Re-running a period replaces its earlier revenue batch instead of adding to it."""
+    if level not in REVENUE_LEVELS:
+        raise ValueError(f"level must be one of {REVENUE_LEVELS}")
+    batch_id = f"revenue:{period}"
+    t = ScheduleEditRow.__table__
+    rows = t
+    if level == "contract":
+        key = t.c.contract_id
+    else:
+        from .codes_crud import ProductCode, ProductRevrecMap, RevrecCode
+        p, m, r = ProductCode.__table__, ProductRevrecMap.__table__, RevrecCode.__table__
+        mapped = (select(p.c.code.label("product_code"), r.c.code.label("revrec_code"))
+                  .join(m, m.c.product_id == p.c.id).join(r, r.c.id == m.c.revrec_id).subquery())
+        rows = t.outerjoin(mapped, mapped.c.product_code == t.c.product_code)
+        key = func.coalesce(func.nullif(t.c.revrec_code, ""), mapped.c.revrec_code)
+    total = func.round(func.sum(t.c.amount), 2)
+    # net negative lines (reversals) post the other way round
+    src = (select(literal(period), case((total >= 0, debit_account), else_=credit_account),
+                  case((total >= 0, credit_account), else_=debit_account), func.abs(total),
+                  literal(f"Revenue {period} ") + func.coalesce(key, ""),
+                  t.c.contract_id if level == "contract" else literal(""),
+                  literal("revenue"), literal(batch_id), literal(True), literal(datetime.utcnow()))
+           .select_from(rows).where(t.c.period == period).group_by(key).having(total != 0))
+
+    from . import gl_summary
+    in_batch = JournalEntry.batch_id == batch_id
+    gl_summary.apply_entries(s, in_batch, sign=-1)
+    replaced = s.execute(delete(JournalEntry).where(in_batch)).rowcount or 0
+    s.execute(insert(JournalEntry).from_select(
+        ["period", "debit_account", "credit_account", "amount", "memo", "contract_id",
+         "source", "batch_id", "posted", "created_at"], src))
+    gl_summary.apply_entries(s, in_batch)
+    count, net = s.exec(select(func.count(), func.coalesce(func.sum(
+        case((JournalEntry.debit_account == debit_account, JournalEntry.amount), else_=-JournalEntry.amount)), 0))
+        .where(in_batch)).one()
+    s.commit()
+    return {"period": period, "level": level, "batch_id": batch_id, "entries": count,
+            "amount": round(net, 2), "replaced": max(replaced, 0)}
+
+
+# ── Reports ─────────────────────────────────────────────────────
+
+def _trial_balance(s: Session, period: Optional[str] = None, through: Optional[str] = None,
+                   period_from: Optional[str] = None) -> Dict[str, Any]:
+    """Debit / credit totals per account for one period, or cumulative up to
+    `through` (month-end TB). Only posted entries count."""
+    t = JournalEntry.__table__
+    conds = [t.c.posted.is_(True)] + _period_filter(t.c.period, period, period_from, through)
+    sides = union_all(
+        select(t.c.debit_account.label("account"), func.sum(t.c.amount).label("debit"),
+               literal(0.0).label("credit")).where(*conds).group_by(t.c.debit_account),
+        select(t.c.credit_account.label("account"), literal(0.0).label("debit"),
+               func.sum(t.c.amount).label("credit")).where(*conds).group_by(t.c.credit_account),
+    ).subquery()
+    rows = s.execute(select(sides.c.account, func.sum(sides.c.debit), func.sum(sides.c.credit))
+                     .group_by(sides.c.account).order_by(sides.c.account)).all()
+    accounts = [{"account": a, "debit": round(d or 0.0, 2), "credit": round(c or 0.0, 2),
+                 "balance": round((d or 0.0) - (c or 0.0), 2)} for a, d, c in rows]
+    total_dr = round(sum(a["debit"] for a in accounts), 2)
+    total_cr = round(sum(a["credit"] for a in accounts), 2)
+    return {"period": period, "period_from": period_from, "through": through, "accounts": accounts,
+            "total_debit": total_dr, "total_credit": total_cr, "balanced": abs(total_dr - total_cr) < 0.005}
+
+
+def _account_activity(s: Session, account: str, period_from: Optional[str] = None,
+                      period_to: Optional[str] = None, after_id: int = 0, limit: int = 500) -> Dict[str, Any]:
+    """Per-period debit/credit totals for `account`, plus a keyset page of its entries."""
+    t = JournalEntry.__table__
+    pconds = [t.c.posted.is_(True)] + _period_filter(t.c.period, None, period_from, period_to)
+    sides = union_all(
+        select(t.c.period, func.sum(t.c.amount).label("debit"), literal(0.0).label("credit"))
+        .where(t.c.debit_account == account, *pconds).group_by(t.c.period),
+        select(t.c.period, literal(0.0).label("debit"), func.sum(t.c.amount).label("credit"))
+        .where(t.c.credit_account == account, *pconds).group_by(t.c.period),
+    ).subquery()
+    by_period = [{"period": p, "debit": round(d or 0.0, 2), "credit": round(c or 0.0, 2),
+                  "net": round((d or 0.0) - (c or 0.0), 2)}
+                 for p, d, c in s.execute(select(sides.c.period, func.sum(sides.c.debit), func.sum(sides.c.credit))
+                                          .group_by(sides.c.period).order_by(sides.c.period)).all()]
+    entries = s.exec(select(JournalEntry)
+                     .where(or_(JournalEntry.debit_account == account, JournalEntry.credit_account == account),
+                            JournalEntry.id > after_id,
+                            *_period_filter(JournalEntry.period, None, period_from, period_to))
+                     .order_by(JournalEntry.id).limit(limit)).all()
+    items = [_entry_dict(e) for e in entries]
+    return {"account": account, "by_period": by_period, "entries": items,
+            "next_after_id": items[-1]["id"] if len(items) == limit else None}
+
+
+def _contract_history(s: Session, contract_id: str, period_from: Optional[str] = None,
+                      period_to: Optional[str] = None) -> Dict[str, Any]:
+    entries = s.exec(select(JournalEntry)
+                     .where(JournalEntry.contract_id == contract_id,
+                            *_period_filter(JournalEntry.period, None, period_from, period_to))
+                     .order_by(JournalEntry.period, JournalEntry.id)).all()
+    items = [_entry_dict(e) for e in entries]
+    return {"contract_id": contract_id, "entries": items,
+            "total": round(sum(i["amount"] for i in items if i["posted"]), 2)}
+
+
+def _journal_stats(s: Session) -> Dict[str, int]:
+    total, posted = s.exec(select(func.count(), func.coalesce(func.sum(case((JournalEntry.posted, 1), else_=0)), 0))
+                           .select_from(JournalEntry)).one()
+    return {"total_journals": total, "posted_journals": posted, "unposted_journals": total - posted}
+
+
+# sync callers / async routers (see db.run_db)
+post_entries, apost_entries = sync_db(_post_entries), async_db(_post_entries)
+trial_balance, atrial_balance = sync_db(_trial_balance), async_db(_trial_balance)
+account_activity, aaccount_activity = sync_db(_account_activity), async_db(_account_activity)
+contract_history, acontract_history = sync_db(_contract_history), async_db(_contract_history)
+journal_stats, ajournal_stats = sync_db(_journal_stats), async_db(_journal_stats)
+generate_revenue_journals = sync_db(_generate_revenue_journals)
+agenerate_revenue_journals = async_db(_generate_revenue_journals)
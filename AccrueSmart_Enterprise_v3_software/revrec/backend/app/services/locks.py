@@ -1,13 +1,17 @@
 # backend/app/services/locks.py
 from __future__ import annotations
-import json, hashlib
+import json, hashlib, re
 from datetime import datetime
-from typing import Optional, Dict, Any
-from sqlmodel import Field, SQLModel, Session, select
-from ..db import engine, get_session
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from sqlalchemy import JSON, Index, func, insert
+from sqlmodel import Field, SQLModel, Session, select, Column
+from ..db import engine, get_session, sync_db, async_db
+from .schedules_crud import ScheduleEditRow
 
 
 class ScheduleLock(SQLModel, table=True):
+    # latest lock per contract (window function / DISTINCT ON)
+    __table_args__ = (Index("ix_schedulelock_contract_locked_at", "contract_id", "locked_at"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     contract_id: str = Field(index=True)
     schedule_hash: str
@@ -15,6 +19,9 @@ class ScheduleLock(SQLModel, table=True):
     approver_email: Optional[str] = None
     note: Optional[str] = None
     locked_at: datetime = Field(default_factory=datetime.utcnow)
+    merkle_root: Optional[str] = None
+    # {period: leaf hash}; None on locks made before period hashing
+    period_hashes: Optional[Dict[str, str]] = Field(default=None, sa_column=Column(JSON))
 
 
 def init_models():
@@ -27,44 +34,246 @@ def hash_schedule(schedule: Dict[str, Any]) -> str:
     return hashlib.sha256(blob.encode("utf-8")).hexdigest()
 
 
-def save_lock(contract_id: str, schedule: Dict[str, Any], approver_sub: str,
-              approver_email: Optional[str], note: Optional[str] = None) -> Dict[str, Any]:
+# ── Period-level Merkle hashing ─────────────────────────────────
+# Every scalar in the schedule JSON belongs to the first "YYYY-MM" key on its
+# path ("*" if none), so {period: amt} and {po_id: {period: amt}} both give
+# one leaf per period. Leaves, sorted by period, are hashed pairwise up to a
+# root. Equal roots mean nothing changed; otherwise the top-down walk only
+# descends into subtrees whose hashes differ.
+
+_PERIOD_RE = re.compile(r"^\d{4}-\d{2}$")
+
+
+def _sha(b: bytes) -> str:
+    return hashlib.sha256(b).hexdigest()
+
+
+def period_leaves(schedule: Any) -> Dict[str, str]:
+    """{period: sha256 of that period's values} for a schedule JSON."""
+    items: Dict[str, List[Tuple[str, Any]]] = {}
+
+    def walk(node: Any, path: Tuple[str, ...], period: Optional[str]) -> None:
+        if isinstance(node, dict):
+            for k, v in node.items():
+                k = str(k)
+                if period is None and _PERIOD_RE.match(k):
+                    walk(v, path, k)
+                else:
+                    walk(v, path + (k,), period)
+        elif isinstance(node, list):
+            for i, v in enumerate(node):
+                walk(v, path + (str(i),), period)
+        else:
+            items.setdefault(period or "*", []).append(("/".join(path), node))
+
+    walk(schedule, (), None)
+    return {p: _sha(json.dumps(sorted(v, key=lambda kv: kv[0]), separators=(",", ":"), default=str).encode("utf-8"))
+            for p, v in items.items()}
+
+
+def merkle_levels(leaves: Dict[str, str]) -> List[List[str]]:
+    """Tree levels, leaves (in period order) first, root level last."""
+    level = [_sha(f"{p}:{h}".encode("utf-8")) for p, h in sorted(leaves.items())]
+    levels = [level or [_sha(b"")]]
+    while len(levels[-1]) > 1:
+        prev = levels[-1]
+        levels.append([_sha((prev[i] + prev[i + 1]).encode("ascii")) if i + 1 < len(prev) else prev[i]
+                       for i in range(0, len(prev), 2)])
+    return levels
+
+
+def merkle_root(leaves: Dict[str, str]) -> str:
+    return merkle_levels(leaves)[-1][0]
+
+
+def diff_periods(locked: Dict[str, str], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """Periods changed / added / removed between two leaf maps."""
+    added = sorted(set(current) - set(locked))
+    removed = sorted(set(locked) - set(current))
+    shared = sorted(set(locked) & set(current))
+    a = merkle_levels({p: locked[p] for p in shared})
+    b = merkle_levels({p: current[p] for p in shared})
+    changed: List[str] = []
+    if shared:
+        # same periods -> same shape: walk down from the root through differing nodes only
+        frontier = [0] if a[-1][0] != b[-1][0] else []
+        for depth in range(len(a) - 1, 0, -1):
+            below, nxt = depth - 1, []
+            for i in frontier:
+                for j in (2 * i, 2 * i + 1):
+                    if j < len(a[below]) and a[below][j] != b[below][j]:
+                        nxt.append(j)
+            frontier = nxt
+        changed = [shared[i] for i in frontier]
+    return {"changed": changed, "added": added, "removed": removed}
+
+
+def _save_lock(s: Session, contract_id: str, schedule: Dict[str, Any], approver_sub: str,
+               approver_email: Optional[str], note: Optional[str] = None) -> Dict[str, Any]:
     digest = hash_schedule(schedule)
-    with get_session() as s:
-        lock = ScheduleLock(
-            contract_id=contract_id,
-            schedule_hash=digest,
-            approver_sub=approver_sub,
-            approver_email=approver_email,
-            note=note or "",
-        )
-        s.add(lock)
-        s.commit()
-        s.refresh(lock)
-        return {
-            "id": lock.id,
-            "contract_id": contract_id,
-            "hash": digest,
-            "approver": approver_email or approver_sub,
-            "locked_at": lock.locked_at.isoformat() + "Z",
-            "note": lock.note,
-        }
-
-
-def get_lock_status(contract_id: str) -> Dict[str, Any]:
-    with get_session() as s:
-        stmt = (
-            select(ScheduleLock)
-            .where(ScheduleLock.contract_id == contract_id)
-            .order_by(ScheduleLock.locked_at.desc())
-        )
-        row = s.exec(stmt).first()
-        if not row:
-            return {"locked": False}
-        return {
-            "locked": True,
-            "hash": row.schedule_hash,
+    leaves = period_leaves(schedule)
+    lock = ScheduleLock(
+        contract_id=contract_id,
+        schedule_hash=digest,
+        merkle_root=merkle_root(leaves),
+        period_hashes=leaves,
+        approver_sub=approver_sub,
+        approver_email=approver_email,
+        note=note or "",
+    )
+    s.add(lock)
+    s.commit()
+    s.refresh(lock)
+    return {
+        "id": lock.id,
+        "contract_id": contract_id,
+        "hash": digest,
+        "merkle_root": lock.merkle_root,
+        "periods": len(leaves),
+        "approver": approver_email or approver_sub,
+        "locked_at": lock.locked_at.isoformat() + "Z",
+        "note": lock.note,
+    }
+
+
+def _get_lock_status(s: Session, contract_id: str) -> Dict[str, Any]:
+    stmt = (
+        select(ScheduleLock)
+        .where(ScheduleLock.contract_id == contract_id)
+        .order_by(ScheduleLock.locked_at.desc())
+    )
+    row = s.exec(stmt).first()
+    if not row:
+        return {"locked": False}
+    return {
+        "locked": True,
+        "hash": row.schedule_hash,
+        "approver": row.approver_email or row.approver_sub,
+        "locked_at": row.locked_at.isoformat() + "Z",
+        "note": row.note or "",
+    }
+
+
+def _lock_values(contract_id: str, schedule: Dict[str, Any], approver_sub: str,
+                 approver_email: Optional[str], note: Optional[str], now: datetime) -> Dict[str, Any]:
+    leaves = period_leaves(schedule)
+    return {"contract_id": contract_id, "schedule_hash": hash_schedule(schedule), "approver_sub": approver_sub,
+            "approver_email": approver_email, "note": note or "", "locked_at": now,
+            "merkle_root": merkle_root(leaves), "period_hashes": leaves}
+
+
+def _insert_locks(s: Session, values: List[Dict[str, Any]], chunk_size: int = 2000) -> None:
+    for i in range(0, len(values), chunk_size):
+        s.execute(insert(ScheduleLock), values[i:i + chunk_size])
+
+
+def _save_locks(s: Session, items: Iterable[Dict[str, Any]], approver_sub: str,
+                approver_email: Optional[str], note: Optional[str] = None) -> Dict[str, Any]:
+    """Lock many {contract_id, schedule} at once: one transaction, executemany inserts."""
+    now = datetime.utcnow()
+    values = [_lock_values(it["contract_id"], it["schedule"], approver_sub, approver_email,
+                           it.get("note") or note, now) for it in items]
+    _insert_locks(s, values)
+    s.commit()
+    return {"locked": len(values), "locked_at": now.isoformat() + "Z",
+            "locks": [{"contract_id": v["contract_id"], "hash": v["schedule_hash"],
+                       "merkle_root": v["merkle_root"]} for v in values]}
+
+
+def grid_schedules(s: Session, contract_ids=None, batch_size: int = 5000) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """(contract_id, {line_no: {period: amount}}) from schedules_edit, streamed in
+    contract order. `contract_ids` is a list or a select of ids (None: all)."""
+    t = ScheduleEditRow.__table__
+    stmt = select(t.c.contract_id, t.c.line_no, t.c.period, t.c.amount)
+    if contract_ids is not None:
+        stmt = stmt.where(t.c.contract_id.in_(contract_ids))
+    stmt = stmt.order_by(t.c.contract_id, t.c.line_no, t.c.period).execution_options(yield_per=batch_size)
+    cur, sched = None, {}
+    for cid, line_no, period, amount in s.execute(stmt):
+        if cid != cur:
+            if cur is not None:
+                yield cur, sched
+            cur, sched = cid, {}
+        sched.setdefault(str(line_no), {})[period] = amount
+    if cur is not None:
+        yield cur, sched
+
+
+def _lock_period(s: Session, period: str, approver_sub: str, approver_email: Optional[str],
+                 note: Optional[str] = None) -> Dict[str, Any]:
+    """Close `period`: lock the stored grid of every contract with amounts in it,
+    in one transaction."""
+    now = datetime.utcnow()
+    note = note or f"Close {period}"
+    ids = select(ScheduleEditRow.contract_id).where(ScheduleEditRow.period == period).distinct()
+    # hashes only are kept per contract, the grid rows stream through
+    values = [_lock_values(cid, sched, approver_sub, approver_email, note, now)
+              for cid, sched in grid_schedules(s, ids)]
+    _insert_locks(s, values)
+    s.commit()
+    return {"period": period, "locked": len(values), "locked_at": now.isoformat() + "Z", "note": note}
+
+
+def _latest_locks(s: Session, contract_ids: List[str], chunk_size: int = 1000) -> Dict[str, ScheduleLock]:
+    """Most recent ScheduleLock per contract: one ROW_NUMBER() query per chunk of ids."""
+    out: Dict[str, ScheduleLock] = {}
+    for i in range(0, len(contract_ids), chunk_size):
+        chunk = contract_ids[i:i + chunk_size]
+        ranked = (select(ScheduleLock.id, func.row_number().over(
+                      partition_by=ScheduleLock.contract_id,
+                      order_by=(ScheduleLock.locked_at.desc(), ScheduleLock.id.desc())).label("rn"))
+                  .where(ScheduleLock.contract_id.in_(chunk)).subquery())
+        rows = s.exec(select(ScheduleLock).join(ranked, ranked.c.id == ScheduleLock.id)
+                      .where(ranked.c.rn == 1)).all()
+        out.update((r.contract_id, r) for r in rows)
+    return out
+
+
+def _verify_locks(s: Session, items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Check each {contract_id, schedule} against its latest lock and name the
+    periods that drifted. Locks made before period hashing can only report
+    whether the whole schedule still matches."""
+    items = list(items)
+    latest = _latest_locks(s, list({it["contract_id"] for it in items}))
+    results, counts = [], {"ok": 0, "drifted": 0, "unlocked": 0}
+    for it in items:
+        cid, lock = it["contract_id"], latest.get(it["contract_id"])
+        res: Dict[str, Any] = {"contract_id": cid}
+        if lock is None:
+            res["status"] = "unlocked"
+        elif lock.period_hashes is None:
+            same = hash_schedule(it["schedule"]) == lock.schedule_hash
+            res.update(status="ok" if same else "drifted", legacy=True)
+        else:
+            leaves = period_leaves(it["schedule"])
+            if merkle_root(leaves) == lock.merkle_root:
+                res["status"] = "ok"
+            else:
+                res.update(status="drifted", **diff_periods(lock.period_hashes, leaves))
+        if lock is not None:
+            res.update(lock_id=lock.id, locked_at=lock.locked_at.isoformat() + "Z")
+        counts[res["status"]] += 1
+        results.append(res)
+    return {"checked": len(items), **counts, "results": results}
+
+
+def _get_lock_statuses(s: Session, contract_ids: List[str]) -> Dict[str, Any]:
+    """get_lock_status for many contracts, latest locks fetched in one query per chunk."""
+    latest = _latest_locks(s, list(dict.fromkeys(contract_ids)))
+    out = {}
+    for cid in contract_ids:
+        row = latest.get(cid)
+        out[cid] = {"locked": False} if row is None else {
+            "locked": True, "hash": row.schedule_hash, "merkle_root": row.merkle_root,
             "approver": row.approver_email or row.approver_sub,
-            "locked_at": row.locked_at.isoformat() + "Z",
-            "note": row.note or "",
-        }
+            "locked_at": row.locked_at.isoformat() + "Z", "note": row.note or ""}
+    return {"contracts": len(out), "locked": sum(1 for v in out.values() if v["locked"]), "statuses": out}
+
+
+# sync callers / async routers (see db.run_db)
+save_lock, asave_lock = sync_db(_save_lock), async_db(_save_lock)
+get_lock_status, aget_lock_status = sync_db(_get_lock_status), async_db(_get_lock_status)
+verify_locks, averify_locks = sync_db(_verify_locks), async_db(_verify_locks)
+save_locks, asave_locks = sync_db(_save_locks), async_db(_save_locks)
+lock_period, alock_period = sync_db(_lock_period), async_db(_lock_period)
+get_lock_statuses, aget_lock_statuses = sync_db(_get_lock_statuses), async_db(_get_lock_statuses)
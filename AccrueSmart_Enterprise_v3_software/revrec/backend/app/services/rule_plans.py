@@ -0,0 +1,246 @@
+"""
+backend/app/services/rule_plans.py
+Batch form of revrec_codes.apply_rule. A (rule, start) pair is compiled once
+into a RulePlan: its output periods plus the arithmetic to spread an amount
+over them. A plan then runs over an array of amounts with numpy, reproducing
+apply_rule's rounding and penny fixes line for line. regenerate_grids uses it
+to rebuild schedules_edit grids from the code catalog.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete
+from sqlmodel import select
+
+from ..db import get_session
+from .revrec_codes import LineItem, _month_add, _to_ym
+from .schedules_crud import ScheduleDirty, ScheduleEditRow, _row_values, replace_grids
+from . import codes_crud
+
+
+# ── Plans ───────────────────────────────────────────────────────
+
+def _round2(a: np.ndarray) -> np.ndarray:
+    """round(x, 2) elementwise with Python's semantics. np.round scales by 100
+    first, which can tip values sitting on a half cent (38260.975 -> .98 where
+    round() gives .97); those few are redone with round()."""
+    r = np.round(a, 2)
+    near = np.abs(np.abs(a * 100.0) % 1.0 - 0.5) < 1e-6
+    if near.any():
+        r[near] = [round(v, 2) for v in a[near].tolist()]
+    return r
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """periods: output keys in apply_rule's insertion order.
+    split: straight-line, each period gets round(amount / len(periods), 2).
+    ops: otherwise, (column, weight) steps applied as col = round(col + amount*w, 2).
+    fix_col: column receiving the penny correction (None: no correction)."""
+    periods: Tuple[str, ...]
+    split: bool = False
+    ops: Tuple[Tuple[int, float], ...] = ()
+    fix_col: Optional[int] = None
+
+    def run(self, amounts: np.ndarray) -> np.ndarray:
+        """(n,) amounts -> (n, len(periods)) schedule matrix."""
+        amounts = np.asarray(amounts, dtype=float)
+        out = np.zeros((len(amounts), len(self.periods)))
+        if not self.periods:
+            return out
+        if self.split:
+            out[:] = _round2(amounts / len(self.periods))[:, None]
+        else:
+            for col, w in self.ops:
+                out[:, col] = _round2(out[:, col] + amounts * w)
+        if self.fix_col is not None:
+            total = np.zeros(len(amounts))
+            for j in range(out.shape[1]):      # left-to-right like sum(dict.values())
+                total += out[:, j]
+            diff = _round2(amounts - total)
+            fix = np.abs(diff) >= 0.01
+            out[fix, self.fix_col] = _round2(out[fix, self.fix_col] + diff[fix])
+        return out
+
+
+def _weights_plan(items: Iterable[Tuple[str, float]], fix: bool = True) -> RulePlan:
+    periods: List[str] = []
+    index: Dict[str, int] = {}
+    ops = []
+    for ym, w in items:
+        if ym not in index:
+            index[ym] = len(periods)
+            periods.append(ym)
+        ops.append((index[ym], float(w)))
+    fix_col = index[max(periods)] if fix and periods else None
+    return RulePlan(periods=tuple(periods), ops=tuple(ops), fix_col=fix_col)
+
+
+def compile_plan(rule_type: str, params: Dict[str, Any], li: Optional[LineItem] = None) -> RulePlan:
+    """Same parameter precedence as apply_rule; `li` supplies line-level fallbacks."""
+    li = li or LineItem(product_code="", revrec_code="", amount=0.0)
+    if rule_type == "straight_line":
+        months = int(params.get("months") or 12)
+        start = date.fromisoformat(params.get("start_date") or (li.start_date or "2025-01-01"))
+        periods = tuple(_to_ym(_month_add(start, i)) for i in range(months))
+        return RulePlan(periods=periods, split=True, fix_col=months - 1)
+    if rule_type == "point_in_time":
+        on = date.fromisoformat(params.get("recognition_date") or li.recognition_date or "2025-01-15")
+        return _weights_plan([(_to_ym(on), 1.0)], fix=False)
+    if rule_type == "usage":
+        return _weights_plan((li.usage_curve or params.get("curve") or {}).items())
+    if rule_type == "milestone":
+        weights = params.get("weights") or (li.milestones or {})
+        month_map = params.get("month_map") or {}
+        return _weights_plan((month_map[ms], w) for ms, w in weights.items() if month_map.get(ms))
+    if rule_type == "percent_complete":
+        return _weights_plan((params.get("pct_by_month") or (li.percent_complete or {})).items())
+    raise ValueError(f"Unknown rule_type: {rule_type}")
+
+
+def _plan_key(rule_type: str, li: LineItem) -> Tuple:
+    # line fields compile_plan may read for this rule type
+    if rule_type == "straight_line":
+        return (li.start_date,)
+    if rule_type == "point_in_time":
+        return (li.recognition_date,)
+    if rule_type == "usage":
+        return (tuple((li.usage_curve or {}).items()),)
+    if rule_type == "milestone":
+        return (tuple((li.milestones or {}).items()),)
+    if rule_type == "percent_complete":
+        return (tuple((li.percent_complete or {}).items()),)
+    return ()
+
+
+def apply_rule_batch(rule_type: str, params: Dict[str, Any], items: List[LineItem]) -> List[Dict[str, float]]:
+    """[apply_rule(rule_type, params, li) for li in items], one plan per distinct line shape."""
+    groups: Dict[Tuple, List[int]] = {}
+    for i, li in enumerate(items):
+        groups.setdefault(_plan_key(rule_type, li), []).append(i)
+    out: List[Dict[str, float]] = [{} for _ in items]
+    for idx in groups.values():
+        plan = compile_plan(rule_type, params, items[idx[0]])
+        mat = plan.run(np.array([items[i].amount for i in idx]))
+        for row, i in zip(mat.tolist(), idx):
+            out[i] = dict(zip(plan.periods, row))
+    return out
+
+
+# ── Grid regeneration ───────────────────────────────────────────
+
+def _resolve_rule(revrec_code: str, product_code: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """(revrec_code, rule_type, params): the line's own revrec code, else its product's mapping."""
+    rule = codes_crud.get_revrec_rule(revrec_code) if revrec_code else None
+    if rule is not None:
+        return rule["code"], rule["rule_type"], rule["params"] or {}
+    rule = codes_crud.resolve(product_code) if product_code else None
+    if rule is not None:
+        return rule["revrec_code"], rule["rule_type"], rule["params"] or {}
+    return None
+
+
+def _regenerate_chunk(contract_ids: List[str], only_lines: Optional[set] = None,
+                      as_of: Optional[datetime] = None) -> Dict[str, int]:
+    """Regenerate the chunk's lines (only `only_lines` if given) and clear their
+    dirty marks made up to `as_of`, in one transaction. Only the regenerated
+    lines are rewritten; every other line of the contract keeps its stored rows.
+    Returns "lines" (lines read) and "lines_regenerated" (lines rewritten)."""
+    as_of = as_of or datetime.utcnow()
+    with get_session() as s:
+        # plain row tuples, not ORM objects: a chunk can hold millions of cells
+        t = ScheduleEditRow.__table__
+        rows = s.execute(t.select()
+                         .where(t.c.contract_id.in_(contract_ids))
+                         .order_by(t.c.contract_id, t.c.line_no, t.c.period)).all()
+        # one line = all periods of (contract_id, line_no); its amount is their sum
+        lines: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for r in rows:
+            ln = lines.get((r.contract_id, r.line_no))
+            if ln is None:
+                ln = lines[(r.contract_id, r.line_no)] = {
+                    "product_code": r.product_code, "revrec_code": r.revrec_code,
+                    "start": r.period, "amount": 0.0}
+            ln["amount"] += r.amount
+
+        plans: Dict[Tuple, RulePlan] = {}
+        groups: Dict[Tuple, List[Tuple[str, int]]] = {}
+        # lines of a chunk share few (revrec_code, product_code) pairs: resolve each once
+        rules: Dict[Tuple[str, str], Optional[Tuple[str, str, Dict[str, Any]]]] = {}
+        for key, ln in lines.items():
+            if only_lines is not None and key not in only_lines:
+                continue
+            codes = (ln["revrec_code"], ln["product_code"])
+            if codes not in rules:
+                rules[codes] = _resolve_rule(*codes)
+            rule = rules[codes]
+            if rule is None:
+                continue
+            revrec_code, rule_type, params = rule
+            # earliest grid period anchors rules whose params carry no date
+            start = f"{ln['start']}-01"
+            li = LineItem(product_code=ln["product_code"], revrec_code=revrec_code,
+                          amount=ln["amount"], start_date=start, recognition_date=start)
+            pkey = (revrec_code, _plan_key(rule_type, li))
+            if pkey not in plans:
+                plans[pkey] = compile_plan(rule_type, params, li)
+            groups.setdefault(pkey, []).append(key)
+
+        now = datetime.utcnow()
+        values: List[Dict[str, Any]] = []
+        for pkey, keys in groups.items():
+            plan = plans[pkey]
+            mat = plan.run(np.array([lines[k]["amount"] for k in keys]))
+            for (cid, line_no), amounts in zip(keys, mat.tolist()):
+                ln = lines[(cid, line_no)]
+                # keep the line's own revrec_code ("" = inherits), so later remaps still apply
+                for period, amt in zip(plan.periods, amounts):
+                    values.append(_row_values(cid, {"line_no": line_no, "period": period, "amount": amt,
+                                                    "product_code": ln["product_code"],
+                                                    "revrec_code": ln["revrec_code"]}, now, "rule"))
+        replace_grids(s, ((v["contract_id"], v) for v in values), "regenerate", lines_only=True)
+        s.execute(delete(ScheduleDirty).where(ScheduleDirty.contract_id.in_(contract_ids),
+                                              ScheduleDirty.marked_at <= as_of))
+        s.commit()
+    return {"lines": len(lines), "lines_regenerated": sum(len(k) for k in groups.values()),
+            "rows_written": len(values), "plans": len(plans)}
+
+
+def regenerate_grids(contract_ids: Optional[List[str]] = None, chunk_size: int = 500) -> Dict[str, Any]:
+    """Rebuild grids from their lines' revrec codes (row revrec_code, else the
+    product mapping) and clear their dirty marks. Lines with no resolvable rule
+    are left as they are (counted in "lines" but not "lines_regenerated").
+    Works `chunk_size` contracts at a time, each chunk in one transaction."""
+    if contract_ids is None:
+        with get_session() as s:
+            contract_ids = list(s.exec(select(ScheduleEditRow.contract_id).distinct()
+                                       .order_by(ScheduleEditRow.contract_id)).all())
+    stats = {"contracts": len(contract_ids), "lines": 0, "lines_regenerated": 0, "rows_written": 0, "plans": 0}
+    for i in range(0, len(contract_ids), chunk_size):
+        for k, v in _regenerate_chunk(contract_ids[i:i + chunk_size]).items():
+            stats[k] += v
+    return stats
+
+
+def recompute_dirty(max_contracts: Optional[int] = None, chunk_size: int = 500) -> Dict[str, Any]:
+    """Regenerate only the lines marked in schedule_dirty. Marks added while
+    this runs are newer than `as_of` and survive for the next run."""
+    as_of = datetime.utcnow()
+    with get_session() as s:
+        stmt = (select(ScheduleDirty.contract_id).where(ScheduleDirty.marked_at <= as_of)
+                .distinct().order_by(ScheduleDirty.contract_id))
+        if max_contracts:
+            stmt = stmt.limit(max_contracts)
+        contract_ids = list(s.exec(stmt).all())
+    stats = {"contracts": len(contract_ids), "lines": 0, "lines_regenerated": 0, "rows_written": 0, "plans": 0}
+    for i in range(0, len(contract_ids), chunk_size):
+        chunk = contract_ids[i:i + chunk_size]
+        with get_session() as s:
+            only = set(s.exec(select(ScheduleDirty.contract_id, ScheduleDirty.line_no)
+                              .where(ScheduleDirty.contract_id.in_(chunk), ScheduleDirty.marked_at <= as_of)).all())
+        for k, v in _regenerate_chunk(chunk, only_lines=only, as_of=as_of).items():
+            stats[k] += v
+    return stats
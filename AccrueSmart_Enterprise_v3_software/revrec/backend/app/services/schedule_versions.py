@@ -0,0 +1,219 @@
+"""
+backend/app/services/schedule_versions.py
+Versioned, copy-on-write schedule store. Each save of a contract's grid
+becomes a new version that stores only the cells (line_no × period) that
+changed, plus tombstones for cells that disappeared. A cell's value as of
+version v is its newest row with version <= v, so any past version reads back
+with one indexed query instead of recomputing the schedule. Closes tag the
+version each contract was at (schedule_version_tags) for "as of close" reads.
+"""
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlmodel import Field, Session, SQLModel, select
+from ..db import sync_db, async_db
+from .schedules_crud import ScheduleEditRow
+
+Cell = Tuple[float, str, str]          # amount, product_code, revrec_code
+Cells = Dict[Tuple[int, str], Cell]    # (line_no, period) -> cell
+
+
+# ── SQLModel tables ─────────────────────────────────────────────
+
+class ScheduleVersion(SQLModel, table=True):
+    __tablename__ = "schedule_versions"
+    contract_id: str = Field(primary_key=True)
+    version: int = Field(primary_key=True)
+    source: str = ""                   # "save" | "close"
+    cells_changed: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class ScheduleVersionCell(SQLModel, table=True):
+    """Cell value written by `version`; deleted=True is a tombstone. The primary
+    key order serves as-of reads (newest version <= v per cell)."""
+    __tablename__ = "schedule_version_cells"
+    contract_id: str = Field(primary_key=True)
+    line_no: int = Field(primary_key=True)
+    period: str = Field(primary_key=True)
+    version: int = Field(primary_key=True)
+    amount: float = 0.0
+    product_code: str = ""
+    revrec_code: str = ""
+    deleted: bool = False
+
+
+class ScheduleVersionTag(SQLModel, table=True):
+    """Version pointer per close: tag (e.g. "2025-03") -> version of each contract."""
+    __tablename__ = "schedule_version_tags"
+    tag: str = Field(primary_key=True)
+    contract_id: str = Field(primary_key=True)
+    version: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+# ── Reads ───────────────────────────────────────────────────────
+
+def _cells_as_of(s: Session, contract_ids: List[str], version: Optional[int] = None) -> Dict[str, Cells]:
+    """Cells of each contract at `version` (latest if None), tombstones left out."""
+    c = ScheduleVersionCell.__table__
+    ranked = (select(c, func.row_number().over(partition_by=(c.c.contract_id, c.c.line_no, c.c.period),
+                                                order_by=c.c.version.desc()).label("rn"))
+              .where(c.c.contract_id.in_(contract_ids)))
+    if version is not None:
+        ranked = ranked.where(c.c.version <= version)
+    r = ranked.subquery()
+    out: Dict[str, Cells] = {cid: {} for cid in contract_ids}
+    for row in s.execute(select(r.c.contract_id, r.c.line_no, r.c.period, r.c.amount, r.c.product_code,
+                                r.c.revrec_code).where(r.c.rn == 1, r.c.deleted.is_(False))):
+        out[row.contract_id][(row.line_no, row.period)] = (row.amount, row.product_code, row.revrec_code)
+    return out
+
+
+def _latest_versions(s: Session, contract_ids: List[str]) -> Dict[str, int]:
+    return dict(s.execute(select(ScheduleVersion.contract_id, func.max(ScheduleVersion.version))
+                          .where(ScheduleVersion.contract_id.in_(contract_ids))
+                          .group_by(ScheduleVersion.contract_id)).all())
+
+
+def _resolve_version(s: Session, contract_id: str, version: Optional[int] = None, tag: Optional[str] = None,
+                     at: Optional[datetime] = None) -> Optional[int]:
+    if version is not None:
+        return version
+    if tag is not None:
+        return s.exec(select(ScheduleVersionTag.version).where(ScheduleVersionTag.tag == tag,
+                                                               ScheduleVersionTag.contract_id == contract_id)).first()
+    stmt = select(func.max(ScheduleVersion.version)).where(ScheduleVersion.contract_id == contract_id)
+    if at is not None:
+        stmt = stmt.where(ScheduleVersion.created_at <= at)
+    return s.exec(stmt).one()
+
+
+def _rows(cells: Cells) -> List[Dict[str, Any]]:
+    return [{"line_no": ln, "period": p, "amount": a, "product_code": pc, "revrec_code": rc}
+            for (ln, p), (a, pc, rc) in sorted(cells.items())]
+
+
+def _get_as_of(s: Session, contract_id: str, version: Optional[int] = None, tag: Optional[str] = None,
+               at: Optional[datetime] = None) -> Dict[str, Any]:
+    """The grid as of a version, a close tag, or a point in time (default: latest)."""
+    v = _resolve_version(s, contract_id, version, tag, at)
+    if v is None:
+        raise KeyError(f"No schedule version for '{contract_id}'" + (f" at tag '{tag}'" if tag else ""))
+    return {"contract_id": contract_id, "version": v, "rows": _rows(_cells_as_of(s, [contract_id], v)[contract_id])}
+
+
+def _list_versions(s: Session, contract_id: str) -> List[Dict[str, Any]]:
+    tags: Dict[int, List[str]] = {}
+    for tag, v in s.execute(select(ScheduleVersionTag.tag, ScheduleVersionTag.version)
+                            .where(ScheduleVersionTag.contract_id == contract_id)).all():
+        tags.setdefault(v, []).append(tag)
+    rows = s.exec(select(ScheduleVersion).where(ScheduleVersion.contract_id == contract_id)
+                  .order_by(ScheduleVersion.version)).all()
+    return [{"version": r.version, "source": r.source, "cells_changed": r.cells_changed,
+             "created_at": r.created_at.isoformat() + "Z", "tags": sorted(tags.get(r.version, []))} for r in rows]
+
+
+def _diff_versions(s: Session, contract_id: str, from_version: int, to_version: Optional[int] = None) -> Dict[str, Any]:
+    """Cells that differ between two versions (prior-period comparison)."""
+    to_version = _resolve_version(s, contract_id, to_version)
+    a = _cells_as_of(s, [contract_id], from_version)[contract_id]
+    b = _cells_as_of(s, [contract_id], to_version)[contract_id]
+    changes = []
+    for key in sorted(set(a) | set(b)):
+        if a.get(key) != b.get(key):
+            changes.append({"line_no": key[0], "period": key[1],
+                            "from": a[key][0] if key in a else None, "to": b[key][0] if key in b else None})
+    return {"contract_id": contract_id, "from_version": from_version, "to_version": to_version, "changes": changes}
+
+
+# ── Writes ──────────────────────────────────────────────────────
+
+def _cells_from_rows(rows: Iterable[Dict[str, Any]]) -> Cells:
+    # a repeated (line_no, period) keeps its last row, as the grid shows it
+    return {(int(r.get("line_no", 0)), r.get("period", "")):
+            (float(r.get("amount", 0)), r.get("product_code", "") or "", r.get("revrec_code", "") or "")
+            for r in rows}
+
+
+def record_versions(s: Session, grids: Dict[str, Iterable[Dict[str, Any]]], source: str = "save") -> Dict[str, Optional[int]]:
+    """Store the given grids ({contract_id: rows}) as new versions, inside the
+    caller's transaction. Only changed cells and tombstones are written; a grid
+    identical to its latest version creates no version. Returns each
+    contract's current version (None if it has never had one)."""
+    ids = list(grids)
+    current = _cells_as_of(s, ids)
+    latest = _latest_versions(s, ids)
+    now = datetime.utcnow()
+    versions, cells = [], []
+    out: Dict[str, Optional[int]] = {}
+    for cid in ids:
+        new, old = _cells_from_rows(grids[cid]), current[cid]
+        v = latest.get(cid, 0) + 1
+        changed = [(k, c) for k, c in new.items() if old.get(k) != c]
+        gone = [k for k in old if k not in new]
+        if not changed and not gone:
+            out[cid] = latest.get(cid)
+            continue
+        cells.extend({"contract_id": cid, "line_no": ln, "period": p, "version": v, "amount": a,
+                      "product_code": pc, "revrec_code": rc, "deleted": False} for (ln, p), (a, pc, rc) in changed)
+        cells.extend({"contract_id": cid, "line_no": ln, "period": p, "version": v, "amount": 0.0,
+                      "product_code": "", "revrec_code": "", "deleted": True} for ln, p in gone)
+        versions.append({"contract_id": cid, "version": v, "source": source,
+                         "cells_changed": len(changed) + len(gone), "created_at": now})
+        out[cid] = v
+    if versions:
+        s.execute(insert(ScheduleVersion), versions)
+    for i in range(0, len(cells), 5000):
+        s.execute(insert(ScheduleVersionCell), cells[i:i + 5000])
+    return out
+
+
+def version_grids(s: Session, contract_ids: List[str], source: str) -> Dict[str, Optional[int]]:
+    """Record the grids of `contract_ids` as they now stand in schedules_edit
+    (read back in one query), inside the caller's transaction. Pass one chunk
+    of contracts at a time."""
+    t = ScheduleEditRow.__table__
+    grids: Dict[str, List[Dict[str, Any]]] = {cid: [] for cid in contract_ids}
+    for cid, line_no, period, amount, pc, rc in s.execute(
+            select(t.c.contract_id, t.c.line_no, t.c.period, t.c.amount, t.c.product_code,
+                   t.c.revrec_code).where(t.c.contract_id.in_(contract_ids))):
+        grids[cid].append({"line_no": line_no, "period": period, "amount": amount,
+                           "product_code": pc, "revrec_code": rc})
+    return record_versions(s, grids, source=source)
+
+
+def _tag_close(s: Session, tag: str, contract_ids: Optional[List[str]] = None,
+               chunk_size: int = 500) -> Dict[str, Any]:
+    """Point `tag` at every contract's current grid. Grids changed without a
+    version (e.g. direct SQL) get one first; unchanged ones just reuse their
+    latest version."""
+    if contract_ids is None:
+        grid_ids = set(s.exec(select(ScheduleEditRow.contract_id).distinct()).all())
+        versioned = set(s.exec(select(ScheduleVersion.contract_id).distinct()).all())
+        contract_ids = sorted(grid_ids | versioned)
+    now = datetime.utcnow()
+    tagged = new_versions = 0
+    for i in range(0, len(contract_ids), chunk_size):
+        chunk = contract_ids[i:i + chunk_size]
+        before = _latest_versions(s, chunk)
+        versions = version_grids(s, chunk, source="close")
+        new_versions += sum(1 for cid, v in versions.items() if v is not None and v != before.get(cid))
+        s.execute(delete(ScheduleVersionTag).where(ScheduleVersionTag.tag == tag,
+                                                   ScheduleVersionTag.contract_id.in_(chunk)))
+        tags = [{"tag": tag, "contract_id": cid, "version": v, "created_at": now}
+                for cid, v in versions.items() if v is not None]
+        if tags:
+            s.execute(insert(ScheduleVersionTag), tags)
+        tagged += len(tags)
+    s.commit()
+    return {"tag": tag, "contracts": tagged, "new_versions": new_versions}
+
+
+# sync callers / async routers (see db.run_db)
+get_as_of, aget_as_of = sync_db(_get_as_of), async_db(_get_as_of)
+list_versions, alist_versions = sync_db(_list_versions), async_db(_list_versions)
+diff_versions, adiff_versions = sync_db(_diff_versions), async_db(_diff_versions)
+tag_close, atag_close = sync_db(_tag_close), async_db(_tag_close)
@@ -3,73 +3,286 @@ backend/app/services/schedules_crud.py
 CRUD for schedule grid rows (schedules_edit table).
 """
 from __future__ import annotations
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
+import re
 import uuid
 
 from sqlmodel import Field, SQLModel, Session, select, Column
-from sqlalchemy import JSON
-from ..db import get_session
+from sqlalchemy import JSON, Index, and_, delete, exists, func, insert, literal, or_
+from ..db import get_session, sync_db, async_db
 
 
 # ── SQLModel table ──────────────────────────────────────────────
 
 class ScheduleEditRow(SQLModel, table=True):
     __tablename__ = "schedules_edit"
+    # keyset pagination / ordered export key; per-period journal generation
+    __table_args__ = (Index("ix_schedules_edit_contract_line_period", "contract_id", "line_no", "period"),
+                      Index("ix_schedules_edit_period_contract", "period", "contract_id"))
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     contract_id: str = Field(index=True)
     line_no: int
     period: str          # YYYY-MM
     amount: float = 0.0
-    product_code: str = ""
-    revrec_code: str = ""
-    source: str = ""     # "manual" | "ai" | "csv"
+    product_code: str = Field(default="", index=True)
+    revrec_code: str = Field(default="", index=True)   # "" = inherit the product's mapping
+    source: str = ""     # "manual" | "ai" | "csv" | "rule"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
+class ScheduleDirty(SQLModel, table=True):
+    """Grid lines whose recognition rule changed since they were generated."""
+    __tablename__ = "schedule_dirty"
+    contract_id: str = Field(primary_key=True)
+    line_no: int = Field(primary_key=True)
+    reason: str = ""
+    marked_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+# ── Dirty tracking ──────────────────────────────────────────────
+
+def mark_dirty(s: Session, where, reason: str) -> int:
+    """Mark every grid line matching `where` (a filter on schedules_edit) dirty,
+    inside the caller's transaction. Lines already marked keep their entry.
+    Returns the number of lines newly marked."""
+    src = (
+        select(ScheduleEditRow.contract_id, ScheduleEditRow.line_no,
+               literal(reason), literal(datetime.utcnow()))
+        .where(where)
+        .where(~exists().where(and_(ScheduleDirty.contract_id == ScheduleEditRow.contract_id,
+                                    ScheduleDirty.line_no == ScheduleEditRow.line_no)))
+        .distinct()
+    )
+    res = s.execute(insert(ScheduleDirty).from_select(["contract_id", "line_no", "reason", "marked_at"], src))
+    return max(res.rowcount or 0, 0)
+
+
+def _list_dirty(s: Session, limit: int = 500) -> Dict[str, Any]:
+    lines, contracts = s.exec(select(func.count(), func.count(ScheduleDirty.contract_id.distinct()))
+                              .select_from(ScheduleDirty)).one()
+    sample = s.exec(select(ScheduleDirty).order_by(ScheduleDirty.contract_id, ScheduleDirty.line_no).limit(limit)).all()
+    return {"lines": lines, "contracts": contracts,
+            "items": [{"contract_id": d.contract_id, "line_no": d.line_no, "reason": d.reason,
+                       "marked_at": d.marked_at.isoformat() + "Z"} for d in sample]}
+
+
 # ── Grid CRUD ───────────────────────────────────────────────────
 
-def get_grid(contract_id: str) -> List[Dict[str, Any]]:
+def _as_dict(r: ScheduleEditRow) -> Dict[str, Any]:
+    return {
+        "line_no": r.line_no,
+        "period": r.period,
+        "amount": r.amount,
+        "product_code": r.product_code,
+        "revrec_code": r.revrec_code,
+    }
+
+
+def _get_grid(s: Session, contract_id: str) -> List[Dict[str, Any]]:
+    rows = s.exec(
+        select(ScheduleEditRow)
+        .where(ScheduleEditRow.contract_id == contract_id)
+        .order_by(ScheduleEditRow.line_no)
+    ).all()
+    return [_as_dict(r) for r in rows]
+
+
+def _get_grid_page(s: Session, contract_id: str, after_line: Optional[int] = None, after_period: Optional[str] = None,
+                  limit: int = 500) -> Dict[str, Any]:
+    """One page of a grid ordered by (line_no, period). Pass the returned `next`
+    cursor back as after_line/after_period; cost is independent of page depth."""
+    stmt = select(ScheduleEditRow).where(ScheduleEditRow.contract_id == contract_id)
+    if after_line is not None:
+        stmt = stmt.where(or_(ScheduleEditRow.line_no > after_line,
+                              and_(ScheduleEditRow.line_no == after_line,
+                                   ScheduleEditRow.period > (after_period or ""))))
+    stmt = stmt.order_by(ScheduleEditRow.line_no, ScheduleEditRow.period).limit(limit + 1)
+    rows = [_as_dict(r) for r in s.exec(stmt).all()]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    nxt = {"after_line": rows[-1]["line_no"], "after_period": rows[-1]["period"]} if more else None
+    return {"contract_id": contract_id, "rows": rows, "next": nxt}
+
+
+def iter_grid_rows(contract_id: Optional[str] = None, batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+    """Stream grid rows (one contract, or all ordered by contract) through a
+    server-side cursor; only `batch_size` rows are buffered at a time."""
+    stmt = select(ScheduleEditRow)
+    if contract_id is not None:
+        stmt = stmt.where(ScheduleEditRow.contract_id == contract_id)
+    stmt = stmt.order_by(ScheduleEditRow.contract_id, ScheduleEditRow.line_no, ScheduleEditRow.period)
     with get_session() as s:
-        rows = s.exec(
-            select(ScheduleEditRow)
-            .where(ScheduleEditRow.contract_id == contract_id)
-            .order_by(ScheduleEditRow.line_no)
-        ).all()
-        return [
-            {
-                "line_no": r.line_no,
-                "period": r.period,
-                "amount": r.amount,
-                "product_code": r.product_code,
-                "revrec_code": r.revrec_code,
-            }
-            for r in rows
-        ]
-
-
-def save_grid(contract_id: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
-    """Replace all rows for a contract with the provided list."""
+        for r in s.exec(stmt.execution_options(yield_per=batch_size)):
+            d = _as_dict(r)
+            d["contract_id"] = r.contract_id
+            yield d
+
+
+def _row_values(contract_id: str, r: Dict[str, Any], now: datetime, source: str = "manual") -> Dict[str, Any]:
+    """Column values for one bulk-inserted grid row (defaults applied in Python)."""
+    return {
+        "id": str(uuid.uuid4()),
+        "contract_id": contract_id,
+        "line_no": r.get("line_no", 0),
+        "period": r.get("period", ""),
+        "amount": float(r.get("amount", 0)),
+        "product_code": r.get("product_code", ""),
+        "revrec_code": r.get("revrec_code", ""),
+        "source": r.get("source", source),
+        "created_at": now,
+    }
+
+
+def replace_grids(s: Session, rows: Iterable[Tuple[str, Dict[str, Any]]], source: str,
+                  contract_ids: Iterable[str] = (), lines_only: bool = False, batch_size: int = 5000,
+                  version_chunk: int = 500) -> Dict[str, Optional[int]]:
+    """Replace the grids of every contract appearing in `rows` ((contract_id,
+    _row_values) pairs, in any order) or listed in `contract_ids` (cleared if
+    no row names it), and record the new grids as versions tagged `source`,
+    inside the caller's transaction. Streams: a contract's old grid is deleted
+    when it first appears, rows go in as executemany batches, and versions are
+    taken from the stored grids `version_chunk` contracts at a time. With
+    `lines_only` only the lines (contract_id, line_no) present in `rows` are
+    replaced and the contracts' other lines stay as they are. Every path that
+    rewrites grids goes through here so the history is complete. Returns each
+    contract's current version."""
+    from .schedule_versions import version_grids
+    seen: Dict[str, None] = {}
+    lines: set = set()
+    for cid in contract_ids:
+        seen[cid] = None
+        s.execute(delete(ScheduleEditRow).where(ScheduleEditRow.contract_id == cid))
+    batch: List[Dict[str, Any]] = []
+    for cid, values in rows:
+        if lines_only:
+            key = (cid, values["line_no"])
+            if key not in lines:
+                lines.add(key)
+                s.execute(delete(ScheduleEditRow).where(ScheduleEditRow.contract_id == cid,
+                                                        ScheduleEditRow.line_no == key[1]))
+            seen[cid] = None
+        elif cid not in seen:
+            seen[cid] = None
+            s.execute(delete(ScheduleEditRow).where(ScheduleEditRow.contract_id == cid))
+        batch.append(values)
+        if len(batch) >= batch_size:
+            s.execute(insert(ScheduleEditRow), batch)
+            batch = []
+    if batch:
+        s.execute(insert(ScheduleEditRow), batch)
+    ids = list(seen)
+    versions: Dict[str, Optional[int]] = {}
+    for i in range(0, len(ids), version_chunk):
+        versions.update(version_grids(s, ids[i:i + version_chunk], source))
+    return versions
+
+
+class InvalidGridRow(Exception):
+    """A saved grid row that can't be stored (e.g. a non-numeric amount)."""
+
+
+def _save_grid(s: Session, contract_id: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Replace all rows for a contract with the provided list: one DELETE and
+    one executemany INSERT (batched into multi-row VALUES by SQLAlchemy).
+    The saved grid is also recorded as a copy-on-write version. A malformed
+    row raises InvalidGridRow and the caller's session rolls the save back."""
+    now = datetime.utcnow()
+
+    def values() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for n, r in enumerate(rows, 1):
+            try:
+                v = _row_values(contract_id, r, now)
+            except (TypeError, ValueError) as e:
+                raise InvalidGridRow(f"row {n}: {e}") from e
+            yield contract_id, v
+
+    version = replace_grids(s, values(), "save", contract_ids=[contract_id])[contract_id]
+    s.commit()
+    return {"ok": True, "contract_id": contract_id, "rows_saved": len(rows), "version": version}
+
+
+# sync callers / async routers (see db.run_db)
+get_grid, aget_grid = sync_db(_get_grid), async_db(_get_grid)
+get_grid_page, aget_grid_page = sync_db(_get_grid_page), async_db(_get_grid_page)
+save_grid, asave_grid = sync_db(_save_grid), async_db(_save_grid)
+list_dirty, alist_dirty = sync_db(_list_dirty), async_db(_list_dirty)
+
+
+# ── Streaming import ────────────────────────────────────────────
+
+_PERIOD_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def _parse_import_row(raw: Dict[str, Any], default_line: int) -> Dict[str, Any]:
+    """Validate one CSV record; raises ValueError with a readable message."""
+    line_no = (raw.get("line_no") or "").strip()
+    try:
+        line_no = int(line_no) if line_no else default_line
+    except ValueError:
+        raise ValueError(f"line_no '{raw.get('line_no')}' is not an integer")
+    period = (raw.get("period") or "").strip()
+    if not _PERIOD_RE.match(period):
+        raise ValueError(f"period '{period}' is not YYYY-MM")
+    amount = (raw.get("amount") or "").strip().replace(",", "")
+    try:
+        amount = float(amount) if amount else 0.0
+    except ValueError:
+        raise ValueError(f"amount '{raw.get('amount')}' is not a number")
+    return {"line_no": line_no, "period": period, "amount": amount,
+            "product_code": (raw.get("product_code") or "").strip(),
+            "revrec_code": (raw.get("revrec_code") or "").strip(), "source": "csv"}
+
+
+class _InvalidImport(Exception):
+    pass
+
+
+def import_grid_rows(records: Iterable[Dict[str, Any]], contract_id: Optional[str] = None,
+                     batch_size: int = 5000, max_errors: int = 100) -> Dict[str, Any]:
+    """Replace grids from a stream of CSV records (csv.DictReader) in one transaction.
+
+    With `contract_id` every record goes to that contract; otherwise each record
+    names its own `contract_id` column and each contract seen is replaced.
+    A file with a header and no rows therefore clears `contract_id`'s grid
+    (the grid is whatever the file holds), and changes nothing without one.
+    Records are validated as they arrive and inserted in `batch_size` batches;
+    any invalid line rolls the whole import back and is reported by line number
+    (collection stops after `max_errors`). Replaced grids are versioned with
+    source "csv".
+    """
+    now = datetime.utcnow()
+    errors: List[Dict[str, Any]] = []
+    rows_read = 0
+
+    def valid_rows() -> Iterator[Tuple[str, Dict[str, Any]]]:
+        nonlocal rows_read
+        for n, raw in enumerate(records, 1):
+            rows_read = n
+            line = getattr(records, "line_num", n + 1)
+            try:
+                cid = contract_id or (raw.get("contract_id") or "").strip()
+                if not cid:
+                    raise ValueError("contract_id is empty")
+                row = _parse_import_row(raw, n)
+            except ValueError as e:
+                errors.append({"line": line, "error": str(e)})
+                if len(errors) >= max_errors:
+                    break
+                continue
+            if not errors:   # after the first error keep validating, write nothing more
+                yield cid, _row_values(cid, row, now)
+        if errors:
+            raise _InvalidImport()   # before any versions are recorded
+
     with get_session() as s:
-        # delete existing rows
-        existing = s.exec(
-            select(ScheduleEditRow)
-            .where(ScheduleEditRow.contract_id == contract_id)
-        ).all()
-        for row in existing:
-            s.delete(row)
-        s.flush()
-
-        # insert new rows
-        for r in rows:
-            s.add(ScheduleEditRow(
-                contract_id=contract_id,
-                line_no=r.get("line_no", 0),
-                period=r.get("period", ""),
-                amount=float(r.get("amount", 0)),
-                product_code=r.get("product_code", ""),
-                revrec_code=r.get("revrec_code", ""),
-                source=r.get("source", "manual"),
-            ))
+        try:
+            versions = replace_grids(s, valid_rows(), "csv", batch_size=batch_size,
+                                     contract_ids=[contract_id] if contract_id else ())
+        except _InvalidImport:
+            s.rollback()
+            return {"ok": False, "rows_read": rows_read, "rows_saved": 0, "errors": errors,
+                    "truncated": len(errors) >= max_errors}
         s.commit()
-        return {"ok": True, "contract_id": contract_id, "rows_saved": len(rows)}
+    return {"ok": True, "rows_read": rows_read, "rows_saved": rows_read,
+            "contracts": sorted(versions) if contract_id is None else [contract_id]}
@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway SQLite DB and output folders before anything
+# imports app.db (the engine is built from the environment at import time).
+_TMP = tempfile.mkdtemp(prefix="revrec-tests-")
+os.environ.pop("SUPABASE_DB_URL", None)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["INGEST_JOBS_DIR"] = os.path.join(_TMP, "ingest_jobs")
+os.environ["DISCLOSURE_JOBS_DIR"] = os.path.join(_TMP, "disclosure_jobs")
+os.environ["FX_CUBE_DIR"] = os.path.join(_TMP, "fx_cubes")
+
+
+@pytest.fixture
+def client():
+    """TestClient over empty tables (recreated per test)."""
+    from fastapi.testclient import TestClient
+    from sqlmodel import SQLModel
+    from app.main import app
+    from app.db import engine
+    from app.services import codes_crud
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    codes_crud.invalidate_catalog()
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,26 @@
+def test_code_crud_is_served_from_a_fresh_catalog(client):
+    assert client.post("/codes/products", json={"code": "SUB", "name": "Subscription"}).status_code == 200
+    client.post("/codes/products", json={"code": "HW", "name": "Hardware"})
+    client.post("/codes/revrec", params={"code": "SL12", "rule_type": "straight_line"}, json={"months": 12})
+    assert [(p["code"], p["revrec_code"]) for p in client.get("/codes/products").json()] == [("HW", None), ("SUB", None)]
+
+    # writes invalidate the cached catalog: the mapping is visible at once
+    assert client.post("/codes/map", params={"product_code": "SUB", "revrec_code": "SL12"}).status_code == 200
+    products = {p["code"]: p for p in client.get("/codes/products").json()}
+    assert (products["SUB"]["revrec_code"], products["SUB"]["rule_type"]) == ("SL12", "straight_line")
+    assert client.get("/codes/resolve/SUB").json()["params"] == {"months": 12}
+
+    client.put("/codes/revrec/SL12", json={"params": {"months": 6}})
+    assert client.get("/codes/resolve/SUB").json()["params"] == {"months": 6}
+    assert [r["params"] for r in client.get("/codes/revrec").json()] == [{"months": 6}]
+
+
+def test_code_errors(client):
+    client.post("/codes/products", json={"code": "SUB", "name": "Subscription"})
+    assert client.post("/codes/products", json={"code": "SUB", "name": "Again"}).status_code == 409
+    assert client.post("/codes/products", json={"code": "X"}).status_code == 400
+    client.post("/codes/revrec", params={"code": "PIT", "rule_type": "point_in_time"})
+    assert client.post("/codes/revrec", params={"code": "PIT", "rule_type": "point_in_time"}).status_code == 409
+    assert client.post("/codes/map", params={"product_code": "SUB", "revrec_code": "NOPE"}).status_code == 404
+    assert client.put("/codes/revrec/NOPE", json={"params": {}}).status_code == 404
+    assert client.get("/codes/resolve/SUB").status_code == 404   # unmapped
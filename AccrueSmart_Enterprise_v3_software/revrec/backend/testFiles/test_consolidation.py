@@ -0,0 +1,102 @@
+from app import fx_cube
+from app.consolidation import consolidate
+from app.schemas import ConsolidationIn
+
+def _payload(**over):
+    d = {
+        "parent_currency": "USD",
+        "entities": [
+            {"entity": "US", "currency": "USD", "schedules": {"2025-01": 100.0, "2025-02": 100.0}, "commissions": {"2025-01": 10.0}},
+            {"entity": "UK", "currency": "GBP", "schedules": {"2025-01": 200.0, "2025-03": 50.0}},
+            {"entity": "DE", "currency": "EUR", "schedules": {"2025-02": 300.0}, "commissions": {"2025-02": 30.0}},
+        ],
+        "fx_rates": [
+            {"period": "2025-01", "currency": "GBP", "rate_to_parent": 1.25, "rate_type": "month_end"},
+            {"period": "2025-01", "currency": "GBP", "rate_to_parent": 1.20, "rate_type": "average"},
+            {"period": "2025-02", "currency": "EUR", "rate_to_parent": 1.10, "rate_type": "average"},
+        ],
+        "eliminations": [{"period": "2025-01", "amount_parent_ccy": 5.0}],
+        "intercompany": [{"period": "2025-02", "amount_parent_ccy": 7.5}],
+    }
+    d.update(over)
+    return ConsolidationIn(**d)
+
+def test_consolidate_fx_fallbacks_and_eliminations(tmp_path, monkeypatch):
+    monkeypatch.setattr(fx_cube, "CUBE_DIR", str(tmp_path))
+    out = consolidate(_payload())
+    rows = {r["period"]: r for r in out["rows"]}
+    # month_end requested; GBP has it, EUR falls back to average, unknown period/ccy -> 1.0
+    assert rows["2025-01"]["revenue_parent"] == round(100 + 200 * 1.25 - 5.0, 2)
+    assert rows["2025-02"]["revenue_parent"] == round(100 + 300 * 1.10 - 7.5, 2)
+    assert rows["2025-03"]["revenue_parent"] == 50.0
+    assert rows["2025-02"]["commission_parent"] == 33.0
+    assert out["eliminations_applied"] == {"2025-01": 5.0, "2025-02": 7.5}
+
+    avg = consolidate(_payload(rate_type="average"))
+    assert {r["period"]: r for r in avg["rows"]}["2025-01"]["revenue_parent"] == round(100 + 200 * 1.20 - 5.0, 2)
+
+def test_fx_cube_is_cached_and_persisted(tmp_path, monkeypatch):
+    monkeypatch.setattr(fx_cube, "CUBE_DIR", str(tmp_path))
+    rates = _payload().fx_rates
+    cube = fx_cube.get_cube(rates)
+    assert fx_cube.get_cube(rates) is cube
+    fx_cube._cache.clear()
+    reloaded = fx_cube.get_cube(rates)
+    assert reloaded is not cube and (tmp_path / f"{cube.key}.npz").exists()
+    assert reloaded.rates_for(["2025-01", "2099-01"], "GBP", "average").tolist() == [1.20, 1.0]
+
+def test_group_consolidation_recomputes_dirty_path(tmp_path, monkeypatch):
+    from app.consolidation import GroupConsolidator
+    from app.schemas import GroupConsolidationIn, EntityTrial
+    monkeypatch.setattr(fx_cube, "CUBE_DIR", str(tmp_path))
+    inp = GroupConsolidationIn(group_id="G", fx_rates=[{"period": "2025-01", "currency": "EUR", "rate_to_parent": 2.0}], root={
+        "node_id": "top", "intercompany": [{"period": "2025-01", "amount_parent_ccy": 10.0}],
+        "children": [
+            {"node_id": "emea", "eliminations": [{"period": "2025-01", "amount_parent_ccy": 1.0}],
+             "entities": [{"entity": "DE", "currency": "EUR", "schedules": {"2025-01": 50.0}}]},
+            {"node_id": "amer", "entities": [{"entity": "US", "currency": "USD", "schedules": {"2025-01": 100.0}}],
+             "children": [{"node_id": "latam", "entities": [{"entity": "BR", "currency": "USD", "schedules": {"2025-01": 5.0}}]}]},
+        ]})
+    g = GroupConsolidator(inp)
+    assert g.node_result("emea")["rows"][0]["revenue_parent"] == 99.0
+    assert g.node_result("top")["rows"][0]["revenue_parent"] == 99.0 + 105.0 - 10.0
+
+    path = g.update_entity(EntityTrial(entity="BR", currency="USD", schedules={"2025-01": 25.0}))
+    assert path == ["latam", "amer", "top"]
+    assert g.node_result("top")["rows"][0]["revenue_parent"] == 99.0 + 125.0 - 10.0
+    assert g.node_result("emea")["rows"][0]["revenue_parent"] == 99.0
+
+def test_stream_consolidation_matches_batch(tmp_path, monkeypatch):
+    import json
+    from app.consolidation import read_ndjson, consolidate_stream
+    monkeypatch.setattr(fx_cube, "CUBE_DIR", str(tmp_path))
+    inp = _payload()
+    header = inp.model_dump(exclude={"entities"})
+    lines = [json.dumps(header)] + [json.dumps(e.model_dump()) for e in inp.entities]
+    expected = consolidate(inp)
+    for workers in (1, 2):
+        h, trials = read_ndjson(lines)
+        out = consolidate_stream(h, trials, workers=workers, chunk_size=1)
+        assert out["rows"] == expected["rows"] and out["entities_processed"] == 3
+
+def test_trials_saved_to_db_consolidate_through_the_shared_pool(client, monkeypatch):
+    from app import consolidation
+    from app.services.entity_trials import iter_entity_trials
+    monkeypatch.setattr(consolidation, "STREAM_WORKERS", 2)
+    monkeypatch.setattr(consolidation, "STREAM_CHUNK", 1)
+    inp = _payload()
+    res = client.post("/consolidation/trials", json=[e.model_dump() for e in inp.entities]).json()
+    assert (res["entities"], res["rows_saved"]) == (3, 5)
+    client.post("/consolidation/trials", json=[{"entity": "UK", "currency": "GBP", "schedules": {"2025-01": 200.0, "2025-03": 50.0}}])
+    assert [t.entity for t in iter_entity_trials()] == ["DE", "UK", "US"]   # resave replaces, no duplicates
+
+    header = inp.model_dump(exclude={"entities"})
+    try:
+        out = client.post("/consolidation/multientity/db", json={"header": header}).json()
+        assert out["rows"] == consolidate(inp)["rows"] and out["entities_processed"] == 3
+        again = client.post("/consolidation/multientity/db", json={"header": header, "entities": ["UK"]}).json()
+        assert again["entities_processed"] == 1
+        assert {r["period"]: r["revenue_parent"] for r in again["rows"]}["2025-03"] == 50.0
+        assert consolidation._pool is not None
+    finally:
+        consolidation.shutdown()
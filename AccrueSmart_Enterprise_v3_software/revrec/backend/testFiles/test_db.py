@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+from sqlmodel import select
+
+from app import db
+from app.services.schedules_crud import ScheduleEditRow
+
+
+def _add(s, contract_id, fail=False):
+    s.add(ScheduleEditRow(contract_id=contract_id, line_no=1, period="2025-01", amount=1.0))
+    s.flush()
+    if fail:
+        raise ValueError("boom")
+    return contract_id
+
+
+def _ids():
+    with db.get_session() as s:
+        return sorted(s.exec(select(ScheduleEditRow.contract_id)).all())
+
+
+async def _twins():
+    add = db.async_db(_add)
+    assert await add("ok") == "ok"
+    with pytest.raises(ValueError):
+        await add("rolled-back", fail=True)
+    eng = db.get_async_engine()
+    if eng is not None:
+        await eng.dispose()   # connections belong to this event loop
+
+
+@pytest.mark.parametrize("use_async_engine", [True, False])
+def test_async_twins_commit_and_roll_back(client, monkeypatch, use_async_engine):
+    if use_async_engine:
+        assert db.ASYNC_DATABASE_URL.startswith("sqlite+aiosqlite://")
+    else:
+        monkeypatch.setattr(db, "get_async_engine", lambda: None)   # threadpool fallback
+    asyncio.run(_twins())
+    assert _ids() == ["ok"]
+    assert db.sync_db(_add)("sync") == "sync" and _ids() == ["ok", "sync"]
+
+
+def test_async_session_requires_a_driver(monkeypatch):
+    monkeypatch.setattr(db, "get_async_engine", lambda: None)
+
+    async def open_session():
+        async with db.get_async_session():
+            pass
+    with pytest.raises(RuntimeError):
+        asyncio.run(open_session())
+    assert db._async_url("mysql://h/db") is None
+    assert db._async_url("sqlite:///x.db") == "sqlite+aiosqlite:///x.db"
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import NullPool
+
+from app.db_pool import InstrumentedQueuePool, PoolSettings, engine_kwargs, pool_status
+
+SUPABASE = "postgresql+psycopg://u:p@aws-0-eu.pooler.supabase.com:6543/postgres"
+
+
+def test_settings_from_env(monkeypatch):
+    assert PoolSettings.from_env(SUPABASE).transaction_pooler is True
+    assert PoolSettings.from_env("postgresql://u:p@db:5432/x").transaction_pooler is False
+    for k, v in {"DB_POOL_SIZE": "2", "DB_POOL_TIMEOUT": "1.5", "DB_POOL_PRE_PING": "no",
+                 "DB_TRANSACTION_POOLER": "0", "DB_POOL": "NULL"}.items():
+        monkeypatch.setenv(k, v)
+    s = PoolSettings.from_env(SUPABASE)
+    assert (s.size, s.timeout, s.pre_ping, s.transaction_pooler, s.kind) == (2, 1.5, False, False, "null")
+
+
+def test_engine_kwargs_per_driver():
+    pooler = PoolSettings(transaction_pooler=True)
+    kw = engine_kwargs(SUPABASE, pooler)
+    assert kw["connect_args"] == {"prepare_threshold": None} and kw["poolclass"] is InstrumentedQueuePool
+    assert engine_kwargs(SUPABASE.replace("psycopg", "asyncpg"), pooler, is_async=True)["connect_args"]["statement_cache_size"] == 0
+    assert engine_kwargs(SUPABASE, PoolSettings())["connect_args"] == {}
+    assert engine_kwargs(SUPABASE, PoolSettings(kind="null"))["poolclass"] is NullPool
+    assert engine_kwargs("sqlite:///x.db", pooler) == {"connect_args": {"check_same_thread": False}}
+
+
+def test_pool_status_counts_checkouts_and_timeouts(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'p.db'}", poolclass=InstrumentedQueuePool,
+                        pool_size=1, max_overflow=0, pool_timeout=0.05)
+    held = eng.connect()
+    with pytest.raises(exc.TimeoutError):
+        eng.connect()
+    status = pool_status(eng)
+    assert (status["checkouts"], status["timeouts"], status["capacity"], status["utilization"]) == (1, 1, 1, 1.0)
+    held.close()
+    eng.dispose()
+    assert pool_status(None) is None
+
+
+def test_health_db_reports_sync_pool(client):
+    body = client.get("/health/db").json()
+    assert body["sync"]["class"] and body["transaction_pooler"] is False
@@ -0,0 +1,92 @@
+import pandas as pd
+
+from app.services.disclosures import contract_balances, lease_aggregates, shift_period
+
+
+def test_contract_balances_rollforward():
+    df = pd.DataFrame([
+        # billed 1200 up front, 300 recognized before the window, 600 within
+        {"contract_id": "A", "rec_before": 300.0, "rec_in": 600.0, "bill_before": 1200.0, "bill_in": 0.0},
+        # unbilled: 60 asset at the start, billed 100 within while recognizing 60
+        {"contract_id": "B", "rec_before": 60.0, "rec_in": 60.0, "bill_before": 0.0, "bill_in": 100.0},
+    ])
+    out = contract_balances(df)
+    dr, ca = out["deferred_revenue"], out["contract_assets"]
+    assert dr == {"beginning": 900.0, "additions": 0.0, "recognized": 600.0, "ending": 300.0}
+    assert ca == {"beginning": 60.0, "additions": 20.0, "recognized": 60.0, "ending": 20.0}
+    for r in (dr, ca):
+        assert round(r["beginning"] + r["additions"] - r["recognized"], 2) == r["ending"]
+
+
+def test_lease_aggregates_by_classification():
+    leases = [
+        {"lease_id": "L1", "start_date": "2025-01-01", "end_date": "2025-12-31", "payment": 100.0,
+         "frequency": "monthly", "discount_rate_annual": 0.0},
+        {"lease_id": "L2", "start_date": "2025-01-01", "end_date": "2025-12-31", "payment": 100.0,
+         "frequency": "monthly", "discount_rate_annual": 0.0, "classification": "finance"},
+    ]
+    out = lease_aggregates(leases, "2025-01", "2025-06")
+    assert [b["type"] for b in out["balances"]] == ["Operating Leases", "Finance Leases"]
+    assert all(b["liabilities"] == 600.0 and b["term"] == 6 for b in out["balances"])
+    assert {e["expense_type"]: e["amount"] for e in out["expense"]} == {
+        "Operating Lease Cost": 600.0, "Finance Lease Interest": 0.0, "Finance Lease Amortization": 600.0}
+    assert shift_period("2025-01", -12) == "2024-01"
+
+
+def test_render_pack_prepares_sections_in_the_pool(tmp_path, monkeypatch):
+    from app.routers.disclosure_pack import DisclosurePackGenerator
+    from app.services import disclosure_jobs
+    prepared = []
+    real = DisclosurePackGenerator.prepare_section
+    monkeypatch.setattr(DisclosurePackGenerator, "prepare_section",
+                        lambda self, name, data: prepared.append(name) or real(self, name, data))
+    contract = {"contract_id": "C1", "customer": "Acme", "transaction_price": 1200.0,
+                "pos": [{"po_id": "P1", "description": "Software license", "ssp": 1200.0, "method": "point_in_time",
+                         "start_date": "2025-01-15"}]}
+    inputs = {"asc606": {"figures": {"period_to": "2025-06"}, "contracts": [contract]},
+              "asc842": {"balances": [{"type": "Operating Leases", "assets": 1.0, "liabilities": 1.0, "term": 6}]},
+              "asc740": {}, "asc718": {}}
+    path = disclosure_jobs.render_pack(inputs, str(tmp_path / "a.pdf"), as_of="2025-06")
+    assert path == str(tmp_path / "a.pdf") and (tmp_path / "a.pdf").read_bytes().startswith(b"%PDF")
+    assert sorted(prepared) == sorted(disclosure_jobs.SECTIONS)
+    assert DisclosurePackGenerator().prepare_section("asc606", inputs["asc606"])["figures"]["revenue"] == [
+        {"category": "License Fees", "current": 1200.0, "prior": 0.0, "variance": 0.0}]
+
+
+def test_asc606_figures_from_schedules_and_journals(client):
+    from app.db import get_session
+    from app.services import disclosures
+    from app.services.journals import DEFERRED_REVENUE, REVENUE, JournalEntry
+    grid_a = [{"line_no": 1, "period": f"2025-{m:02d}", "amount": 100.0} for m in range(1, 13)]
+    grid_a += [{"line_no": 1, "period": p, "amount": a}
+               for p, a in (("2024-03", 40.0), ("2026-09", 200.0), ("2028-01", 50.0), ("2029-01", 10.0))]
+    client.post("/schedules/grid/A", json={"rows": grid_a})
+    client.post("/schedules/grid/B", json={"rows": [{"line_no": 1, "period": p, "amount": 60.0}
+                                                    for p in ("2025-02", "2025-03")]})
+    with get_session() as s:
+        s.add_all([JournalEntry(period="2024-12", debit_account="1200-AR", credit_account=DEFERRED_REVENUE,
+                                amount=1200.0, contract_id="A"),
+                   JournalEntry(period="2025-03", debit_account="1200-AR", credit_account=DEFERRED_REVENUE,
+                                amount=100.0, contract_id="B"),
+                   # recognition is not billing
+                   JournalEntry(period="2025-02", debit_account=DEFERRED_REVENUE, credit_account=REVENUE,
+                                amount=999.0, contract_id="A")])
+
+    out = disclosures.asc606("2025-01", "2025-06")
+    assert out["contracts"] == 2
+    assert out["rpo"] == {"Next 12 months": 600.0, "13-24 months": 200.0,
+                          "25-36 months": 50.0, "Beyond 36 months": 10.0}
+    assert out["balances"] == {
+        "deferred_revenue": {"beginning": 1160.0, "additions": 0.0, "recognized": 600.0, "ending": 560.0},
+        "contract_assets": {"beginning": 0.0, "additions": 20.0, "recognized": 0.0, "ending": 20.0}}
+    [rev] = out["revenue"]
+    assert (rev["current"], rev["prior"], rev["variance"]) == (720.0, 40.0, 1700.0)
+    assert type(rev["variance"]) is float
+
+
+def test_disclosure_pack_rejects_malformed_periods(client):
+    for body in ({"period_to": "2025-13"}, {"period_from": "Q1", "period_to": "2025-06"},
+                 {"period_from": "2025-07", "period_to": "2025-06"}):
+        assert client.post("/reports/disclosure-pack", json=body).status_code == 400
+    assert client.post("/reports/disclosure-pack", json={"period_to": "Q1"}).json()["detail"] == \
+        "period_to must be YYYY-MM, got 'Q1'"
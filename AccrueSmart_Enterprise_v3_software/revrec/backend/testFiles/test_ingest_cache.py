@@ -0,0 +1,50 @@
+import io
+
+TEXT = "Customer buys a SaaS subscription. Total price $1,200.00 in USD."
+
+
+def _pdf(*pages):
+    from reportlab.pdfgen import canvas
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf)
+    for text in pages:
+        c.drawString(72, 720, text)
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _stats(client):
+    return client.get("/ingest/cache").json()
+
+
+def test_text_results_are_cached_by_content_and_rules_version(client, monkeypatch):
+    from app.services import ingest_cache
+    body = {"filename": "a.txt", "text": TEXT}
+    first = client.post("/ingest/text", json=body).json()
+    assert client.post("/ingest/text", json={**body, "filename": "b.txt"}).json() == first
+    assert (_stats(client)["documents"], _stats(client)["document_hits"]) == (1, 1)
+    # a racing upload that missed the cache stores the same key again without a conflict
+    key = ingest_cache.doc_key(TEXT.encode("utf-8"), "text")
+    ingest_cache.put_result(key, "text", ingest_cache.get_result(key), TEXT)
+    assert _stats(client)["documents"] == 1
+
+    # a rules change keys new entries; the LRU bound drops the old one
+    monkeypatch.setattr(ingest_cache, "RULES_VERSION", "test")
+    monkeypatch.setattr(ingest_cache, "MAX_DOCS", 1)
+    client.post("/ingest/text", json=body)
+    assert (_stats(client)["documents"], _stats(client)["document_hits"]) == (1, 0)
+
+    assert client.post("/ingest/text", json={"filename": "a.txt"}).status_code == 422
+
+
+def test_redlined_pdf_reuses_unchanged_pages(client):
+    original = _pdf("Customer hardware delivery.", "Right to return within 30 days.")
+    first = client.post("/ingest/pdf", files={"file": ("a.pdf", original, "application/pdf")}).json()
+    assert first["pages"] == 2 and _stats(client)["pages"] == 2
+
+    redline = _pdf("Customer hardware delivery.", "No returns accepted.")
+    second = client.post("/ingest/pdf", files={"file": ("a.pdf", redline, "application/pdf")}).json()
+    assert _stats(client)["pages"] == 3   # only the changed page was extracted and stored
+    assert [r["type"] for r in first["risks"]] == ["right_of_return"] and second["risks"] == []
+    assert _stats(client)["documents"] == 2
@@ -0,0 +1,37 @@
+import time
+
+CONTRACT = b"Customer buys hardware and a SaaS subscription. Total price $1,200.00 in USD."
+
+
+def _wait(client, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/ingest/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_bulk_job_parses_files_and_reuses_cached_results(client):
+    files = [("files", ("a.txt", CONTRACT, "text/plain")),
+             ("files", ("broken.pdf", b"%PDF-1.4 not really", "application/pdf"))]
+    job = client.post("/ingest/jobs", files=files).json()
+    assert job["total"] == 2
+    job = _wait(client, job["job_id"])
+    assert (job["status"], job["done"], job["failed"], job["queued"]) == ("done", 1, 1, 0)
+
+    items = {i["filename"]: i for i in client.get(f"/ingest/jobs/{job['job_id']}/results").json()["items"]}
+    assert items["a.txt"]["status"] == "done" and not items["a.txt"]["cached"]
+    assert [p["description"] for p in items["a.txt"]["result"]["performance_obligations"]] == [
+        "Hardware", "Software/Subscription"]
+    assert items["broken.pdf"]["status"] == "failed" and items["broken.pdf"]["error"]
+
+    again = _wait(client, client.post("/ingest/jobs", files=files[:1]).json()["job_id"])
+    item = client.get(f"/ingest/jobs/{again['job_id']}/results").json()["items"][0]
+    assert again["status"] == "done" and item["cached"]
+    assert item["result"] == items["a.txt"]["result"]
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/ingest/jobs/nope").status_code == 404
+    assert client.get("/ingest/jobs/nope/results").status_code == 404
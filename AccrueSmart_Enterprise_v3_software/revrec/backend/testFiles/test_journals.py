@@ -0,0 +1,99 @@
+def _grid(client, cid, rows):
+    client.post(f"/schedules/grid/{cid}", json={"rows": rows})
+
+
+def test_revenue_by_revrec_code_resolves_product_mapping(client):
+    client.post("/codes/products", json={"code": "SUB", "name": "Subscription"})
+    client.post("/codes/revrec", params={"code": "SL12", "rule_type": "straight_line"}, json={"months": 12})
+    client.post("/codes/revrec", params={"code": "PIT", "rule_type": "point_in_time"}, json={})
+    assert client.post("/codes/map", params={"product_code": "SUB", "revrec_code": "SL12"}).status_code == 200
+    _grid(client, "C1", [{"line_no": 1, "period": "2025-03", "amount": 100.0, "product_code": "SUB"}])
+    _grid(client, "C2", [{"line_no": 1, "period": "2025-03", "amount": 40.0, "product_code": "SUB",
+                          "revrec_code": "PIT"},
+                         {"line_no": 2, "period": "2025-03", "amount": 25.0, "product_code": "SUB",
+                          "revrec_code": "SL12"}])
+
+    res = client.post("/journals/revenue/2025-03", params={"level": "revrec_code"}).json()
+    assert (res["entries"], res["amount"]) == (2, 165.0)
+    entries = client.get("/journals/accounts/4000-Revenue").json()["entries"]
+    # C1's unmapped-code line posts under its product's SL12, not an empty code
+    assert sorted((e["memo"], e["amount"], e["contract_id"]) for e in entries) == [
+        ("Revenue 2025-03 PIT", 40.0, ""), ("Revenue 2025-03 SL12", 125.0, "")]
+
+    r = client.post("/journals/revenue/2025-03", params={"level": "product"})
+    assert r.status_code == 400
+
+
+def _post(client, entries, **kw):
+    return client.post("/journals", json={"entries": entries, **kw})
+
+
+def _je(period, debit, credit, amount, contract_id=""):
+    return {"period": period, "debit": debit, "credit": credit, "amount": amount, "contract_id": contract_id}
+
+
+def test_trial_balance_activity_and_history(client):
+    assert _post(client, [_je("2025-01", "1100-AR", "2100-Deferred Revenue", 1200.0, "C1"),
+                          _je("2025-01", "2100-Deferred Revenue", "4000-Revenue", 100.0, "C1"),
+                          _je("2025-02", "2100-Deferred Revenue", "4000-Revenue", 100.0, "C1")]).json()["entries"] == 3
+    _post(client, [_je("2025-02", "1100-AR", "4000-Revenue", 999.0, "C2")], posted=False)   # drafts stay out
+
+    jan = client.get("/journals/trial-balance", params={"period": "2025-01"}).json()
+    assert {a["account"]: a["balance"] for a in jan["accounts"]} == {
+        "1100-AR": 1200.0, "2100-Deferred Revenue": -1100.0, "4000-Revenue": -100.0}
+    through = client.get("/journals/trial-balance", params={"through": "2025-02"}).json()
+    assert through["balanced"] and through["total_debit"] == 1400.0
+    assert {a["account"]: a["balance"] for a in through["accounts"]}["4000-Revenue"] == -200.0
+
+    page = client.get("/journals/accounts/4000-Revenue", params={"limit": 1}).json()
+    assert [p["credit"] for p in page["by_period"]] == [100.0, 100.0] and page["next_after_id"] is not None
+    rest = client.get("/journals/accounts/4000-Revenue", params={"after_id": page["next_after_id"]}).json()
+    assert [e["period"] for e in page["entries"] + rest["entries"]] == ["2025-01", "2025-02", "2025-02"]
+
+    assert client.get("/journals/contracts/C1", params={"period_from": "2025-02"}).json()["total"] == 100.0
+    assert client.get("/journals/stats").json() == {"total_journals": 4, "posted_journals": 3, "unposted_journals": 1}
+
+    assert _post(client, []).status_code == 400
+    assert _post(client, [{"period": "2025-01", "debit": "A", "amount": 1.0}]).status_code == 422
+
+
+def test_revenue_per_contract_reruns_replace_the_batch(client):
+    _grid(client, "C1", [{"line_no": 1, "period": "2025-03", "amount": 100.0}])
+    _grid(client, "C2", [{"line_no": 1, "period": "2025-03", "amount": -30.0}])   # reversal
+    first = client.post("/journals/revenue/2025-03").json()
+    assert (first["entries"], first["amount"], first["replaced"]) == (2, 70.0, 0)
+    c2 = client.get("/journals/contracts/C2").json()["entries"]
+    assert [(e["debit"], e["credit"], e["amount"]) for e in c2] == [("4000-Revenue", "2100-Deferred Revenue", 30.0)]
+
+    _grid(client, "C1", [{"line_no": 1, "period": "2025-03", "amount": 150.0}])
+    again = client.post("/journals/revenue/2025-03").json()
+    assert (again["entries"], again["amount"], again["replaced"]) == (2, 120.0, 2)
+    assert client.get("/journals/stats").json()["total_journals"] == 2
+
+
+def test_gl_summary_follows_postings_and_reconciles(client):
+    from app.db import get_session
+    from app.services.journals import JournalEntry
+    _post(client, [_je("2025-01", "1100-AR", "4000-Revenue", 100.0, "C1"),
+                   _je("2025-01", "1100-AR", "4000-Revenue", 50.0, "C2")])
+    assert client.put("/journals/contract-attributes", json=[
+        {"contract_id": "C1", "entity": "US", "product_line": "SaaS"}]).json() == {"contracts": 1, "moved": 1}
+
+    us = client.get("/journals/gl-summary/2025-01", params={"entity": "US"}).json()
+    assert [(l["account"], l["net"], l["entries"]) for l in us["lines"]] == [("1100-AR", 100.0, 1), ("4000-Revenue", -100.0, 1)]
+    everything = client.get("/journals/gl-summary/2025-01").json()
+    assert everything["total_debit"] == everything["total_credit"] == 150.0
+
+    _grid(client, "C1", [{"line_no": 1, "period": "2025-01", "amount": 40.0}])
+    client.post("/journals/revenue/2025-01")
+    client.post("/journals/revenue/2025-01")   # the rerun subtracts the replaced batch
+    assert client.get("/journals/gl-summary/2025-01/reconcile").json()["ok"]
+
+    with get_session() as s:   # detail written around the summary drifts
+        s.add(JournalEntry(period="2025-01", debit_account="1100-AR", credit_account="4000-Revenue", amount=7.0))
+    drift = client.get("/journals/gl-summary/2025-01/reconcile").json()
+    assert not drift["ok"] and [d["account"] for d in drift["differences"]] == ["1100-AR", "4000-Revenue"]
+    assert client.post("/journals/gl-summary/rebuild", params={"period": "2025-01"}).status_code == 200
+    assert client.get("/journals/gl-summary/2025-01/reconcile").json()["ok"]
+
+    assert client.put("/journals/contract-attributes", json=[{"entity": "US"}]).status_code == 422
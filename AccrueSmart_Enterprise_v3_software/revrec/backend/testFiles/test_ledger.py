@@ -0,0 +1,16 @@
+import csv, threading
+from app.ledger import CSVLedger
+
+def test_concurrent_batches_do_not_interleave(tmp_path):
+    a = CSVLedger(str(tmp_path), flush_every=50, flush_interval=0)
+    b = CSVLedger(str(tmp_path), flush_every=70, flush_interval=0)
+    def work(led, tag):
+        led.post_many({'period': '2025-01', 'debit': '2100', 'credit': '4000', 'amount': 1.5,
+                       'memo': tag * 200, 'contract_id': f'{tag}{i}'} for i in range(1000))
+        led.close()
+    ts = [threading.Thread(target=work, args=(a, 'A')), threading.Thread(target=work, args=(b, 'B'))]
+    for t in ts: t.start()
+    for t in ts: t.join()
+    rows = list(csv.reader(open(tmp_path / 'journal_entries.csv', newline='')))
+    assert rows[0][0] == 'period' and len(rows) == 2001
+    assert all(len(r) == 6 and r[4] in ('A' * 200, 'B' * 200) for r in rows[1:])
@@ -0,0 +1,54 @@
+from app.services.locks import diff_periods, merkle_root, period_leaves
+
+def test_merkle_diff_names_drifted_periods():
+    locked = {"PO1": {f"2025-{m:02d}": 100.0 for m in range(1, 13)}, "PO2": {"2025-03": 40.0}}
+    current = {"PO1": dict(locked["PO1"]), "PO2": {"2025-03": 40.0, "2026-01": 5.0}}
+    current["PO1"]["2025-08"] = 99.0
+    del current["PO1"]["2025-01"]
+    a, b = period_leaves(locked), period_leaves(current)
+    assert merkle_root(a) == merkle_root(period_leaves(locked)) != merkle_root(b)
+    assert diff_periods(a, b) == {"changed": ["2025-08"], "added": ["2026-01"], "removed": ["2025-01"]}
+    assert diff_periods(a, a) == {"changed": [], "added": [], "removed": []}
+
+
+SCHEDULE = {"1": {"2025-01": 100.0, "2025-02": 100.0}}
+
+
+def _statuses(client, ids):
+    return client.post("/locks/schedule/status", json=ids).json()
+
+
+def test_bulk_lock_and_bulk_status(client):
+    res = client.post("/locks/schedules", json={"note": "Close 2025-01", "items": [
+        {"contract_id": "C1", "schedule": SCHEDULE},
+        {"contract_id": "C2", "schedule": SCHEDULE, "note": "own note"}]}).json()
+    assert res["locked"] == 2
+    client.post("/locks/schedules", json={"items": [{"contract_id": "C1", "schedule": {}, "note": "relock"}]})
+
+    out = _statuses(client, ["C1", "C2", "NOPE", "C1"])
+    assert (out["contracts"], out["locked"]) == (3, 2)
+    st = out["statuses"]
+    assert (st["C1"]["note"], st["C2"]["note"]) == ("relock", "own note")   # latest lock wins
+    assert st["NOPE"] == {"locked": False}
+    assert client.get("/locks/schedule/status", params={"contract_id": "C1"}).json()["hash"] == st["C1"]["hash"]
+
+    checked = client.post("/locks/verify", json=[
+        {"contract_id": "C2", "schedule": SCHEDULE},
+        {"contract_id": "C2", "schedule": {"1": {"2025-01": 100.0, "2025-02": 90.0}}},
+        {"contract_id": "NOPE", "schedule": SCHEDULE}]).json()
+    assert [r["status"] for r in checked["results"]] == ["ok", "drifted", "unlocked"]
+    assert checked["results"][1]["changed"] == ["2025-02"]
+
+    assert client.post("/locks/schedules", json={"items": [{"contract_id": "C3"}]}).status_code == 422
+
+
+def test_lock_period_locks_contracts_with_amounts_in_it(client):
+    client.post("/schedules/grid/C1", json={"rows": [{"line_no": 1, "period": "2025-02", "amount": 5.0}]})
+    client.post("/schedules/grid/C2", json={"rows": [{"line_no": 1, "period": "2025-03", "amount": 5.0}]})
+    res = client.post("/locks/period/2025-02").json()
+    assert (res["locked"], res["note"]) == (1, "Close 2025-02")
+    st = _statuses(client, ["C1", "C2"])["statuses"]
+    assert st["C1"]["locked"] and not st["C2"]["locked"]
+    verified = client.post("/locks/verify", json=[{"contract_id": "C1", "schedule": {"1": {"2025-02": 5.0}}}]).json()
+    assert verified["ok"] == 1
+    assert client.post("/locks/period/2030-01").json()["locked"] == 0
@@ -0,0 +1,54 @@
+from app import nlp_rules
+
+CONTRACT = """Master Subscription Agreement
+Customer purchases hardware and a SaaS subscription.
+Implementation and setup services are billed separately.
+The total transaction price is $120,000.00 payable in USD.
+A sales commission of $4,800 applies. Customer acceptance testing is required.
+Right to return within 30 days; refund within 30 days of delivery.
+"""
+
+def test_scan_extracts_everything_in_one_pass():
+    r = nlp_rules.scan(CONTRACT)
+    assert (r.standard, r.currency, r.transaction_price, r.commission) == ('ASC606', 'USD', 120000.0, 4800.0)
+    assert [p['description'] for p in r.pos] == ['Software/Subscription', 'Hardware', 'Implementation Services']
+    assert [x['type'] for x in r.risks] == ['right_of_return', 'acceptance']
+    assert [x['issue'] for x in r.recommendations] == ['Right of return', 'Acceptance without criteria']
+
+def test_keyword_semantics():
+    # standards match substrings, POs/currency need whole words
+    assert nlp_rules.detect_standard('Licensee shall pay premiums')[0] == 'ASC945/944'
+    assert nlp_rules.extract_pos('licensee buildings') == []
+    assert nlp_rules.find_currency('100USD or 5 eur') == 'EUR'
+    # span rules overlapping keywords still see both
+    r = nlp_rules.scan('customer acceptance criteria')
+    assert r.standard == 'ASC606' and [x['type'] for x in r.risks] == ['acceptance'] and r.recommendations == []
+    assert nlp_rules.find_total_price('fees of $5 and $1,250.50') == 1250.5
+
+def test_findings_carry_page_numbers():
+    from app.ocr import join_pages
+    text, starts = join_pages([(1, "Cover page"), (2, "Hardware delivery"), (3, "Bill and hold applies")])
+    r = nlp_rules.scan(text, starts)
+    assert r.pos == [{'description': 'Hardware', 'method': 'point_in_time', 'page': 2}]
+    assert [(x['type'], x['page']) for x in r.risks] == [('bill_and_hold', 3)]
+
+def test_trie_handles_keywords_that_prefix_each_other():
+    import re
+    rx = re.compile(nlp_rules._trie(['build', 'building', 'bu', 'builder']))
+    assert [m.group() for m in rx.finditer('bu build building builders')] == ['bu', 'build', 'building', 'builder']
+    # the longer match also reports the keywords it starts with, each with its own word check
+    assert [h[0] for h in nlp_rules._KEYWORD_HITS['building']] == [5, 8]
+    for text, found in (('build', True), ('building', True), ('buildings', False), ('builder', False)):
+        assert bool(nlp_rules.scan(text).pos) is found, text
+
+def test_single_rule_wrappers_share_one_scan(monkeypatch):
+    calls = []
+    real = nlp_rules.scan
+    monkeypatch.setattr(nlp_rules, 'scan', lambda text, *a: calls.append(text) or real(text, *a))
+    nlp_rules._last_scan.cache_clear()
+    assert nlp_rules.detect_standard(CONTRACT)[0] == 'ASC606'
+    assert nlp_rules.find_currency(CONTRACT) == 'USD'
+    pos = nlp_rules.extract_pos(CONTRACT)
+    pos.clear()   # callers get copies
+    assert len(nlp_rules.extract_pos(CONTRACT)) == 3 and len(calls) == 1
+    assert nlp_rules.find_currency('5 eur') == 'EUR' and len(calls) == 2
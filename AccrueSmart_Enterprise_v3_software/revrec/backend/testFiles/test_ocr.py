@@ -0,0 +1,12 @@
+import io
+from reportlab.pdfgen import canvas
+from app.ocr import page_digests
+
+def test_page_digests_isolate_changed_pages():
+    def pdf(pages):
+        buf = io.BytesIO(); c = canvas.Canvas(buf, invariant=1)
+        for t in pages: c.drawString(72, 720, t); c.showPage()
+        c.save(); return buf.getvalue()
+    a = page_digests(pdf(["Hardware delivery", "Software license", "Right to return"]))
+    b = page_digests(pdf(["Hardware delivery", "Software license v2", "Right to return"]))
+    assert a[0] == b[0] and a[2] == b[2] and a[1] != b[1]
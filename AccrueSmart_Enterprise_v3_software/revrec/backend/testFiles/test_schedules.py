@@ -0,0 +1,145 @@
+def _csv(text):
+    return {"file": ("grid.csv", text.encode(), "text/csv")}
+
+
+def _versions(client, cid):
+    return [(v["version"], v["source"]) for v in client.get(f"/schedules/grid/{cid}/versions").json()]
+
+
+def test_import_and_regenerate_record_versions(client):
+    client.post("/codes/revrec", params={"code": "SL3", "rule_type": "straight_line"}, json={"months": 3})
+    client.post("/schedules/grid/C1", json={"rows": [
+        {"line_no": 1, "period": "2025-01", "amount": 300.0, "product_code": "P", "revrec_code": "SL3"}]})
+    assert _versions(client, "C1") == [(1, "save")]
+
+    r = client.post("/schedules/grid/C1/import/csv",
+                    files=_csv("line_no,period,amount,revrec_code\n1,2025-01,600,SL3\n"))
+    assert r.status_code == 200
+    assert _versions(client, "C1") == [(1, "save"), (2, "csv")]
+
+    client.post("/schedules/regenerate", json={"contract_ids": ["C1"]})
+    assert _versions(client, "C1") == [(1, "save"), (2, "csv"), (3, "regenerate")]
+    grid = client.get("/schedules/grid/C1/as-of", params={"version": 3}).json()["rows"]
+    assert [(r["period"], r["amount"]) for r in grid] == [("2025-01", 200.0), ("2025-02", 200.0), ("2025-03", 200.0)]
+
+    # regenerating an unchanged grid adds no version
+    client.post("/schedules/regenerate", json={"contract_ids": ["C1"]})
+    assert len(_versions(client, "C1")) == 3
+
+
+def test_recompute_dirty_rewrites_only_dirty_lines(client):
+    from sqlmodel import select
+    from app.db import get_session
+    from app.services.schedules_crud import ScheduleEditRow
+    client.post("/codes/revrec", params={"code": "SL3", "rule_type": "straight_line"}, json={"months": 3})
+    client.post("/codes/revrec", params={"code": "PIT", "rule_type": "point_in_time"}, json={})
+    client.post("/schedules/grid/C2", json={"rows": [
+        {"line_no": 1, "period": "2025-01", "amount": 300.0, "revrec_code": "SL3"},
+        {"line_no": 2, "period": "2025-01", "amount": 90.0, "revrec_code": "SL3"},
+        {"line_no": 3, "period": "2025-04", "amount": 50.0, "revrec_code": "PIT"}]})
+
+    def line_ids(line_no):
+        with get_session() as s:
+            return set(s.exec(select(ScheduleEditRow.id).where(ScheduleEditRow.contract_id == "C2",
+                                                               ScheduleEditRow.line_no == line_no)).all())
+    untouched = line_ids(3)
+
+    client.put("/codes/revrec/SL3", json={"params": {"months": 2}})
+    res = client.post("/schedules/recompute-dirty", json={}).json()
+    assert (res["lines"], res["lines_regenerated"]) == (3, 2)
+    assert line_ids(3) == untouched
+    rows = client.get("/schedules/grid/C2").json()
+    assert sorted((r["line_no"], r["period"], r["amount"]) for r in rows) == [
+        (1, "2025-01", 150.0), (1, "2025-02", 150.0), (2, "2025-01", 45.0), (2, "2025-02", 45.0),
+        (3, "2025-04", 50.0)]
+    assert [v["source"] for v in client.get("/schedules/grid/C2/versions").json()] == ["save", "regenerate"]
+
+
+def test_import_rejects_bad_rows_and_clears_on_empty(client):
+    client.post("/schedules/grid/C3", json={"rows": [{"line_no": 1, "period": "2025-01", "amount": 10.0}]})
+
+    r = client.post("/schedules/grid/C3/import/csv",
+                    files=_csv("line_no,period,amount\n1,2025-02,20\n2,2025-13,5\n"))
+    assert r.status_code == 422
+    detail = r.json()["detail"]
+    assert detail["rows_saved"] == 0 and [e["line"] for e in detail["errors"]] == [3]
+    assert [(x["period"], x["amount"]) for x in client.get("/schedules/grid/C3").json()] == [("2025-01", 10.0)]
+    assert _versions(client, "C3") == [(1, "save")]
+
+    r = client.post("/schedules/grid/C3/import/csv", files=_csv("line_no,period,amount\n"))
+    assert r.status_code == 200 and r.json()["rows_saved"] == 0
+    assert client.get("/schedules/grid/C3").json() == []
+    assert _versions(client, "C3") == [(1, "save"), (2, "csv")]
+
+
+def test_save_grid_replaces_rows_in_bulk(client):
+    rows = [{"line_no": n // 12, "period": f"2025-{n % 12 + 1:02d}", "amount": 1.0}
+            for n in range(6000)]   # more than one insert batch
+    res = client.post("/schedules/grid/C4", json={"rows": rows}).json()
+    assert (res["rows_saved"], res["version"]) == (6000, 1)
+    assert len(client.get("/schedules/grid/C4").json()) == 6000
+
+    res = client.post("/schedules/grid/C4", json={"rows": rows[:2]}).json()
+    assert (res["rows_saved"], res["version"]) == (2, 2)
+    assert len(client.get("/schedules/grid/C4").json()) == 2
+
+    r = client.post("/schedules/grid/C4", json={"rows": [{"line_no": 9, "period": "2025-01", "amount": "abc"}]})
+    assert r.status_code == 400 and r.json()["detail"].startswith("row 1:")
+    assert [(x["line_no"], x["period"]) for x in client.get("/schedules/grid/C4").json()] == [(0, "2025-01"), (0, "2025-02")]
+    assert len(_versions(client, "C4")) == 2
+
+
+def test_keyset_pages_and_streamed_csv_export(client):
+    rows = [{"line_no": ln, "period": f"2025-{m:02d}", "amount": float(ln * 100 + m)}
+            for ln in (2, 1) for m in (3, 1, 2)]
+    client.post("/schedules/grid/C5", json={"rows": rows})
+    client.post("/schedules/grid/C6", json={"rows": rows[:1]})
+
+    seen, params = [], {"limit": 4}
+    while True:
+        page = client.get("/schedules/grid/C5/page", params=params).json()
+        seen += [(r["line_no"], r["period"]) for r in page["rows"]]
+        if page["next"] is None:
+            break
+        params = {"limit": 4, **page["next"]}
+    assert seen == [(ln, f"2025-{m:02d}") for ln in (1, 2) for m in (1, 2, 3)]
+
+    lines = client.get("/schedules/grid/C5/export/csv").text.splitlines()
+    assert lines[0] == "line_no,period,amount,product_code,revrec_code"
+    assert lines[1:3] == ["1,2025-01,101.0,,", "1,2025-02,102.0,,"] and len(lines) == 7
+    everything = client.get("/schedules/export/csv").text.splitlines()
+    assert everything[0].startswith("contract_id,") and [l[:3] for l in everything[1:]] == ["C5,"] * 6 + ["C6,"]
+    assert client.get("/schedules/grid/NONE/export/csv").text.splitlines() == lines[:1]
+
+    assert client.get("/schedules/grid/C5/page", params={"after_line": "x"}).status_code == 422
+
+
+def test_rule_changes_mark_only_dependent_lines_dirty(client):
+    client.post("/codes/products", json={"code": "SUB", "name": "Subscription"})
+    client.post("/codes/revrec", params={"code": "SL3", "rule_type": "straight_line"}, json={"months": 3})
+    client.post("/codes/revrec", params={"code": "PIT", "rule_type": "point_in_time"}, json={})
+    client.post("/schedules/grid/D1", json={"rows": [
+        {"line_no": 1, "period": "2025-01", "amount": 30.0, "revrec_code": "SL3"},
+        {"line_no": 2, "period": "2025-01", "amount": 30.0, "product_code": "SUB"},   # inherits SUB's mapping
+        {"line_no": 3, "period": "2025-01", "amount": 30.0, "product_code": "SUB", "revrec_code": "PIT"}]})
+    client.post("/schedules/grid/D2", json={"rows": [
+        {"line_no": 1, "period": "2025-01", "amount": 30.0, "revrec_code": "SL3"}]})
+
+    def dirty():
+        return [(d["contract_id"], d["line_no"]) for d in client.get("/schedules/dirty").json()["items"]]
+
+    assert client.post("/codes/map", params={"product_code": "SUB", "revrec_code": "SL3"}).json()["lines_marked_dirty"] == 1
+    assert dirty() == [("D1", 2)]
+    assert client.put("/codes/revrec/SL3", json={"params": {"months": 3}}).json()["lines_marked_dirty"] == 0
+    assert client.put("/codes/revrec/SL3", json={"params": {"months": 2}}).json()["lines_marked_dirty"] == 2
+    assert dirty() == [("D1", 1), ("D1", 2), ("D2", 1)]
+    assert client.put("/codes/revrec/NOPE", json={"params": {}}).status_code == 404
+
+    res = client.post("/schedules/recompute-dirty", json={"max_contracts": 1}).json()
+    assert (res["contracts"], res["lines_regenerated"]) == (1, 2)
+    assert dirty() == [("D2", 1)]
+    assert [(r["line_no"], r["amount"]) for r in client.get("/schedules/grid/D1").json()] == [
+        (1, 15.0), (1, 15.0), (2, 15.0), (2, 15.0), (3, 30.0)]
+    client.post("/schedules/recompute-dirty", json={})
+    assert client.get("/schedules/dirty").json() == {"lines": 0, "contracts": 0, "items": []}
+    assert client.post("/schedules/recompute-dirty", json={}).json()["contracts"] == 0